@@ -22,10 +22,21 @@ AUTH_USER_MODEL = "bookingandbilling.user"
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "")
 
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = os.getenv("DJANGO_DEBUG", False) == "True"
+
+# orjson is optional, see bookingandbilling/renderers.py
+try:
+    import orjson
+    JSON_RENDERER = 'bookingandbilling.renderers.ORJSONRenderer'
+except ImportError:
+    JSON_RENDERER = 'rest_framework.renderers.JSONRenderer'
+
 REST_FRAMEWORK = {
+    # The browsable API is only served while debugging
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer', 
+        (JSON_RENDERER, 'rest_framework.renderers.BrowsableAPIRenderer')
+        if DEBUG else (JSON_RENDERER,)
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'bookingandbilling.middleware.CookieTokenAuthentication',
@@ -36,8 +47,14 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'bookingandbilling.utilities.custom_exception_handler'
 }
 
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.getenv("DJANGO_DEBUG", False) == "True"
+# In-process authToken cache (see bookingandbilling/auth_cache.py), TTL in seconds
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 1024))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", 60))
+
+# In-process media access cache (see bookingandbilling/access_cache.py), TTL in seconds
+MEDIA_ACCESS_CACHE_SIZE = int(os.getenv("MEDIA_ACCESS_CACHE_SIZE", 4096))
+MEDIA_ACCESS_CACHE_TTL = int(os.getenv("MEDIA_ACCESS_CACHE_TTL", 30))
+
 ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "localhost").split(",")
 ALLOWED_HOSTS.append('127.0.0.1') #think I can chuck these
 ALLOWED_HOSTS.append('testserver') #get rid of this too
@@ -161,3 +178,15 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
+
+# Outbox delivery (see bookingandbilling/management/commands/send_queued_emails.py)
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", 5))
+EMAIL_QUEUE_RETRY_DELAY = int(os.getenv("EMAIL_QUEUE_RETRY_DELAY", 60))
+
+# Chunked translation document uploads (see bookingandbilling/uploads.py)
+TRANSLATION_UPLOAD_CHUNK_SIZE = int(os.getenv("TRANSLATION_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+TRANSLATION_UPLOAD_MAX_SIZE = int(os.getenv("TRANSLATION_UPLOAD_MAX_SIZE", 100 * 1024 * 1024))
+
+# Let nginx send protected media once Django has checked access (see bookingandbilling/media.py)
+PROTECTED_MEDIA_ACCEL_REDIRECT = os.getenv("PROTECTED_MEDIA_ACCEL_REDIRECT", False) == "True"
+PROTECTED_MEDIA_ACCEL_PREFIX = "/protected-media-internal/"
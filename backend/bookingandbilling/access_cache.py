@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# In-process cache of (user, translation) -> may the user read the translation's document.
+# Entries are dropped when the translation or its offers change in this process and are
+# otherwise kept only MEDIA_ACCESS_CACHE_TTL seconds, which bounds how long a change made
+# through another worker (or a QuerySet.update) takes to apply.
+
+
+class AccessCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, translation_id):
+        """
+        Returns the cached decision, or None on a miss.
+        """
+        key = (user_id, translation_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            allowed, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return allowed
+
+    def set(self, user_id, translation_id, allowed):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        key = (user_id, translation_id)
+        with self._lock:
+            self._entries[key] = (allowed, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_translations(self, translation_ids):
+        translation_ids = set(translation_ids)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] in translation_ids]:
+                del self._entries[key]
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+access_cache = AccessCache(
+    max_size=getattr(settings, "MEDIA_ACCESS_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "MEDIA_ACCESS_CACHE_TTL", 30),
+)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BookingandbillingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookingandbilling'
+
+    def ready(self):
+        from .versions import install_version_triggers
+        post_migrate.connect(install_version_triggers, sender=self)
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# In-process cache of authToken -> (token, account type).
+# Saves the token, user and account type lookups on every authenticated request. Each
+# gunicorn worker has its own cache, so entries are kept short lived (AUTH_TOKEN_CACHE_TTL)
+# to bound how long a token deleted through another worker keeps working.
+
+
+class ModelSnapshot:
+    """
+    The field values of a model instance, and of the related instances loaded with it (up
+    to depth levels), from which restore() builds fresh instances without a query.
+    Only immutable values are kept, so a snapshot can be shared between threads.
+    """
+    __slots__ = ("model", "db", "names", "values", "related")
+
+    def __init__(self, instance, depth=1):
+        self.model = type(instance)
+        self.db = instance._state.db
+        self.names = tuple(field.attname for field in instance._meta.concrete_fields)
+        self.values = tuple(getattr(instance, name) for name in self.names)
+        self.related = ()
+        if depth > 1:
+            self.related = tuple(
+                (name, None if related is None else ModelSnapshot(related, depth - 1))
+                for name, related in instance._state.fields_cache.items()
+            )
+
+    def restore(self):
+        instance = self.model.from_db(self.db, self.names, self.values)
+        for name, snapshot in self.related:
+            field = instance._meta.get_field(name)
+            field.set_cached_value(instance, None if snapshot is None else snapshot.restore())
+        return instance
+
+
+class TokenCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns (token, user_type) for a cached token, or None on a miss.
+        The token and its user are built afresh from the cached snapshot, so changes made
+        while handling a request stay in that request.
+        """
+        if not key:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            snapshot, _user_id, user_type, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+        return snapshot.restore(), user_type
+
+    def set(self, key, token, user_type):
+        """
+        Caches a token, with the user and account model rows loaded alongside it
+        """
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        # Token -> user -> Admin/Interpreter/Customer
+        snapshot = ModelSnapshot(token, depth=3)
+        with self._lock:
+            self._entries[key] = (snapshot, token.user_id, user_type, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
@@ -0,0 +1,53 @@
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+from .models import Appointment, Interpreter, TsTzRange
+
+# Interpreter availability from the [planned_start_time, planned_end_time) period of the
+# appointments assigned to them. Overlaps are found with the appointment_booked_period_idx
+# GiST index, so a lookup only visits the appointments that actually overlap the window
+# rather than every appointment each interpreter has.
+
+
+def booked_appointments(start, end):
+    """
+    Active, assigned appointments overlapping [start, end). Appointments without an end
+    time (older ones fill_duration_minutes hasn't reached) are left out, as their range
+    would have no upper bound and book the interpreter forever.
+    """
+    return Appointment.objects.annotate(
+        period=TsTzRange("planned_start_time", "planned_end_time")
+    ).filter(
+        active=True,
+        interpreter__isnull=False,
+        planned_end_time__isnull=False,
+        period__overlap=DateTimeTZRange(start, end)
+    )
+
+
+def free_interpreters(start, end, exclude_appointment_id=None):
+    """
+    Interpreters with no appointment overlapping [start, end). The appointment being
+    scheduled itself can be left out so it doesn't block its own interpreter.
+    The busy interpreters are found once, from the bookings in the window, and
+    excluded, rather than each interpreter's bookings being checked in turn.
+    """
+    booked = booked_appointments(start, end)
+    if exclude_appointment_id is not None:
+        booked = booked.exclude(id=exclude_appointment_id)
+    return Interpreter.objects.exclude(pk__in=booked.values("interpreter_id"))
+
+
+def busy_interpreter_ids(start, end, interpreter_ids, exclude_appointment_id=None):
+    booked = booked_appointments(start, end).filter(interpreter_id__in=interpreter_ids)
+    if exclude_appointment_id is not None:
+        booked = booked.exclude(id=exclude_appointment_id)
+    return set(booked.values_list("interpreter_id", flat=True))
+
+
+def is_free_for(interpreter, appointment):
+    return not busy_interpreter_ids(
+        appointment.planned_start_time,
+        appointment.planned_end_time,
+        [interpreter.pk],
+        exclude_appointment_id=appointment.pk
+    )
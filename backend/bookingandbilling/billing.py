@@ -0,0 +1,87 @@
+from django.db.models import Count, DateField, DecimalField, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Round, TruncMonth
+
+from .filters import InvalidFilter
+
+# Billed hours per interpreter, customer, language and/or month, e.g.
+#   /api/billed-hours/?group_by=interpreter,month&from=2024-01-01&to=2024-12-31
+# Durations are whole minutes (see durations.py), so the database groups and sums
+# them in one query and only the totals are sent back, however many appointments
+# they cover.
+
+# An appointment is billed for how long it actually took once that has been entered
+BILLED_MINUTES = Coalesce("actual_duration_minutes", "planned_duration_minutes")
+
+# The columns each grouping is keyed on, and the labels returned alongside them
+BILLING_GROUPS = {
+    "interpreter": (
+        ("interpreter_id",),
+        {"interpreter_name": Concat(
+            "interpreter__first_name", Value(" "), "interpreter__last_name")},
+    ),
+    "customer": (
+        ("customer_id",),
+        {
+            "customer_name": Concat(
+                "customer__first_name", Value(" "), "customer__last_name"),
+            "organisation": F("customer__organisation"),
+        },
+    ),
+    "language": (
+        ("language_id",),
+        {"language_name": F("language__language_name")},
+    ),
+    "month": (
+        ("month",),
+        {"month": TruncMonth("planned_start_time", output_field=DateField())},
+    ),
+}
+
+
+def parse_group_by(value):
+    """
+    The groupings in a comma separated list of BILLING_GROUPS names.
+    Raises InvalidFilter for an unknown or repeated name.
+    """
+    groups = [group for group in value.split(",") if group]
+    if len(set(groups)) != len(groups) or not set(groups) <= BILLING_GROUPS.keys():
+        raise InvalidFilter(
+            f"group_by must be a comma separated list of {', '.join(BILLING_GROUPS)}."
+        )
+    return groups
+
+
+def billed_totals():
+    minutes = Coalesce(Sum(BILLED_MINUTES), 0)
+    hours = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        "appointments": Count("id"),
+        "minutes": minutes,
+        # Cast first, as dividing two integers would round down to whole hours
+        "hours": Round(Cast(minutes, hours) / 60, 2, output_field=hours),
+    }
+
+
+def billed_hours(queryset, groups):
+    """
+    The appointment count, billed minutes and billed hours of queryset for each
+    combination of groups (BILLING_GROUPS names), ordered by the groups, or a single
+    total if there are none.
+    """
+    if not groups:
+        return queryset.aggregate(**billed_totals())
+
+    keys, labels = [], {}
+    for group in groups:
+        group_keys, group_labels = BILLING_GROUPS[group]
+        keys.extend(group_keys)
+        labels.update(group_labels)
+
+    computed_keys = {name: label for name, label in labels.items() if name in keys}
+    other_labels = {name: label for name, label in labels.items() if name not in keys}
+    return (
+        queryset.annotate(**computed_keys)
+        .values(*keys, **other_labels)
+        .annotate(**billed_totals())
+        .order_by(*keys)
+    )
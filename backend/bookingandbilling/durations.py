@@ -0,0 +1,40 @@
+import re
+from functools import lru_cache
+
+# Appointment durations are stored as whole minutes (planned_duration_minutes and
+# actual_duration_minutes), so they can be any length and summed by the database.
+
+CLOCK_DURATION_RE = re.compile(r"^(\d+):([0-5]\d)(?::[0-5]\d)?$")
+
+
+def parse_duration(value):
+    """
+    Minutes from a number of minutes or an "H:MM" string (as sent by the duration
+    inputs, hours may go past 24 and seconds are ignored).
+    Raises ValueError if value is neither.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        minutes = value
+    else:
+        match = CLOCK_DURATION_RE.match(str(value).strip())
+        if match is None:
+            raise ValueError("Duration must be minutes or hours and minutes as H:MM.")
+        minutes = int(match[1]) * 60 + int(match[2])
+
+    if minutes < 0:
+        raise ValueError("Duration can't be negative.")
+    return minutes
+
+
+@lru_cache(maxsize=1024)
+def format_duration(minutes):
+    # Cached, as a feed's durations are mostly the same few values
+    if minutes:
+        hours, minutes = divmod(minutes, 60)
+        if hours and minutes:
+            return f"{hours} hours {minutes} minutes"
+        elif minutes:
+            return f"{minutes} minutes"
+        elif hours:
+            return f"{hours} hours"
+    return None
@@ -1,13 +1,29 @@
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.utils import timezone
+from django.template.loader import get_template
 from django.urls import reverse
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from .tokens import account_activation_token
+from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.conf import settings
+from datetime import timedelta
+from functools import cache
+from .durations import format_duration
+from .models import EmailStatus, QueuedEmail
 import os
+import threading
+import traceback
+
+# Emails are written to the QueuedEmail outbox during the request and delivered by the
+# send_queued_emails management command, so no request waits on the SMTP server.
+EMAIL_QUEUE_MAX_ATTEMPTS = getattr(settings, "EMAIL_QUEUE_MAX_ATTEMPTS", 5)
+EMAIL_QUEUE_RETRY_DELAY = getattr(settings, "EMAIL_QUEUE_RETRY_DELAY", 60)
+
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'company_logo.png')
 
 
 def send_validation_email(request, user):
@@ -21,12 +37,12 @@ def send_validation_email(request, user):
             kwargs={'uidb64':uid, 'token':token}))
             
         subject = "Account Validation"
-        message = render_to_string('user/verification_email.html', {
+        message = render_email('user/verification_email.html', {
                     'first_name': user.first_name,
                     'url' : verification_url
                 })
 
-    email = send_email(user, subject, message) 
+    email = queue_email(user, subject, message) 
     return email
     
     
@@ -41,55 +57,157 @@ def send_reset_email(request, user):
     ))
 
     subject = "Password Reset Request"
-    message = render_to_string('user/password_reset_email.html', {
+    message = render_email('user/password_reset_email.html', {
         'first_name': user.first_name,
         'url': verification_url
     })
 
-    email = send_email(user, subject, message) 
+    email = queue_email(user, subject, message) 
     return email
 
 
 def send_appointment_accepted_email(appointment, customer):
     url = reverse("login")
     subject = "Appointment Accepted"
-    message = render_to_string('user/appointment_accepted_email.html', {
+    message = render_email('user/appointment_accepted_email.html', {
         'first_name': customer.first_name,
         'url': url,
         'appointment_date': appointment.planned_start_time,
-        'appointment_time': appointment.planned_duration,
+        'appointment_time': format_duration(appointment.planned_duration_minutes),
         'language': appointment.language,
         'Interpreter': appointment.interpreter,
         'location': appointment.location,
     })
 
-    email = send_email(customer, subject, message) 
+    email = queue_email(customer, subject, message) 
     return email
     
 def send_appointment_offered_email(appointment, interpreter):
+    subject, message = render_appointment_offered_email(appointment, interpreter)
+    email = queue_email(interpreter, subject, message) 
+    return email
+
+def send_appointment_offered_emails(appointment, interpreters):
+    queued = []
+    for interpreter in interpreters:
+        subject, message = render_appointment_offered_email(appointment, interpreter)
+        queued.append(QueuedEmail(recipient=interpreter.email, subject=subject, body=message))
+    return QueuedEmail.objects.bulk_create(queued)
+
+def render_appointment_offered_email(appointment, interpreter):
     url = reverse("login")
     subject = "Appointment Offered"
-    message = render_to_string('user/appointment_offered_email.html', {
+    message = render_email('user/appointment_offered_email.html', {
         'first_name': interpreter.first_name,
         'url': url,
         'appointment_date': appointment.planned_start_time,
-        'appointment_time': appointment.planned_duration,
+        'appointment_time': format_duration(appointment.planned_duration_minutes),
         'language': appointment.language,
         'location': appointment.location,
     })
+    return subject, message
 
-    email = send_email(interpreter, subject, message) 
-    return email
+def queue_email(user, subject, message):
+    return QueuedEmail.objects.create(recipient=user.email, subject=subject, body=message)
 
-def send_email(user, subject, message):
-    email = EmailMultiAlternatives(subject, message, to=[user.email])
-    email.content_subtype = "html"
+@cache
+def get_email_template(template_name):
+    # Looked up once per process, every email then renders the already compiled template
+    return get_template(template_name)
 
-    image_path = os.path.join(settings.BASE_DIR, 'static', 'company_logo.png')
-    with open(image_path, 'rb') as img:
-        image = MIMEImage(img.read())
+def render_email(template_name, context):
+    return get_email_template(template_name).render(context)
+
+
+class LogoCache:
+    """
+    Keeps the inline logo already base64 encoded so the file is read and encoded once
+    per process rather than for every email. It is reloaded when the file changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._image = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if self._image is None or mtime != self._mtime:
+                with open(self.path, 'rb') as img:
+                    self._image = MIMEImage(img.read())
+                self._mtime = mtime
+            prepared = self._image
+
+        # Each email gets its own part (and headers) around the shared encoded payload
+        image = MIMEBase(prepared.get_content_maintype(), prepared.get_content_subtype())
+        image.set_payload(prepared.get_payload())
+        image['Content-Transfer-Encoding'] = prepared['Content-Transfer-Encoding']
         image.add_header('Content-ID', '<logo>')
         image.add_header('Content-Disposition', 'inline')
-        email.attach(image)
-    email.send()
-    return email
\ No newline at end of file
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._image = None
+            self._mtime = None
+
+
+logo_cache = LogoCache(LOGO_PATH)
+
+def build_email(recipient, subject, message):
+    email = EmailMultiAlternatives(subject, message, to=[recipient])
+    email.content_subtype = "html"
+    email.attach(logo_cache.get())
+    return email
+
+def send_queued_emails(connection, batch_size=50):
+    """
+    Sends one batch of due emails from the outbox over the given connection.
+    Failed emails are retried with exponential backoff until EMAIL_QUEUE_MAX_ATTEMPTS.
+    Rows are locked with SKIP LOCKED so several workers can drain the outbox at once.
+    Returns the number of emails sent and failed in the batch.
+    """
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True).filter(
+                status=EmailStatus.PENDING,
+                next_attempt__lte=timezone.now()
+            ).order_by("next_attempt")[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        for queued in batch:
+            try:
+                # Opening an already open connection is a no-op, so it is only
+                # reconnected after a failure closed it
+                connection.open()
+                email = build_email(queued.recipient, queued.subject, queued.body)
+                if connection.send_messages([email]) != 1:
+                    raise RuntimeError("Email was not accepted by the backend.")
+
+                queued.status = EmailStatus.SENT
+                queued.sent = timezone.now()
+                sent += 1
+            except Exception as e:
+                print(traceback.print_exception(e))
+                connection.close()
+
+                queued.attempts += 1
+                queued.last_error = str(e)
+                if queued.attempts >= EMAIL_QUEUE_MAX_ATTEMPTS:
+                    queued.status = EmailStatus.FAILED
+                else:
+                    delay = EMAIL_QUEUE_RETRY_DELAY * 2 ** (queued.attempts - 1)
+                    queued.next_attempt = timezone.now() + timedelta(seconds=delay)
+                failed += 1
+
+        QueuedEmail.objects.bulk_update(
+            batch, ["status", "sent", "attempts", "last_error", "next_attempt"]
+        )
+
+    return sent, failed
\ No newline at end of file
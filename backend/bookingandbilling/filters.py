@@ -0,0 +1,124 @@
+import re
+from datetime import datetime, time, timedelta
+
+from django.contrib.postgres.search import SearchQuery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import APPOINTMENT_SEARCH_FIELDS, TRANSLATION_SEARCH_FIELDS, search_vector
+
+# Query parameter filters for the list feeds, e.g.
+#   /api/fetch-appointments/?from=2024-12-01&to=2024-12-31&language=1,2&search=glasgow
+# Each parameter becomes one condition on an indexed column (the foreign keys, the
+# (planned_start_time, id) feed indexes, or the GIN search indexes), so the database
+# narrows the feed before it is paginated and serialized.
+
+SEARCH_WORD_RE = re.compile(r"\w+")
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def parse_ids(value):
+    return [int(id) for id in value.split(",")]
+
+
+def parse_strings(value):
+    return [string for string in value.split(",") if string]
+
+
+def parse_bool(value):
+    if value.lower() not in ("true", "false"):
+        raise ValueError
+    return value.lower() == "true"
+
+
+def parse_moment(value, end=False):
+    """
+    An ISO 8601 date time, or a date meaning the start of that day (or with end, the
+    start of the next day, so a date range includes its last day).
+    """
+    day = parse_date(value)
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time())
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_end(value):
+    return parse_moment(value, end=True)
+
+
+def search_query(value):
+    """
+    Prefix matches of every word in value, so "glas roy" finds "Glasgow Royal".
+    Only word characters reach the query, so user input can't change its syntax.
+    """
+    words = SEARCH_WORD_RE.findall(value)
+    if not words:
+        raise ValueError
+    return SearchQuery(
+        " & ".join(f"{word}:*" for word in words), search_type="raw", config="simple"
+    )
+
+
+class FeedFilter:
+    def __init__(self, filters, search_fields):
+        # filters maps each query parameter to the lookup and parser for its value
+        self.filters = filters
+        self.search_fields = search_fields
+
+    def filter(self, request, queryset):
+        """
+        Returns the queryset narrowed by the filter parameters in the query string.
+        Raises InvalidFilter if a parameter's value can't be parsed.
+        """
+        params = request.query_params
+        for param, (lookup, parse) in self.filters.items():
+            if param not in params:
+                continue
+            try:
+                value = parse(params[param])
+            except (TypeError, ValueError):
+                raise InvalidFilter(f"Invalid value for {param}.")
+            queryset = queryset.filter(**{lookup: value})
+
+        if "search" in params:
+            try:
+                query = search_query(params["search"])
+            except ValueError:
+                raise InvalidFilter("Search must contain at least one word.")
+            queryset = queryset.alias(
+                search=search_vector(self.search_fields)
+            ).filter(search=query)
+
+        return queryset
+
+
+APPOINTMENT_FILTER = FeedFilter(
+    {
+        "from": ("planned_start_time__gte", parse_moment),
+        "to": ("planned_start_time__lt", parse_end),
+        "language": ("language__in", parse_ids),
+        "customer": ("customer__in", parse_ids),
+        "interpreter": ("interpreter__in", parse_ids),
+        "status": ("status__in", parse_strings),
+        "invoice_generated": ("invoice_generated", parse_bool),
+    },
+    APPOINTMENT_SEARCH_FIELDS
+)
+TRANSLATION_FILTER = FeedFilter(
+    {
+        "language": ("language__in", parse_ids),
+        "customer": ("customer__in", parse_ids),
+        "interpreter": ("interpreter__in", parse_ids),
+        "invoice_generated": ("invoice_generated", parse_bool),
+    },
+    TRANSLATION_SEARCH_FIELDS
+)
@@ -0,0 +1,135 @@
+import csv
+import os
+
+# Rendering invoice lines as CSV, for the streamed export and for each invoice's document.
+# Only the standard library is imported here, so worker processes rendering documents
+# (see invoicing.render_invoice_documents) don't need Django set up.
+
+# The invoice line columns each row is built from, in order (see invoicing.line_values)
+LINE_FIELDS = (
+    "invoice_id",
+    "invoice__period_start",
+    "invoice__customer__email",
+    "invoice__customer__first_name",
+    "invoice__customer__last_name",
+    "invoice__customer__organisation",
+    "appointment_id",
+    "appointment__planned_start_time",
+    "appointment__language__language_name",
+    "appointment__location",
+    "translation_id",
+    "translation__language__language_name",
+    "translation__company",
+    "quantity",
+)
+
+EXPORT_HEADER = [
+    "Invoice", "Period", "Customer Email", "Customer Name", "Organisation",
+    "Item", "Item ID", "Date", "Language", "Location", "Quantity", "Unit",
+]
+DOCUMENT_HEADER = ["Item", "Item ID", "Date", "Language", "Location", "Quantity", "Unit"]
+
+
+# A cell starting with one of these is read as a formula by spreadsheet applications
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class EchoBuffer:
+    # csv.writer target that hands back each row instead of storing it
+    def write(self, value):
+        return value
+
+
+def text(value):
+    """
+    A user supplied text cell, prefixed with ' if it would otherwise be read as a formula
+    when the CSV is opened in a spreadsheet.
+    """
+    value = value or ""
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def line_item(values):
+    """
+    The item columns (item, ID, date, language, location, quantity, unit) of a row of
+    LINE_FIELDS values.
+    """
+    fields = dict(zip(LINE_FIELDS, values))
+    if fields["appointment_id"] is not None:
+        start = fields["appointment__planned_start_time"]
+        return [
+            "Appointment",
+            fields["appointment_id"],
+            start.strftime("%Y-%m-%d %H:%M") if start else "",
+            text(fields["appointment__language__language_name"]),
+            text(fields["appointment__location"]),
+            fields["quantity"],
+            "minutes",
+        ]
+    return [
+        "Translation",
+        fields["translation_id"] or "",
+        "",
+        text(fields["translation__language__language_name"]),
+        text(fields["translation__company"]),
+        fields["quantity"],
+        "words",
+    ]
+
+
+def export_row(values):
+    fields = dict(zip(LINE_FIELDS, values))
+    name = " ".join(filter(None, [fields["invoice__customer__first_name"],
+                                  fields["invoice__customer__last_name"]]))
+    return [
+        fields["invoice_id"],
+        fields["invoice__period_start"].strftime("%Y-%m"),
+        text(fields["invoice__customer__email"]),
+        text(name),
+        text(fields["invoice__customer__organisation"]),
+        *line_item(values),
+    ]
+
+
+def export_csv(lines):
+    """
+    Yields the export CSV a row at a time, for a StreamingHttpResponse, from an
+    iterator of LINE_FIELDS rows.
+    """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(EXPORT_HEADER)
+    for values in lines:
+        yield writer.writerow(export_row(values))
+
+
+def document_name(invoice_id, period_start):
+    # Relative to MEDIA_ROOT, a directory per month so none grows too large
+    return f"invoice_documents/{period_start:%Y-%m}/invoice-{invoice_id}.csv"
+
+
+def write_invoice_documents(media_root, documents):
+    """
+    Writes each (invoice ID, name, rows) document in documents below media_root, where
+    rows are the invoice's LINE_FIELDS rows. Run in a worker process.
+    Returns the (invoice ID, name) of each document written.
+    """
+    written = []
+    for invoice_id, name, rows in documents:
+        path = os.path.join(media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        items = [line_item(values) for values in rows]
+        minutes = sum(item[5] for item in items if item[6] == "minutes")
+        words = sum(item[5] for item in items if item[6] == "words")
+
+        # Written aside and moved into place, so a download never sees half a document
+        with open(path + ".part", "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(DOCUMENT_HEADER)
+            writer.writerows(items)
+            writer.writerow([])
+            writer.writerow(["Total", "", "", "", "", minutes, "minutes"])
+            writer.writerow(["Total", "", "", "", "", words, "words"])
+        os.replace(path + ".part", path)
+        written.append((invoice_id, name))
+    return written
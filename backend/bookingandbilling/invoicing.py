@@ -0,0 +1,208 @@
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .invoice_documents import LINE_FIELDS, document_name, write_invoice_documents
+from .models import Appointment, Invoice, InvoiceLine, Translation
+
+# Invoices for a billing period are generated all at once rather than a row at a time:
+# the work to bill is read (and locked) with one query per model, the invoices and their
+# lines are written with bulk_create, one UPDATE sums the lines into the invoice totals
+# and one UPDATE per model marks the billed rows invoiced, so a run costs the same
+# handful of queries however many customers and rows it covers.
+# Their documents are rendered by a pool of worker processes fed from a single streamed
+# query of the lines, so a month end run uses every core in bounded memory.
+
+# Rows read from the database at a time when streaming invoice lines
+LINE_CHUNK_SIZE = 2000
+# Invoice documents sent to a worker process at a time
+DOCUMENTS_PER_TASK = 50
+
+
+def parse_period(value):
+    """
+    The first day of the month value ("YYYY-MM") and the first day of the next month.
+    Raises ValueError if value isn't a month.
+    """
+    start = datetime.strptime(value, "%Y-%m").date()
+    return start, next_month(start)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def billable_appointments(period_start, period_end):
+    """
+    Active, completed (with an actual duration) appointments not yet invoiced, starting
+    in [period_start, period_end). Appointments already on an invoice aren't billed again
+    even if their invoice_generated flag has been cleared since.
+    """
+    start, end = (
+        timezone.make_aware(datetime.combine(day, time()))
+        for day in (period_start, period_end)
+    )
+    return Appointment.objects.filter(
+        active=True,
+        invoice_generated=False,
+        invoice_lines__isnull=True,
+        customer__isnull=False,
+        actual_duration_minutes__isnull=False,
+        planned_start_time__gte=start,
+        planned_start_time__lt=end
+    )
+
+
+def billable_translations():
+    """
+    Active, completed (with an actual word count) translations not yet invoiced.
+    Translations aren't dated, so each is billed in the first period invoiced after
+    it is completed. As with appointments, those already on an invoice aren't billed again.
+    """
+    return Translation.objects.filter(
+        active=True,
+        invoice_generated=False,
+        invoice_lines__isnull=True,
+        customer__isnull=False,
+        actual_word_count__isnull=False
+    )
+
+
+def line_total(aggregate, **filters):
+    # An invoice's aggregate over the lines matching filters, for use in an UPDATE
+    return Coalesce(Subquery(
+        InvoiceLine.objects.filter(invoice=OuterRef("pk"), **filters)
+        .order_by().values("invoice").annotate(total=aggregate).values("total")
+    ), 0)
+
+
+@transaction.atomic
+def generate_invoices(period_start, period_end, customers=None):
+    """
+    Invoices every customer with billable appointments in [period_start, period_end)
+    or billable translations, with a line for each, and marks them invoiced.
+    If customers (IDs) is given, only those customers are invoiced.
+    Returns the new invoices.
+    """
+    appointments = billable_appointments(period_start, period_end)
+    translations = billable_translations()
+    if customers is not None:
+        appointments = appointments.filter(customer__in=customers)
+        translations = translations.filter(customer__in=customers)
+
+    # Locked until the rows are marked invoiced, so a concurrent run can't bill them
+    # again (it waits, then no longer finds them uninvoiced). Only the rows themselves,
+    # as the outer join to their invoice lines can't be locked.
+    appointments = list(
+        appointments.select_for_update(of=("self",))
+        .order_by("customer_id", "planned_start_time", "id")
+        .values_list("id", "customer_id", "actual_duration_minutes")
+    )
+    translations = list(
+        translations.select_for_update(of=("self",))
+        .order_by("customer_id", "id")
+        .values_list("id", "customer_id", "actual_word_count")
+    )
+
+    customer_ids = sorted({row[1] for row in appointments} | {row[1] for row in translations})
+    invoices = Invoice.objects.bulk_create([
+        Invoice(customer_id=customer_id, period_start=period_start, period_end=period_end)
+        for customer_id in customer_ids
+    ])
+    invoice_ids = {invoice.customer_id: invoice.id for invoice in invoices}
+
+    InvoiceLine.objects.bulk_create([
+        *(InvoiceLine(invoice_id=invoice_ids[customer_id], appointment_id=id, quantity=minutes)
+          for id, customer_id, minutes in appointments),
+        *(InvoiceLine(invoice_id=invoice_ids[customer_id], translation_id=id, quantity=words)
+          for id, customer_id, words in translations),
+    ], batch_size=5000)
+
+    new_invoices = Invoice.objects.filter(id__in=invoice_ids.values())
+    new_invoices.update(
+        appointment_count=line_total(Count("id"), appointment__isnull=False),
+        billed_minutes=line_total(Sum("quantity"), appointment__isnull=False),
+        translation_count=line_total(Count("id"), translation__isnull=False),
+        billed_words=line_total(Sum("quantity"), translation__isnull=False),
+    )
+    Appointment.objects.filter(invoice_lines__invoice__in=new_invoices).update(
+        invoice_generated=True)
+    Translation.objects.filter(invoice_lines__invoice__in=new_invoices).update(
+        invoice_generated=True)
+
+    return new_invoices.order_by("id")
+
+
+def line_values(invoices):
+    """
+    LINE_FIELDS rows of the lines of invoices, ordered by invoice and then by line.
+    """
+    return InvoiceLine.objects.filter(invoice__in=invoices).order_by(
+        "invoice_id", "id"
+    ).values_list(*LINE_FIELDS)
+
+
+def invoice_documents(lines):
+    """
+    (invoice ID, name, rows) of each invoice's document from LINE_FIELDS rows ordered
+    by invoice.
+    """
+    for invoice_id, rows in itertools.groupby(lines, key=lambda values: values[0]):
+        rows = list(rows)
+        yield invoice_id, document_name(invoice_id, rows[0][1]), rows
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def map_bounded(executor, function, iterable, pending_limit):
+    """
+    executor.map without queuing every item at once: at most pending_limit calls are
+    submitted ahead of the result being yielded, so iterable is read as results come back.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(function, *item))
+        if len(pending) >= pending_limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def render_invoice_documents(invoices, workers=None):
+    """
+    Writes the document of each of invoices below MEDIA_ROOT with workers processes
+    (default one per core) and stores its name. Returns the number rendered.
+    """
+    workers = workers or os.cpu_count() or 1
+    lines = line_values(invoices).iterator(chunk_size=LINE_CHUNK_SIZE)
+    tasks = (
+        (settings.MEDIA_ROOT, documents)
+        for documents in chunked(invoice_documents(lines), DOCUMENTS_PER_TASK)
+    )
+
+    # Spawned rather than forked, as the workers only need invoice_documents.py and
+    # mustn't share this process's database connection or threads
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        rendered = [
+            Invoice(id=invoice_id, document=name)
+            for written in map_bounded(executor, write_invoice_documents, tasks, workers * 2)
+            for invoice_id, name in written
+        ]
+
+    Invoice.objects.bulk_update(rendered, ["document"], batch_size=1000)
+    return len(rendered)
@@ -0,0 +1,67 @@
+import os
+import time
+from email.mime.image import MIMEImage
+
+from django.core.mail import EmailMultiAlternatives
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from bookingandbilling.email_utils import LOGO_PATH, build_email, render_email
+
+TEMPLATE_NAME = "user/appointment_offered_email.html"
+CONTEXT = {
+    "first_name": "Benchmark",
+    "url": "/login/",
+    "appointment_date": "2025-01-01 09:00",
+    "appointment_time": "01:30",
+    "language": "Spanish",
+    "location": "Glasgow",
+}
+
+
+def build_uncached_email(recipient, subject, message):
+    # How every email was built before the logo was cached
+    email = EmailMultiAlternatives(subject, message, to=[recipient])
+    email.content_subtype = "html"
+    with open(LOGO_PATH, "rb") as img:
+        image = MIMEImage(img.read())
+        image.add_header("Content-ID", "<logo>")
+        image.add_header("Content-Disposition", "inline")
+        email.attach(image)
+    return email
+
+
+class Command(BaseCommand):
+    help = "Time rendering and building an email with and without the cached template and logo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000,
+            help="Number of emails built for each timing."
+        )
+
+    def time_per_email(self, count, render, build):
+        start = time.perf_counter()
+        for i in range(count):
+            message = render(TEMPLATE_NAME, CONTEXT)
+            # Serialising the message is what base64 encodes the attachment
+            email = build(f"interpreter{i}@example.com", "Appointment Offered", message)
+            email.message().as_bytes()
+        return (time.perf_counter() - start) / count * 1_000_000
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        self.stdout.write(f"Logo: {LOGO_PATH} ({os.path.getsize(LOGO_PATH)} bytes)")
+
+        # Warm both paths so the first template compile and file read aren't timed
+        self.time_per_email(1, render_to_string, build_uncached_email)
+        self.time_per_email(1, render_email, build_email)
+
+        uncached = self.time_per_email(count, render_to_string, build_uncached_email)
+        cached = self.time_per_email(count, render_email, build_email)
+
+        self.stdout.write(f"Uncached: {uncached:.1f} us per email")
+        self.stdout.write(f"Cached:   {cached:.1f} us per email")
+        self.stdout.write(f"Speedup:  {uncached / cached:.2f}x")
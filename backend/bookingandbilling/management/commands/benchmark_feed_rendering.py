@@ -0,0 +1,141 @@
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+from bookingandbilling.models import Appointment, Customer, Interpreter, Language
+from bookingandbilling.renderers import ORJSONRenderer, orjson
+from bookingandbilling.serializers.model_serializers import GetAppointmentSerializer
+from bookingandbilling.utilities import APIresponse
+from bookingandbilling.versions import APPOINTMENT_FEED_MODELS, table_versions
+
+BENCHMARK_DOMAIN = "rendering-benchmark.invalid"
+
+
+def measure(function, repeat=1):
+    """
+    Returns function's result, the fewest seconds it took over repeat runs and the peak
+    memory it allocated. The peak is measured in a separate run, as tracing allocations
+    slows everything down.
+    """
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        return result, min(timings), tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serializing an appointment feed an object at a time and in bulk, then "
+        "rendering it with DRF's JSONRenderer and the orjson renderer, with the peak memory "
+        "of each, and compare a 304 Not Modified check. The appointments are created in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=10000)
+        parser.add_argument(
+            "--interpreters",
+            type=int,
+            default=100,
+            help="Number of interpreters the appointments are shared between."
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Each step is timed this many times and the best kept."
+        )
+
+    def handle(self, *args, **options):
+        if min(options["appointments"], options["interpreters"], options["repeat"]) < 1:
+            raise CommandError("--appointments, --interpreters and --repeat must be at least 1.")
+        if orjson is None:
+            self.stdout.write("orjson isn't installed, ORJSONRenderer falls back to JSONRenderer")
+
+        with transaction.atomic():
+            self.create_feed(options["appointments"], options["interpreters"])
+            self.benchmark(options["repeat"])
+            transaction.set_rollback(True)
+
+    def create_feed(self, count, interpreter_count):
+        customer = Customer.objects.create(
+            email=f"customer@{BENCHMARK_DOMAIN}", first_name="Yogi", last_name="Bear")
+        language = Language.objects.create(language_name="Benchmark Spanish")
+        interpreters = []
+        for i in range(interpreter_count):
+            interpreter = Interpreter.objects.create(
+                email=f"interpreter{i}@{BENCHMARK_DOMAIN}", first_name="Maria", last_name="Lopez")
+            interpreter.languages.add(language)
+            interpreters.append(interpreter)
+
+        start = timezone.make_aware(datetime(2024, 1, 1, 9, 0))
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=customer,
+                interpreter=interpreters[i % interpreter_count],
+                language=language,
+                planned_start_time=start + timedelta(hours=i),
+                planned_end_time=start + timedelta(hours=i, minutes=90),
+                planned_duration_minutes=90,
+                location=f"Glasgow Royal Infirmary, ward {i % 40}",
+                company="NHS Greater Glasgow"
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        self.customer = customer
+
+        # Plan the queries for the rows just created, as autovacuum would have
+        with connection.cursor() as cursor:
+            for model in [Appointment, Interpreter, Interpreter.languages.through,
+                          Customer.__base__]:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def benchmark(self, repeat):
+        appointments = Appointment.objects.filter(customer=self.customer)
+
+        def per_object():
+            # How a feed was serialized before AppointmentListSerializer
+            return ListSerializer(
+                GetAppointmentSerializer.setup_eager_loading(appointments),
+                child=GetAppointmentSerializer()
+            ).data
+
+        def bulk():
+            return GetAppointmentSerializer(appointments, many=True).data
+
+        for name, serialize in [("per object", per_object), ("in bulk", bulk)]:
+            result, seconds, peak = measure(serialize, repeat)
+            self.stdout.write(
+                f"Query and serialize {len(result)} appointments {name}: "
+                f"{seconds * 1000:.0f} ms, peak {megabytes(peak)}"
+            )
+        data = APIresponse(result).data
+
+        for name, renderer in [("JSONRenderer", JSONRenderer()),
+                               ("ORJSONRenderer", ORJSONRenderer())]:
+            body, seconds, peak = measure(lambda: renderer.render(data), repeat)
+            self.stdout.write(
+                f"Render with {name}: {seconds * 1000:.0f} ms, peak {megabytes(peak)}, "
+                f"{megabytes(len(body))} of JSON"
+            )
+
+        _versions, seconds, _peak = measure(lambda: table_versions(APPOINTMENT_FEED_MODELS))
+        self.stdout.write(f"Not modified check (table versions): {seconds * 1000:.1f} ms")
@@ -0,0 +1,93 @@
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from bookingandbilling.invoicing import generate_invoices, render_invoice_documents
+from bookingandbilling.models import Appointment, Customer, Invoice, Language, Translation
+
+BENCHMARK_DOMAIN = "invoice-benchmark.invalid"
+# Only the benchmark's customers are invoiced, for a month no real appointments are in
+PERIOD = (date(1990, 1, 1), date(1990, 2, 1))
+
+
+class Command(BaseCommand):
+    help = (
+        "Time generating invoices for a month of completed appointments and translations "
+        "shared between a number of customers, then rendering their documents into a "
+        "temporary directory. The rows are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appointments", type=int, default=20000)
+        parser.add_argument("--translations", type=int, default=5000)
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if min(options["appointments"], options["translations"], options["customers"]) < 1:
+            raise CommandError("--appointments, --translations and --customers must be at least 1.")
+
+        with transaction.atomic():
+            customer_ids = self.create_work(
+                options["appointments"], options["translations"], options["customers"])
+            self.benchmark(customer_ids, options["workers"])
+            transaction.set_rollback(True)
+
+    def create_work(self, appointment_count, translation_count, customer_count):
+        # Customers are multi-table inherited, so can't be bulk created
+        customers = [
+            Customer.objects.create(
+                email=f"customer{i}@{BENCHMARK_DOMAIN}", first_name="Yogi", last_name="Bear")
+            for i in range(customer_count)
+        ]
+        language = Language.objects.create(language_name="Benchmark Spanish")
+
+        start = timezone.make_aware(datetime.combine(PERIOD[0], datetime.min.time()))
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=customers[i % customer_count],
+                language=language,
+                planned_start_time=start + timedelta(minutes=i),
+                planned_end_time=start + timedelta(minutes=i + 60),
+                planned_duration_minutes=60,
+                actual_duration_minutes=45 + i % 30,
+                location="Glasgow"
+            )
+            for i in range(appointment_count)
+        ], batch_size=5000)
+        Translation.objects.bulk_create([
+            Translation(
+                customer=customers[i % customer_count],
+                language=language,
+                word_count=1000,
+                actual_word_count=900 + i % 200,
+                document=f"translation_documents/benchmark{i}.pdf"
+            )
+            for i in range(translation_count)
+        ], batch_size=5000)
+        return [customer.id for customer in customers]
+
+    def benchmark(self, customer_ids, workers):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            invoices = list(generate_invoices(*PERIOD, customers=customer_ids))
+            seconds = time.perf_counter() - start
+
+        lines = sum(invoice.appointment_count + invoice.translation_count
+                    for invoice in invoices)
+        self.stdout.write(
+            f"Generated {len(invoices)} invoices with {lines} lines in "
+            f"{seconds * 1000:.0f} ms and {len(context.captured_queries)} queries"
+        )
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            start = time.perf_counter()
+            rendered = render_invoice_documents(
+                Invoice.objects.filter(id__in=[invoice.id for invoice in invoices]), workers)
+            seconds = time.perf_counter() - start
+        self.stdout.write(f"Rendered {rendered} invoice documents in {seconds * 1000:.0f} ms")
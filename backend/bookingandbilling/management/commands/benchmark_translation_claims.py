@@ -0,0 +1,101 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from bookingandbilling.models import Customer, Interpreter, Language, Translation
+from bookingandbilling.offers import AlreadyClaimed, claim_offer
+
+BENCHMARK_DOMAIN = "claims-benchmark.invalid"
+
+
+def contend(translation_ids, interpreters):
+    """
+    Has every interpreter try to claim every translation at once, each from its own
+    thread and database connection, in its own random order.
+    Returns the translation ids each interpreter won and the seconds taken.
+    """
+    barrier = Barrier(len(interpreters))
+
+    def claim_as(interpreter):
+        won = []
+        try:
+            barrier.wait()
+            for translation_id in random.sample(translation_ids, len(translation_ids)):
+                try:
+                    with transaction.atomic():
+                        claim_offer(Translation, translation_id, interpreter)
+                    won.append(translation_id)
+                except AlreadyClaimed:
+                    pass
+        finally:
+            connection.close()
+        return interpreter.id, won
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(interpreters)) as executor:
+        results = dict(executor.map(claim_as, interpreters))
+    return results, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Time N interpreters claiming M translations offered to all of them at once and "
+        "check every translation ends up with exactly one interpreter. Creates and then "
+        "deletes its own rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interpreters", type=int, default=10, help="Number of threads.")
+        parser.add_argument("--translations", type=int, default=100)
+
+    def handle(self, *args, **options):
+        customer = Customer.objects.create(email=f"customer@{BENCHMARK_DOMAIN}")
+        interpreters = [
+            Interpreter.objects.create(email=f"interpreter{i}@{BENCHMARK_DOMAIN}")
+            for i in range(options["interpreters"])
+        ]
+        language, _created = Language.objects.get_or_create(language_name="Benchmark")
+
+        try:
+            translations = Translation.objects.bulk_create([
+                Translation(customer=customer, language=language, word_count=1)
+                for _ in range(options["translations"])
+            ])
+            Translation.offered_to.through.objects.bulk_create([
+                Translation.offered_to.through(translation=translation, interpreter=interpreter)
+                for translation in translations
+                for interpreter in interpreters
+            ])
+
+            translation_ids = [translation.id for translation in translations]
+            results, elapsed = contend(translation_ids, interpreters)
+
+            attempts = len(translation_ids) * len(interpreters)
+            self.stdout.write(
+                f"{attempts} claims by {len(interpreters)} interpreters in {elapsed:.2f}s "
+                f"({attempts / elapsed:.0f} claims/s, "
+                f"{len(translation_ids) / elapsed:.0f} translations assigned/s)"
+            )
+
+            won = [translation_id for ids in results.values() for translation_id in ids]
+            assigned = dict(Translation.objects.filter(
+                id__in=translation_ids
+            ).values_list("id", "interpreter_id"))
+            winners = {
+                translation_id: interpreter_id
+                for interpreter_id, ids in results.items() for translation_id in ids
+            }
+            if sorted(won) != sorted(translation_ids) or assigned != winners:
+                raise CommandError("A translation did not end up with exactly one interpreter.")
+            self.stdout.write("Every translation was claimed by exactly one interpreter.")
+        finally:
+            Translation.objects.filter(customer=customer).delete()
+            customer.delete()
+            for interpreter in interpreters:
+                interpreter.delete()
+            if _created:
+                language.delete()
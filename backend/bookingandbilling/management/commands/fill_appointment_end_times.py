@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F
+from django.core.management.base import BaseCommand
+
+from bookingandbilling.models import Appointment
+
+
+class Command(BaseCommand):
+    help = "Fill in planned_end_time for appointments saved before it was added."
+
+    def handle(self, *args, **options):
+        updated = Appointment.objects.filter(planned_end_time__isnull=True).update(
+            planned_end_time=ExpressionWrapper(
+                F("planned_start_time") + ExpressionWrapper(
+                    F("planned_duration_minutes") * timedelta(minutes=1),
+                    output_field=DurationField()
+                ),
+                output_field=DateTimeField()
+            )
+        )
+        self.stdout.write(f"Filled in {updated} appointment end time(s).")
@@ -0,0 +1,19 @@
+from django.db.models.functions import ExtractHour, ExtractMinute
+from django.core.management.base import BaseCommand
+
+from bookingandbilling.models import Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy planned_duration and actual_duration into planned_duration_minutes and "
+        "actual_duration_minutes for appointments saved before they were added."
+    )
+
+    def handle(self, *args, **options):
+        for legacy, minutes in [("planned_duration", "planned_duration_minutes"),
+                                ("actual_duration", "actual_duration_minutes")]:
+            updated = Appointment.objects.filter(
+                **{f"{minutes}__isnull": True, f"{legacy}__isnull": False}
+            ).update(**{minutes: ExtractHour(legacy) * 60 + ExtractMinute(legacy)})
+            self.stdout.write(f"Filled in {updated} appointment {minutes} value(s).")
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from bookingandbilling.invoicing import generate_invoices, parse_period
+
+
+def last_month():
+    first_of_this_month = timezone.localdate().replace(day=1)
+    return (first_of_this_month - timedelta(days=1)).strftime("%Y-%m")
+
+
+class Command(BaseCommand):
+    help = (
+        "Invoice each customer for their completed, uninvoiced appointments in a month "
+        "and their completed, uninvoiced translations, and mark them invoiced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            default=None,
+            help="Month to invoice appointments for, as YYYY-MM. Defaults to last month."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            period_start, period_end = parse_period(options["period"] or last_month())
+        except ValueError:
+            raise CommandError("--period must be a month as YYYY-MM.")
+
+        totals = generate_invoices(period_start, period_end).aggregate(
+            invoices=Count("id"),
+            appointments=Sum("appointment_count", default=0),
+            translations=Sum("translation_count", default=0)
+        )
+        self.stdout.write(
+            f"Generated {totals['invoices']} invoice(s) for {period_start:%B %Y} covering "
+            f"{totals['appointments']} appointment(s) and {totals['translations']} "
+            f"translation(s)."
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookingandbilling.invoicing import parse_period, render_invoice_documents
+from bookingandbilling.management.commands.generate_invoices import last_month
+from bookingandbilling.models import Invoice
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the document of each of a month's invoices below MEDIA_ROOT, with a pool "
+        "of worker processes, for customers and admins to download."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            default=None,
+            help="Month of the invoices to render, as YYYY-MM. Defaults to last month."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker processes to render with. Defaults to one per core."
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Render invoices that already have a document again."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            period_start, period_end = parse_period(options["period"] or last_month())
+        except ValueError:
+            raise CommandError("--period must be a month as YYYY-MM.")
+        if options["workers"] is not None and options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        invoices = Invoice.objects.filter(period_start=period_start)
+        if not options["force"]:
+            invoices = invoices.filter(document="")
+
+        rendered = render_invoice_documents(invoices, options["workers"])
+        self.stdout.write(
+            f"Rendered {rendered} invoice document(s) for {period_start:%B %Y}."
+        )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from bookingandbilling.email_utils import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver emails from the outbox over a single persistent email connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Number of emails sent per batch."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before checking an empty outbox again."
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the emails currently due and exit instead of running as a worker."
+        )
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+
+        try:
+            while True:
+                sent, failed = send_queued_emails(connection, options["batch_size"])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+                    continue
+
+                if options["once"]:
+                    break
+
+                # Don't hold the SMTP session open while the outbox is empty
+                connection.close()
+                time.sleep(options["interval"])
+        finally:
+            connection.close()
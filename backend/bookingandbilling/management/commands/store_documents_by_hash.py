@@ -0,0 +1,46 @@
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from bookingandbilling.models import Translation
+from bookingandbilling.uploads import digest_file, store_document, stored_document_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Move translation documents stored before hashing, or under an uploader's file "
+        "name, into SHA-256 addressed storage, keeping each upload's file name."
+    )
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        translations = Translation.objects.exclude(document="").only(
+            "id", "document", "document_sha256", "document_name"
+        )
+
+        for translation in translations.iterator():
+            old_name = translation.document.name
+            sha256 = translation.document_sha256
+            if sha256 and old_name == stored_document_name(sha256, old_name):
+                continue
+            if not default_storage.exists(old_name):
+                self.stderr.write(f"Translation {translation.id}: {old_name} is missing.")
+                missing += 1
+                continue
+
+            with default_storage.open(old_name, "rb") as document:
+                sha256 = sha256 or digest_file(document).hexdigest()
+                name = store_document(File(document.file, os.path.basename(old_name)), sha256)
+
+            Translation.objects.filter(id=translation.id).update(
+                document=name,
+                document_sha256=sha256,
+                document_name=translation.document_name or os.path.basename(old_name)
+            )
+            if name != old_name and not Translation.objects.filter(document=old_name).exists():
+                default_storage.delete(old_name)
+            moved += 1
+
+        self.stdout.write(f"Stored {moved} document(s) by hash, {missing} missing.")
@@ -0,0 +1,71 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .availability import booked_appointments
+from .models import Appointment, Gender, Interpreter
+
+# Candidate interpreters for an appointment, ranked for offering.
+# Interpreter.languages and Interpreter.tag are stored in join tables indexed on both
+# columns, which act as the language -> interpreters and tag -> interpreters inverted
+# indexes: every condition below is an EXISTS probe of one of those indexes (or of the
+# appointment_booked_period_idx range index), so the database only ever visits the
+# interpreters that could match rather than loading them all to filter in Python.
+
+# Preferences that don't narrow down who can be sent
+ANY_GENDER = (None, "", Gender.PREFER_NOT_TO_SAY)
+
+
+def upcoming_appointment_count():
+    """
+    Number of active appointments an interpreter has from now on, used to spread
+    work between equally suitable interpreters.
+    """
+    return Coalesce(
+        Subquery(
+            Appointment.objects.filter(
+                interpreter=OuterRef("pk"),
+                active=True,
+                planned_start_time__gte=timezone.now()
+            ).order_by().values("interpreter").annotate(count=Count("id")).values("count"),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def candidate_interpreters(appointment, tag_ids=()):
+    """
+    Interpreters who speak the appointment's language, match its gender preference,
+    have every tag in tag_ids and are free for its planned time, with the interpreters
+    who have the fewest upcoming appointments first.
+    """
+    interpreters = Interpreter.objects.filter(
+        Exists(Interpreter.languages.through.objects.filter(
+            interpreter=OuterRef("pk"),
+            language=appointment.language_id
+        ))
+    )
+
+    if appointment.gender_preference not in ANY_GENDER:
+        interpreters = interpreters.filter(gender=appointment.gender_preference)
+
+    for tag_id in set(tag_ids):
+        interpreters = interpreters.filter(
+            Exists(Interpreter.tag.through.objects.filter(
+                interpreter=OuterRef("pk"),
+                tag=tag_id
+            ))
+        )
+
+    booked = booked_appointments(
+        appointment.planned_start_time, appointment.planned_end_time
+    ).filter(interpreter=OuterRef("pk")).exclude(id=appointment.id)
+
+    return interpreters.filter(~Exists(booked)).annotate(
+        upcoming_appointments=upcoming_appointment_count(),
+        already_offered=Exists(Appointment.offered_to.through.objects.filter(
+            interpreter=OuterRef("pk"),
+            appointment=appointment.id
+        ))
+    ).order_by("upcoming_appointments", "id")
@@ -0,0 +1,122 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+# Serving of permission checked media files.
+# With PROTECTED_MEDIA_ACCEL_REDIRECT on, Django only answers with an X-Accel-Redirect to
+# an internal nginx location and nginx sends the file itself (with sendfile, and its own
+# Range and ETag handling), so a download doesn't hold a gunicorn worker.
+
+ACCEL_REDIRECT = getattr(settings, "PROTECTED_MEDIA_ACCEL_REDIRECT", False)
+ACCEL_REDIRECT_PREFIX = getattr(
+    settings, "PROTECTED_MEDIA_ACCEL_PREFIX", "/protected-media-internal/"
+)
+FILE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat):
+    # Same form nginx uses, so the ETag doesn't change when switching modes
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) of a single byte range, None if the header should be ignored
+    (missing or several ranges) and raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header or "")
+    if match is None:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last n bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable.")
+    return start, end
+
+
+def iter_file_range(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_protected_file(request, file_path, internal_path, download_name=None):
+    """
+    Returns the response for a file the user is already allowed to read.
+    internal_path is the file's path below the internal nginx location, and
+    download_name the file name to offer (the file's own name by default).
+    """
+    stat = os.stat(file_path)
+    etag = file_etag(stat)
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    content_type, encoding = mimetypes.guess_type(file_path)
+    content_type = content_type or "application/octet-stream"
+    disposition = content_disposition_header(
+        False, download_name or os.path.basename(file_path))
+
+    if ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = ACCEL_REDIRECT_PREFIX + quote(internal_path)
+        response["Content-Disposition"] = disposition
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    # A stale If-Range means the client's partial copy is out of date, so send it all
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        iter_file_range(file_path, start, length),
+        content_type=content_type,
+        status=206 if byte_range else 200
+    )
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(length)
+    response["Content-Disposition"] = disposition
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
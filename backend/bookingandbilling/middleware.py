@@ -1,22 +1,54 @@
+from django.utils.translation import gettext_lazy as _
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 
+from .auth_cache import token_cache
+
 # Method of authenticating API requests using HTTP-Only cookies
 class CookieTokenAuthentication(TokenAuthentication):
     def authenticate(self, request):
         token = request.COOKIES.get('authToken')
         if not token:
             return None
+
+        cached = token_cache.get(token)
+        if cached is not None:
+            token_object, user_type = cached
+            token_object.user.account_type = user_type
+            return (token_object.user, token_object)
         
         try:
-            return self.authenticate_credentials(token)
+            user, token_object = self.authenticate_credentials(token)
         except AuthenticationFailed:
             response = Response({"detail": "invalid-token"}, status=401)
             response.delete_cookie('authToken')
             request._auth_failed_response = response
             raise AuthenticationFailed("Invalid Token")
 
+        # The account type is resolved once here and attached for the views to use
+        from .views.views_utility import get_full_user
+        _full_user, user_type = get_full_user(user)
+        if user_type is not None:
+            user.account_type = user_type
+            token_cache.set(token, token_object, user_type)
+        return (user, token_object)
+
+    def authenticate_credentials(self, key):
+        # Same checks as TokenAuthentication, but the user's Admin/Interpreter/Customer
+        # row is joined into the token query so resolving the account type is free
+        from .views.views_utility import account_type_lookups
+        model = self.get_model()
+        try:
+            token = model.objects.select_related(*account_type_lookups("user__")).get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
 # Middleware to allow cross-origin for API
 class ApiMiddleware:
     def __init__(self, get_response):
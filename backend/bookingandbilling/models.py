@@ -1,12 +1,47 @@
 from django.db import models
-from django.core.validators import validate_email, RegexValidator
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector
+from django.db.models import CharField, Func, Q
+from django.core.validators import MinValueValidator, validate_email, RegexValidator
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import BaseUserManager
+from django.utils import timezone
+from datetime import timedelta
+from .access_cache import access_cache
+from .auth_cache import token_cache
+import os
+import uuid
+
+class TsTzRange(Func):
+    # Postgres timestamp range, [start, end) so back to back periods don't overlap
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+class EmailWords(Func):
+    # "yogi.bear@jellystone.com" -> "yogi bear jellystone com", so each part can be searched
+    function = "REGEXP_REPLACE"
+    template = "%(function)s(%(expressions)s, '[@.]', ' ', 'g')"
+    output_field = CharField()
+
+
+# Free text search (see filters.py and search.py). The GIN indexes are built over the
+# same expression the searches query, which Postgres needs to match before it uses an index.
+APPOINTMENT_SEARCH_FIELDS = ("location", "company")
+TRANSLATION_SEARCH_FIELDS = ("company",)
+USER_SEARCH_FIELDS = ("first_name", "last_name", EmailWords("email"))
+CUSTOMER_SEARCH_FIELDS = ("organisation",)
+
+
+def search_vector(fields):
+    return SearchVector(*fields, config="simple")
+
 
 class Gender(models.TextChoices):
     MALE = "M", "Male",
@@ -21,6 +56,14 @@ class AccountType(models.TextChoices):
     CUSTOMER = "C", "Customer",
 
 
+# Reverse one-to-one from User to the model for each account type
+ACCOUNT_TYPE_RELATIONS = {
+    AccountType.ADMIN: "admin",
+    AccountType.INTERPRETER: "interpreter",
+    AccountType.CUSTOMER: "customer",
+}
+
+
 def hex_color_validator(value):
     regex = r"^#[a-fA-F0-9]{6}$"
     message = "Colour must be a valid hexcode including the #"
@@ -108,6 +151,11 @@ class User(AbstractUser):
     # Attach the custom user manager
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(search_vector(USER_SEARCH_FIELDS), name="user_search_idx"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -153,6 +201,9 @@ class Customer(User):
 
     class Meta:
         verbose_name = "Customer" # For django admin interface 
+        indexes = [
+            GinIndex(search_vector(CUSTOMER_SEARCH_FIELDS), name="customer_search_idx"),
+        ]
 
 
 class Appointment(models.Model):
@@ -164,7 +215,15 @@ class Appointment(models.Model):
         related_name="appointments"
     )
     planned_start_time = models.DateTimeField()
-    planned_duration = models.TimeField()
+    # Whole minutes (see durations.py). Only null in the database for appointments saved
+    # before it was added, until fill_duration_minutes has copied planned_duration over
+    planned_duration_minutes = models.PositiveIntegerField(
+        null=True,
+        validators=[MinValueValidator(1)]
+    )
+    # Kept in step with the two fields above by save(), so overlaps can be found with
+    # an index instead of parsing every duration (see availability.py)
+    planned_end_time = models.DateTimeField(blank=True, null=True, editable=False)
     location = models.CharField() # Should be a Location model?
     language = models.ForeignKey(
         Language,
@@ -190,7 +249,11 @@ class Appointment(models.Model):
     )
     company = models.CharField(blank=True, null=True)
     actual_start_time = models.DateTimeField(blank=True, null=True)
-    actual_duration = models.TimeField(blank=True, null=True)
+    actual_duration_minutes = models.PositiveIntegerField(blank=True, null=True)
+    # Superseded by the *_minutes fields above and no longer written, kept until
+    # fill_duration_minutes has run on every database
+    planned_duration = models.TimeField(blank=True, null=True, editable=False)
+    actual_duration = models.TimeField(blank=True, null=True, editable=False)
     # Should be an enum (like gender?)
     status = models.CharField(default="Upcoming")
     gender_preference = models.CharField(
@@ -209,6 +272,55 @@ class Appointment(models.Model):
     )
     invoice_generated = models.BooleanField(default=False)
 
+    class Meta:
+        # Feeds are ordered by (planned_start_time, id), see pagination.py
+        indexes = [
+            models.Index(
+                fields=["planned_start_time", "id"],
+                condition=Q(active=True, interpreter__isnull=True),
+                name="appointment_unassigned_idx"
+            ),
+            models.Index(
+                fields=["planned_start_time", "id"],
+                condition=Q(active=True, interpreter__isnull=False),
+                name="appointment_assigned_idx"
+            ),
+            models.Index(
+                fields=["customer", "planned_start_time", "id"],
+                name="appointment_customer_idx"
+            ),
+            models.Index(
+                fields=["interpreter", "planned_start_time", "id"],
+                name="appointment_interpreter_idx"
+            ),
+            GistIndex(
+                # The bookings availability.booked_appointments() looks for overlaps in
+                TsTzRange("planned_start_time", "planned_end_time"),
+                condition=Q(
+                    active=True, interpreter__isnull=False, planned_end_time__isnull=False
+                ),
+                name="appointment_booked_period_idx"
+            ),
+            GinIndex(
+                search_vector(APPOINTMENT_SEARCH_FIELDS),
+                name="appointment_search_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        start = self._meta.get_field("planned_start_time").to_python(self.planned_start_time)
+        minutes = self.planned_duration_minutes
+        self.planned_end_time = None
+        if start is not None and minutes is not None:
+            self.planned_end_time = start + timedelta(minutes=int(minutes))
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {
+            "planned_start_time", "planned_duration_minutes"
+        } & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "planned_end_time"}
+        super().save(*args, **kwargs)
+
 
 def validate_non_zero(value):
     if value == 0:
@@ -232,7 +344,11 @@ class Translation(models.Model):
         null=True,
         validators=[validate_non_zero]
     )
-    document = models.FileField(blank=False, upload_to="translation_documents/")
+    document = models.FileField(
+        blank=False,
+        upload_to="translation_documents/",
+        max_length=255
+    )
     language = models.ForeignKey(
         Language,
         null=True,
@@ -264,8 +380,208 @@ class Translation(models.Model):
         blank=True
     )
     invoice_generated = models.BooleanField(default=False)
+    document_sha256 = models.CharField(max_length=64, blank=True, null=True)
+    # The uploader's file name, sent as the download name. The stored file is named after
+    # its content and may be shared with other uploads (see uploads.store_document).
+    document_name = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=Q(active=True, interpreter__isnull=True),
+                name="translation_unassigned_idx"
+            ),
+            models.Index(
+                fields=["customer", "id"],
+                name="translation_customer_idx"
+            ),
+            models.Index(
+                fields=["document_sha256"],
+                name="translation_document_idx"
+            ),
+            GinIndex(
+                search_vector(TRANSLATION_SEARCH_FIELDS),
+                name="translation_search_idx"
+            ),
+        ]
+
+class TranslationUpload(models.Model):
+    """
+    A translation document being uploaded in chunks. The received bytes are appended
+    to a part file outside translation_documents/ until offset reaches size.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name="translation_uploads"
+    )
+    document_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.MEDIA_ROOT, "translation_uploads", f"{self.id}.part")
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+class Invoice(models.Model):
+    """
+    A customer's completed work for a billing period, written by generate_invoices
+    (see invoicing.py). The totals are summed from its lines by the database.
+    """
+    customer = models.ForeignKey(
+        Customer,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="invoices"
+    )
+    # Appointments starting in [period_start, period_end) are billed
+    period_start = models.DateField()
+    period_end = models.DateField()
+    created = models.DateTimeField(auto_now_add=True)
+    appointment_count = models.PositiveIntegerField(default=0)
+    billed_minutes = models.PositiveIntegerField(default=0)
+    translation_count = models.PositiveIntegerField(default=0)
+    billed_words = models.PositiveIntegerField(default=0)
+    # Written by render_invoices (see invoicing.render_invoice_documents), empty until then
+    document = models.FileField(
+        blank=True,
+        upload_to="invoice_documents/",
+        max_length=255
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["customer", "period_start"],
+                name="invoice_customer_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Invoice {self.id} for {self.period_start} to {self.period_end}"
+
+
+class InvoiceLine(models.Model):
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        related_name="lines"
+    )
+    # The work billed, one of these is set when the line is written
+    appointment = models.ForeignKey(
+        Appointment,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="invoice_lines"
+    )
+    translation = models.ForeignKey(
+        Translation,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="invoice_lines"
+    )
+    # The appointment's actual duration in minutes, or the translation's actual word count
+    quantity = models.PositiveIntegerField()
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = "P", "Pending",
+    SENT = "S", "Sent",
+    FAILED = "F", "Failed",
+
+
+class QueuedEmail(models.Model):
+    # required
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    # not required
+    status = models.CharField(
+        max_length=1,
+        choices=EmailStatus.choices,
+        default=EmailStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Queued Email" # For django admin interface
+        indexes = [
+            models.Index(
+                fields=["next_attempt"],
+                condition=Q(status=EmailStatus.PENDING),
+                name="queuedemail_pending_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient}"
+
+
+class TableVersion(models.Model):
+    # The number of writes to a versioned table folded in from TableChange (see versions.py)
+    table = models.CharField(max_length=63, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class TableChange(models.Model):
+    # Added by a database trigger for each statement that writes to a versioned table
+    table = models.CharField(max_length=63, db_index=True)
+
+    def __str__(self):
+        return f"{self.table} change {self.id}"
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
-        Token.objects.create(user=instance)
\ No newline at end of file
+        Token.objects.create(user=instance)
+
+
+# Cached authentication must not outlive changes to the user (e.g. password, approval).
+# Saving an account sends the signals for its own model, not User's.
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Admin)
+@receiver([post_save, post_delete], sender=Interpreter)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_cached_user(sender, instance=None, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    access_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance=None, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+# Cached media access decisions must not outlive changes to who a translation belongs to
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+def invalidate_cached_translation_access(sender, instance=None, **kwargs):
+    access_cache.invalidate_translations([instance.pk])
+
+
+@receiver(m2m_changed, sender=Translation.offered_to.through)
+def invalidate_cached_offer_access(sender, instance=None, reverse=False, pk_set=None, **kwargs):
+    if not reverse:
+        access_cache.invalidate_translations([instance.pk])
+    elif pk_set is not None:
+        access_cache.invalidate_translations(pk_set)
+    else:
+        # Reverse clear() doesn't say which translations were affected
+        access_cache.invalidate_user(instance.pk)
@@ -0,0 +1,51 @@
+from django.db import transaction
+
+from .access_cache import access_cache
+from .models import Translation
+
+# First accept wins claiming of offered appointments and translations.
+# The claim is a single conditional UPDATE ... WHERE interpreter_id IS NULL, so when several
+# offered interpreters accept at once the database lets exactly one of them through and
+# the rest see no row updated, however their requests interleave.
+
+
+class NotOffered(Exception):
+    pass
+
+
+class AlreadyClaimed(Exception):
+    pass
+
+
+def claim_offer(model, object_id, interpreter):
+    """
+    Assigns an offered appointment or translation to the interpreter and withdraws
+    its other offers. Raises NotOffered if it wasn't offered to the interpreter and
+    AlreadyClaimed if another interpreter accepted it first.
+
+    Must run inside a transaction so the claim and the withdrawn offers commit together.
+    """
+    offers = model.offered_to.through.objects
+    offer_field = f"{model._meta.model_name}_id"
+
+    if not offers.filter(**{offer_field: object_id}, interpreter_id=interpreter.pk).exists():
+        # Accepting clears the offers, so a lost race usually ends up here
+        if model.objects.filter(pk=object_id, interpreter__isnull=False).exists():
+            raise AlreadyClaimed()
+        raise NotOffered()
+
+    # No joins in the filter, so Postgres rechecks interpreter_id IS NULL against the
+    # latest row version when it waits on a concurrent claim of the same row
+    claimed = model.objects.filter(
+        pk=object_id,
+        interpreter__isnull=True
+    ).update(interpreter=interpreter)
+    if not claimed:
+        raise AlreadyClaimed()
+
+    offers.filter(**{offer_field: object_id}).delete()
+
+    # The bulk UPDATE and DELETE skip the signals that keep cached document access current.
+    # Dropped once the claim commits, so a read in the meantime can't cache the old answer.
+    if model is Translation:
+        transaction.on_commit(lambda: access_cache.invalidate_translations([object_id]))
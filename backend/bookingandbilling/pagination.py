@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.db.models import Q
+
+# Keyset (cursor) pagination for the list feeds.
+# Pages are found by filtering on the ordering columns of the last seen row rather than
+# with OFFSET, so each page costs the same regardless of how far into the feed it is.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    def __init__(self, ordering):
+        # ordering must end in the primary key so that rows never tie
+        self.ordering = ordering
+
+    def is_requested(self, request):
+        params = request.query_params
+        return "cursor" in params or "page_size" in params
+
+    def paginate(self, request, queryset):
+        """
+        Returns a queryset of the requested page and a dict of next/prev cursors.
+        Raises InvalidCursor if the cursor or page size can't be parsed.
+
+        Only the ordering keys are read to find the page, the page itself is returned as
+        a queryset so serializers can still plan their related lookups on it.
+        """
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get("cursor")
+
+        reverse = False
+        if cursor:
+            reverse, values = self.decode_cursor(queryset.model, cursor)
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+
+        ordering = [f"-{field}" if reverse else field for field in self.ordering]
+        keys = list(queryset.order_by(*ordering).values_list(*self.ordering)[:page_size + 1])
+
+        has_more = len(keys) > page_size
+        keys = keys[:page_size]
+        if reverse:
+            keys.reverse()
+
+        next_cursor = None
+        prev_cursor = None
+
+        # Coming from a cursor means there are rows on the side we came from
+        if keys and reverse:
+            next_cursor = self.encode_cursor(keys[-1], reverse=False)
+            if has_more:
+                prev_cursor = self.encode_cursor(keys[0], reverse=True)
+        elif keys:
+            if has_more:
+                next_cursor = self.encode_cursor(keys[-1], reverse=False)
+            if cursor:
+                prev_cursor = self.encode_cursor(keys[0], reverse=True)
+
+        page = queryset.filter(pk__in=[key[-1] for key in keys]).order_by(*self.ordering)
+        return page, {"next": next_cursor, "prev": prev_cursor}
+
+    def paginate_if_requested(self, request, queryset):
+        """
+        Feeds are only paginated when the client asks for it (cursor or page_size given),
+        otherwise the whole ordered queryset is returned with no cursors.
+        """
+        if not self.is_requested(request):
+            return queryset.order_by(*self.ordering), None
+        return self.paginate(request, queryset)
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get("page_size", DEFAULT_PAGE_SIZE)
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Page size must be an integer.")
+
+        if page_size < 1:
+            raise InvalidCursor("Page size must be positive.")
+        return min(page_size, MAX_PAGE_SIZE)
+
+    def keyset_filter(self, values, reverse):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {f: values[f] for f in self.ordering[:i]}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[field]})
+        return condition
+
+    def encode_cursor(self, values, reverse):
+        payload = {
+            "r": reverse,
+            "v": [value.isoformat() if hasattr(value, "isoformat") else value
+                  for value in values],
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, model, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            reverse = bool(payload["r"])
+            values = {
+                field: model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, payload["v"], strict=True)
+            }
+        except Exception:
+            raise InvalidCursor("Cursor is invalid.")
+        return reverse, values
+
+
+APPOINTMENT_PAGINATOR = KeysetPaginator(("planned_start_time", "id"))
+TRANSLATION_PAGINATOR = KeysetPaginator(("id",))
+INTERPRETER_PAGINATOR = KeysetPaginator(("id",))
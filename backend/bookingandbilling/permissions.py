@@ -1,5 +1,9 @@
+from django.db.models import Exists, OuterRef, Q
 from rest_framework.permissions import BasePermission
 
+from .access_cache import access_cache
+from .models import AccountType, Translation
+
 # Based on https://stackoverflow.com/a/31275034, CC BY-SA 3.0
 class IsAuthenticatedOrOptions(BasePermission):
     """
@@ -9,4 +13,70 @@ class IsAuthenticatedOrOptions(BasePermission):
     def has_permission(self, request, view):
         return (
             request.method == 'OPTIONS' or request.user and request.user.is_authenticated
-        )
\ No newline at end of file
+        )
+
+
+def readable_translations(user, user_type, translations):
+    """
+    The translations the user may read the document of. Admins may read any,
+    interpreters those assigned or offered to them and customers their own.
+    """
+    if user_type == AccountType.ADMIN:
+        return translations
+    if user_type == AccountType.INTERPRETER:
+        offered = Translation.offered_to.through.objects.filter(
+            translation_id=OuterRef("pk"),
+            interpreter_id=user.pk
+        )
+        return translations.filter(Q(interpreter_id=user.pk) | Exists(offered))
+    if user_type == AccountType.CUSTOMER:
+        return translations.filter(customer_id=user.pk)
+    return translations.none()
+
+
+def can_read_translation(user, user_type, translation_id):
+    """
+    Whether the user may read the document of a translation (see readable_translations).
+
+    Answered with a single EXISTS query on the translation's primary key (and the
+    offered_to join table for interpreters), then cached briefly per user.
+    """
+    if user is None or user_type is None:
+        return False
+
+    allowed = access_cache.get(user.pk, translation_id)
+    if allowed is not None:
+        return allowed
+
+    allowed = readable_translations(
+        user, user_type, Translation.objects.filter(pk=translation_id)
+    ).exists()
+    access_cache.set(user.pk, translation_id, allowed)
+    return allowed
+
+
+def can_read_any_translation(user, user_type, translation_ids):
+    """
+    Whether the user may read the document of any of the translations, such as those
+    sharing one stored file. Answered with a single EXISTS query however many there are.
+    """
+    if user is None or user_type is None:
+        return False
+    if len(translation_ids) == 1:
+        return can_read_translation(user, user_type, translation_ids[0])
+
+    return readable_translations(
+        user, user_type, Translation.objects.filter(pk__in=translation_ids)
+    ).exists()
+
+
+def can_read_invoice(user, user_type, invoice):
+    """
+    Whether the user may read the document of an invoice. Admins may read any and
+    customers their own.
+    """
+    if user is None or user_type is None:
+        return False
+    if user_type == AccountType.ADMIN:
+        return True
+    return user_type == AccountType.CUSTOMER and invoice.customer_id == user.pk
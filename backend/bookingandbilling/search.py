@@ -0,0 +1,92 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Value
+
+from .filters import search_query
+from .models import (
+    ACCOUNT_TYPE_RELATIONS,
+    APPOINTMENT_SEARCH_FIELDS,
+    CUSTOMER_SEARCH_FIELDS,
+    USER_SEARCH_FIELDS,
+    AccountType,
+    Appointment,
+    Customer,
+    EmailWords,
+    User,
+    search_vector
+)
+
+# Full text search of users and appointments for the admin search box.
+# Every search is answered from a GIN index (user_search_idx, customer_search_idx,
+# appointment_search_idx), and only the best `limit` matches of each kind are returned,
+# so the response stays the same size however many users there are.
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+
+def text_query(text, autocomplete):
+    """
+    With autocomplete every word matches as a prefix, for searching while typing.
+    Otherwise whole words are matched and web search syntax ("quoted phrases", or,
+    -excluded) is understood. Raises ValueError if there is nothing to search for.
+    """
+    if autocomplete:
+        return search_query(text)
+    if not text.strip():
+        raise ValueError
+    # Emails are split into words the same way as in the stored vectors, otherwise
+    # Postgres parses a whole email as one word that is never found
+    return SearchQuery(EmailWords(Value(text)), search_type="websearch", config="simple")
+
+
+def ranked_matches(queryset, fields, query, limit):
+    vector = search_vector(fields)
+    return queryset.alias(search=vector).filter(search=query).annotate(
+        rank=SearchRank(vector, query)
+    ).order_by("-rank", "pk")[:limit]
+
+
+def search_users(query, limit):
+    """
+    Users whose name or email matches, together with customers whose organisation
+    matches, best matches first.
+    """
+    matches = {}
+    for user_id, rank in [
+        *ranked_matches(User.objects.all(), USER_SEARCH_FIELDS, query, limit)
+            .values_list("id", "rank"),
+        *ranked_matches(Customer.objects.all(), CUSTOMER_SEARCH_FIELDS, query, limit)
+            .values_list("user_ptr_id", "rank"),
+    ]:
+        matches[user_id] = max(rank, matches.get(user_id, 0))
+    best = sorted(matches, key=lambda user_id: (-matches[user_id], user_id))[:limit]
+
+    users = User.objects.select_related(*ACCOUNT_TYPE_RELATIONS.values()).in_bulk(best)
+    results = []
+    for user_id in best:
+        user = users[user_id]
+        account_type = next(
+            (account_type for account_type, relation in ACCOUNT_TYPE_RELATIONS.items()
+             if hasattr(user, relation)),
+            None
+        )
+        organisation = None
+        if account_type == AccountType.CUSTOMER:
+            organisation = user.customer.organisation
+
+        results.append({
+            "id": user.id,
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "account_type": account_type,
+            "organisation": organisation,
+        })
+    return results
+
+
+def search_appointments(query, limit):
+    return list(
+        ranked_matches(Appointment.objects.all(), APPOINTMENT_SEARCH_FIELDS, query, limit)
+        .values("id", "location", "company", "planned_start_time")
+    )
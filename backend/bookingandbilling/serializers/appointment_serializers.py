@@ -1,10 +1,27 @@
 from rest_framework import serializers
+from ..durations import parse_duration
 from ..models import Language, Appointment,Customer
 
+class DurationMinutesField(serializers.IntegerField):
+    """
+    A duration in minutes, sent as minutes or as "H:MM".
+    """
+    default_error_messages = {
+        "invalid": "Duration must be minutes or hours and minutes as H:MM."
+    }
+
+    def to_internal_value(self, data):
+        try:
+            minutes = parse_duration(data)
+        except ValueError:
+            self.fail("invalid")
+        return super().to_internal_value(minutes)
+
 class CreateAppointmentSerializer(serializers.ModelSerializer):
     language = serializers.CharField(write_only=True, required=True)
     planned_start_time = serializers.DateTimeField(required=True)
-    planned_duration = serializers.TimeField(required=True)
+    planned_duration = DurationMinutesField(
+        source="planned_duration_minutes", required=True, min_value=1)
     location = serializers.CharField(required=True)
     company = serializers.CharField(required=False, allow_blank=True)
     gender = serializers.CharField(required=True)
@@ -1,5 +1,128 @@
+from django.db.models import CharField, Func, Prefetch, QuerySet
 from rest_framework import serializers
-from ..models import Interpreter, Appointment, Tag, Language, Customer, Translation
+from ..durations import format_duration
+from ..models import Interpreter, Appointment, Tag, Language, Customer, Translation, Gender
+
+
+class EagerLoadingMixin:
+    """
+    Declares the related lookups a serializer needs so list endpoints run in a
+    constant number of queries.
+
+    select_related_fields: forward relations joined into the main query
+    prefetch_related_fields: many relations (lookup strings or Prefetch objects)
+
+    Nested serializers that also use this mixin have their lookups pulled in
+    under the nested field name, so a parent only declares its own relations.
+    Any queryset handed to a serializer with many=True is planned automatically.
+
+    Passing fields (a list of top level field names, see requested_fields) renders
+    only those fields, and the queryset is planned for them alone: relations of
+    other fields aren't loaded and other columns are left out with .only().
+    """
+    select_related_fields = []
+    prefetch_related_fields = []
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_related_lookups(cls, prefix="", fields=None):
+        def requested(lookup):
+            return fields is None or lookup.split("__")[0] in fields
+
+        select_related = [
+            prefix + field for field in cls.select_related_fields if requested(field)
+        ]
+        prefetch_related = [
+            prefix_prefetch(lookup, prefix) for lookup in cls.prefetch_related_fields
+            if requested(getattr(lookup, "prefetch_through", lookup))
+        ]
+
+        for name, field in cls._declared_fields.items():
+            nested = getattr(field, "child", field)
+            if not isinstance(nested, EagerLoadingMixin) or not requested(name):
+                continue
+
+            nested_prefix = f"{prefix}{field.source or name}__"
+            nested_select, nested_prefetch = nested.get_related_lookups(nested_prefix)
+            select_related += nested_select
+            prefetch_related += nested_prefetch
+
+        return select_related, prefetch_related
+
+    @classmethod
+    def get_only_fields(cls, fields):
+        """
+        The model columns read by the given fields. Fields are read from the model
+        field of the same name (or their source), which also covers method fields
+        such as get_gender; anything else (reverse relations, annotations) is loaded
+        separately and needs no column.
+        """
+        model = cls.Meta.model
+        columns = {field.name for field in model._meta.concrete_fields}
+        only = [model._meta.pk.name]
+        for name in fields:
+            source = getattr(cls._declared_fields.get(name), "source", None)
+            # Method fields have a source of "*"
+            if source in (None, "*"):
+                source = name
+            if source in columns:
+                only.append(source)
+        return only
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        select_related, prefetch_related = cls.get_related_lookups(fields=fields)
+        queryset = queryset.select_related(*select_related).prefetch_related(*prefetch_related)
+        if fields is not None:
+            queryset = queryset.only(*cls.get_only_fields(fields))
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        fields = kwargs.get("fields")
+        if args and isinstance(args[0], QuerySet):
+            args = (cls.setup_eager_loading(args[0], fields), *args[1:])
+        elif isinstance(kwargs.get("instance"), QuerySet):
+            kwargs["instance"] = cls.setup_eager_loading(kwargs["instance"], fields)
+        return super().many_init(*args, **kwargs)
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def requested_fields(request, serializer_class):
+    """
+    The field names asked for with ?fields=a,b,c, or None for every field.
+    Raises InvalidFields if a name isn't a field of serializer_class.
+    """
+    value = request.query_params.get("fields")
+    if value is None:
+        return None
+
+    fields = [field for field in value.split(",") if field]
+    unknown = set(fields) - set(serializer_class().fields)
+    if not fields or unknown:
+        raise InvalidFields(
+            f"Fields must be a comma separated list of: {', '.join(serializer_class().fields)}."
+        )
+    return fields
+
+
+def prefix_prefetch(lookup, prefix):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            prefix + lookup.prefetch_through,
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr
+        )
+    return prefix + lookup
+
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,7 +139,7 @@ class CustomerSerializer(serializers.ModelSerializer):
         model = Customer
         fields = ['id', 'first_name', 'last_name']
 
-class InterpreterSerializer(serializers.ModelSerializer):
+class InterpreterSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     gender = serializers.SerializerMethodField()
     tag = TagSerializer(many=True, read_only=True)
     languages = LanguageSerializer(many=True, read_only=True)
@@ -29,6 +152,14 @@ class InterpreterSerializer(serializers.ModelSerializer):
         read_only=True  # Prevent updates through this field
     )
 
+    prefetch_related_fields = [
+        "tag",
+        "languages",
+        # Only the primary keys are rendered for offers
+        Prefetch("offered_translations", queryset=Translation.objects.only("id")),
+        Prefetch("offered_appointments", queryset=Appointment.objects.only("id")),
+    ]
+
     class Meta:
         model = Interpreter
         fields = ['id', 'first_name', 'last_name', 'languages', 'email',
@@ -37,7 +168,123 @@ class InterpreterSerializer(serializers.ModelSerializer):
     def get_gender(self, obj):
         return obj.get_gender_display()
 
-class GetAppointmentSerializer(serializers.ModelSerializer):
+class CandidateInterpreterSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    gender = serializers.SerializerMethodField()
+    tag = TagSerializer(many=True, read_only=True)
+    # Annotated by matching.candidate_interpreters
+    upcoming_appointments = serializers.IntegerField(read_only=True)
+    already_offered = serializers.BooleanField(read_only=True)
+
+    prefetch_related_fields = ["tag"]
+
+    class Meta:
+        model = Interpreter
+        fields = ['id', 'first_name', 'last_name', 'email', 'tag', 'gender',
+                  'upcoming_appointments', 'already_offered']
+
+    def get_gender(self, obj):
+        return obj.get_gender_display()
+
+
+# Display format of appointment times, and the same format for Postgres' to_char
+DISPLAY_DATETIME_FORMAT = "%B %d, %Y %I:%M %p"
+SQL_DISPLAY_DATETIME_FORMAT = "FMMonth DD, YYYY HH12:MI AM"
+
+
+class DisplayDateTime(Func):
+    # Formatted in UTC, the time zone datetimes are loaded in
+    template = "to_char(%(expressions)s AT TIME ZONE 'UTC', '" + SQL_DISPLAY_DATETIME_FORMAT + "')"
+    output_field = CharField()
+
+
+def format_datetime(dt):
+    return dt.strftime(DISPLAY_DATETIME_FORMAT) if dt else None
+
+
+class DurationSecondsField(serializers.Field):
+    """
+    A duration in minutes, as a number of seconds.
+    """
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value * 60
+
+
+class AppointmentListSerializer(serializers.ListSerializer):
+    """
+    Serializes a queryset of appointments a column at a time instead of an object at a
+    time. Rows are read with .values(), the display times are formatted by Postgres, and
+    each customer, interpreter and language is serialized once, however many
+    appointments share it. The output is the same as serializing each appointment with
+    GetAppointmentSerializer, which is still done for anything other than a queryset.
+    """
+
+    # The column of each field, for fields that don't read the column of the same name
+    columns = {
+        "customer": "customer_id",
+        "interpreter": "interpreter_id",
+        "language": "language_id",
+        "planned_start_time": "planned_start_time_display",
+        "actual_start_time": "actual_start_time_display",
+        "planned_start_time_iso": "planned_start_time",
+        "actual_start_time_iso": "actual_start_time",
+        "planned_duration": "planned_duration_minutes",
+        "actual_duration": "actual_duration_minutes",
+        "planned_duration_seconds": "planned_duration_minutes",
+        "actual_duration_seconds": "actual_duration_minutes",
+    }
+    display_times = {
+        "planned_start_time_display": DisplayDateTime("planned_start_time"),
+        "actual_start_time_display": DisplayDateTime("actual_start_time"),
+    }
+
+    def to_representation(self, data):
+        if not isinstance(data, QuerySet):
+            return super().to_representation(data)
+
+        fields = self.child.fields
+        columns = {self.columns.get(name, name) for name in fields}
+        annotations = {
+            column: expression for column, expression in self.display_times.items()
+            if column in columns
+        }
+        # values() also drops the select_related() and only() planned for objects
+        rows = list(data.prefetch_related(None).values(
+            *(columns - set(annotations)), **annotations
+        ))
+
+        readers = [
+            (name, self.column_reader(name, field, self.columns.get(name, name), rows))
+            for name, field in fields.items()
+        ]
+        return [{name: read(row) for name, read in readers} for row in rows]
+
+    def column_reader(self, name, field, column, rows):
+        """
+        Returns a function making the field's value from a row.
+        """
+        if isinstance(field, serializers.BaseSerializer):
+            ids = {row[column] for row in rows} - {None}
+            related = type(field)(field.Meta.model.objects.filter(pk__in=ids), many=True)
+            by_id = {item["id"]: item for item in related.data}
+            return lambda row: by_id.get(row[column])
+
+        if name == "gender_preference":
+            labels = dict(Gender.choices)
+            return lambda row: labels.get(row[column], row[column])
+        if name in ("planned_duration", "actual_duration"):
+            return lambda row: format_duration(row[column])
+        if column in self.display_times:
+            return lambda row: row[column]
+
+        to_representation = field.to_representation
+        return lambda row: None if row[column] is None else to_representation(row[column])
+
+
+class GetAppointmentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     gender_preference = serializers.SerializerMethodField()
     customer = CustomerSerializer(read_only=True)
     interpreter = InterpreterSerializer(read_only=True)
@@ -46,48 +293,46 @@ class GetAppointmentSerializer(serializers.ModelSerializer):
     actual_start_time = serializers.SerializerMethodField()
     planned_duration = serializers.SerializerMethodField()
     actual_duration = serializers.SerializerMethodField()
+    # The same times unformatted, ISO 8601 and in seconds
+    planned_start_time_iso = serializers.DateTimeField(source="planned_start_time", read_only=True)
+    actual_start_time_iso = serializers.DateTimeField(source="actual_start_time", read_only=True)
+    planned_duration_seconds = DurationSecondsField(source="planned_duration_minutes")
+    actual_duration_seconds = DurationSecondsField(source="actual_duration_minutes")
+
+    select_related_fields = ["customer", "interpreter", "language"]
 
     class Meta:
         model = Appointment
         fields = ['id', 'customer', 'interpreter', 'language', 
                   'gender_preference', 'planned_start_time', 
                   'actual_start_time', 'planned_duration', 'actual_duration',
-                  'location', 'company', 'invoice_generated']
+                  'location', 'company', 'invoice_generated',
+                  'planned_start_time_iso', 'actual_start_time_iso',
+                  'planned_duration_seconds', 'actual_duration_seconds']
+        list_serializer_class = AppointmentListSerializer
 
     def get_gender_preference(self, obj):
         return obj.get_gender_preference_display()
 
-    def format_datetime(self, dt):
-        return dt.strftime('%B %d, %Y %I:%M %p') if dt else None
-
     def get_planned_start_time(self, obj):
-        return self.format_datetime(obj.planned_start_time)
+        return format_datetime(obj.planned_start_time)
 
     def get_actual_start_time(self, obj):
-        return self.format_datetime(obj.actual_start_time)
-    
-    def format_duration(self, time):
-        if time:
-            hours, minutes = time.hour, time.minute
-            if hours and minutes:
-                return f"{hours} hours {minutes} minutes"
-            elif minutes:
-                return f"{minutes} minutes"
-            elif hours:
-                return f"{hours} hours"
-        return None
+        return format_datetime(obj.actual_start_time)
 
     def get_planned_duration(self, obj):
-        return self.format_duration(obj.planned_duration)
+        return format_duration(obj.planned_duration_minutes)
 
     def get_actual_duration(self, obj):
-        return self.format_duration(obj.actual_duration)  
-    
-class GetTranslationSerializer(serializers.ModelSerializer):
+        return format_duration(obj.actual_duration_minutes)
+
+class GetTranslationSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     customer = CustomerSerializer(read_only=True)
     language = LanguageSerializer(read_only=True)
     interpreter = InterpreterSerializer(read_only=True)
 
+    select_related_fields = ["customer", "interpreter", "language"]
+
     class Meta:
         model = Translation
         fields = ['id', 'customer', 'language', 'interpreter',
@@ -1,10 +1,13 @@
+import os
+
 from rest_framework import serializers
 from ..models import Language, Translation, Customer
+from ..uploads import digest_file, store_document
 
 class CreateTranslationSerializer(serializers.ModelSerializer):
     document = serializers.FileField(required=True)
     language = serializers.CharField(write_only=True, required=True)
-    word_count = serializers.CharField(required=True)
+    word_count = serializers.IntegerField(required=True, min_value=1)
     company = serializers.CharField(required=False, allow_blank=True)
     notes = serializers.CharField(required=False, allow_blank=True)
     customer = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all(), required=True)
@@ -29,11 +32,30 @@ class CreateTranslationSerializer(serializers.ModelSerializer):
         language_Object, created = Language.objects.get_or_create(
             language_name=language
         )
+
+        document = validated_data.pop("document")
+        sha256 = validated_data.pop("document_sha256", None) or digest_file(document).hexdigest()
         translation = Translation.objects.create(
             **validated_data,
+            document=store_document(document, sha256),
+            document_sha256=sha256,
+            document_name=os.path.basename(document.name),
             language=language_Object
         )
         
         return translation
-    
-        
+
+
+class CompleteTranslationUploadSerializer(CreateTranslationSerializer):
+    # The document comes from the finished upload rather than the request
+    document = None
+    word_count = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta(CreateTranslationSerializer.Meta):
+        fields = [
+            "language",
+            "word_count",
+            "company",
+            "notes",
+            "customer"
+        ]
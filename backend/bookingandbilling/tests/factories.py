@@ -0,0 +1,35 @@
+from django.utils import timezone
+from bookingandbilling.models import Appointment, Customer, Language
+
+class AppointmentFactoryMixin:
+    """
+    Mixin for test cases booking appointments. setUp creates the customer booking
+    them (self.yogi) and the language they're in (self.spanish), before the test
+    case's own setUp creates anything else.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.yogi = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com",
+            organisation="Jellystone Park"
+        )
+        self.spanish = Language.objects.create(language_name="Spanish")
+
+    def create_appointment(self, start, minutes=60, **kwargs):
+        """
+        Books a Spanish appointment in Glasgow for Yogi, starting at start (naive
+        datetimes are taken as local time). Any other field can be given by keyword.
+        """
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        return Appointment.objects.create(**{
+            "customer": self.yogi,
+            "planned_start_time": start,
+            "planned_duration_minutes": minutes,
+            "location": "Glasgow",
+            "language": self.spanish,
+            **kwargs
+        })
@@ -1,10 +1,19 @@
 from django.utils import timezone
-from datetime import datetime, time
+from datetime import datetime
 from rest_framework.test import APIClient
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from bookingandbilling.models import Admin, Appointment, Customer, Interpreter, Language
+from bookingandbilling.models import (
+    Admin,
+    Appointment,
+    Customer,
+    Interpreter,
+    Language,
+    QueuedEmail
+)
 import json
 
 class BaseTestCase(TestCase):
@@ -30,7 +39,7 @@ class BaseTestCase(TestCase):
         self.appointment_assigned = Appointment.objects.create(
             customer=self.customer,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30),
+            planned_duration_minutes=90,
             location="Glasgow",
             language=self.spanish,
             interpreter=self.interpreter_offered,
@@ -40,7 +49,7 @@ class BaseTestCase(TestCase):
         self.appointment_unassigned_1 = Appointment.objects.create(
             customer=self.customer,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30),
+            planned_duration_minutes=90,
             location="Glasgow",
             language=self.spanish
         )
@@ -48,7 +57,7 @@ class BaseTestCase(TestCase):
         self.appointment_unassigned_2 = Appointment.objects.create(
             customer=self.customer,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30),
+            planned_duration_minutes=90,
             location="Glasgow",
             language=self.spanish
         )
@@ -107,6 +116,132 @@ class TestFetchAppointments(BaseTestCase):
         self.assertIn(self.appointment_unassigned_2.id, ids)
         self.assertNotIn(self.appointment_assigned.id, ids)
 
+class TestFetchAppointmentsPagination(BaseTestCase):
+    """
+    
+    Test cursor pagination of the appointment feed
+
+    test_unpaginated: test feed without a page size returns everything with no cursors
+    test_walk_pages: test following next and prev cursors through the feed
+    test_invalid_cursor: test an unparseable cursor is rejected
+    
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = "/api/fetch-appointments/"
+        self.client.cookies["authToken"] = self.valid_token
+
+        # Three appointments share a start time so the id tiebreak is exercised
+        for hour in [8, 9, 9, 10]:
+            Appointment.objects.create(
+                customer=self.customer,
+                planned_start_time=timezone.make_aware(datetime(2024,12,1,hour,0)),
+                planned_duration_minutes=60,
+                location="Glasgow",
+                language=self.spanish
+            )
+        self.expected_ids = list(
+            Appointment.objects.filter(interpreter__isnull=True, active=True)
+            .order_by("planned_start_time", "id").values_list("id", flat=True)
+        )
+
+    def fetch(self, query):
+        response = self.client.post(
+            self.url + query, json.dumps({"unassigned": True}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_unpaginated(self):
+        data = self.fetch("")
+        self.assertEqual([app["id"] for app in data["result"]], self.expected_ids)
+        self.assertNotIn("next", data)
+
+    def test_walk_pages(self):
+        pages = []
+        data = self.fetch("?page_size=4")
+        self.assertIsNone(data["prev"])
+        pages.append([app["id"] for app in data["result"]])
+
+        while data["next"] is not None:
+            data = self.fetch(f"?page_size=4&cursor={data['next']}")
+            pages.append([app["id"] for app in data["result"]])
+
+        self.assertEqual([i for page in pages for i in page], self.expected_ids)
+        self.assertEqual([len(page) for page in pages], [4, 2])
+
+        # Step back from the last page
+        data = self.fetch(f"?page_size=4&cursor={data['prev']}")
+        self.assertEqual([app["id"] for app in data["result"]], pages[0])
+        self.assertIsNone(data["prev"])
+        self.assertIsNotNone(data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.post(
+            self.url + "?cursor=notacursor", json.dumps({"unassigned": True}),
+            content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"]["error-code"], "invalid-cursor")
+
+class TestFetchAppointmentsQueryCount(BaseTestCase):
+    """
+    
+    Test that appointment feeds run a constant number of queries
+
+    test_fetch_appointments_query_count: query count does not grow with assigned appointments
+    test_fetch_interpreters_query_count: query count does not grow with interpreters
+    
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies["authToken"] = self.valid_token
+
+        # Authenticate once so every counted request takes the cached auth path
+        self.client.get("/api/check-auth/")
+
+    def count_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            if data is None:
+                response = method(url)
+            else:
+                response = method(url, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def add_assigned_appointments(self, count):
+        start = Interpreter.objects.count()
+        for i in range(start, start + count):
+            interpreter = Interpreter.objects.create(email=f"interpreter{i}@gmail.com")
+            interpreter.languages.add(self.spanish)
+            appointment = Appointment.objects.create(
+                customer=self.customer,
+                planned_start_time=timezone.make_aware(datetime(2024,12,2,9,0)),
+                planned_duration_minutes=90,
+                location="Glasgow",
+                language=self.spanish,
+                interpreter=interpreter,
+            )
+            appointment.offered_to.add(interpreter)
+
+    def test_fetch_appointments_query_count(self):
+        url = "/api/fetch-appointments/"
+        self.add_assigned_appointments(2)
+        expected = self.count_queries(self.client.post, url, {"unassigned": False})
+
+        self.add_assigned_appointments(10)
+        actual = self.count_queries(self.client.post, url, {"unassigned": False})
+        self.assertEqual(actual, expected)
+
+    def test_fetch_interpreters_query_count(self):
+        url = "/api/all-interpreters/"
+        self.add_assigned_appointments(2)
+        expected = self.count_queries(self.client.get, url)
+
+        self.add_assigned_appointments(10)
+        actual = self.count_queries(self.client.get, url)
+        self.assertEqual(actual, expected)
+
 class TestFetchInterpreters(BaseTestCase):
     """
     
@@ -141,6 +276,70 @@ class TestFetchInterpreters(BaseTestCase):
         self.assertIn(self.interpreter_offered.id, ids)
         self.assertIn(self.interpreter_unoffered.id, ids)
 
+class TestSparseFields(BaseTestCase):
+    """
+
+    Test requesting only some fields of the admin feeds
+
+    test_interpreter_fields: test only the requested interpreter fields are read and returned
+    test_appointment_fields: test only the requested appointment fields are read and returned
+    test_invalid_fields: test requesting fields that don't exist
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies["authToken"] = self.valid_token
+        self.client.get("/api/check-auth/")
+
+    def captured_sql(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            if data is None:
+                response = method(url)
+            else:
+                response = method(url, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in context.captured_queries]
+
+    def test_interpreter_fields(self):
+        self.interpreter_offered.languages.add(self.spanish)
+        response, queries = self.captured_sql(
+            self.client.get, "/api/all-interpreters/?fields=id,first_name,languages")
+
+        interpreter = next(
+            i for i in response.data["result"] if i["id"] == self.interpreter_offered.id)
+        self.assertEqual(set(interpreter), {"id", "first_name", "languages"})
+        self.assertEqual(interpreter["languages"][0]["language_name"], "Spanish")
+
+        # The ETag's table versions, then interpreters and their languages only, with no
+        # offer lookups or unused columns
+        self.assertEqual(len(queries), 3)
+        self.assertIn('"bookingandbilling_tableversion"', queries[0])
+        self.assertNotIn('"address"', queries[1])
+        self.assertNotIn('"email"', queries[1])
+
+    def test_appointment_fields(self):
+        response, queries = self.captured_sql(
+            self.client.post, "/api/fetch-appointments/?fields=id,planned_start_time",
+            {"unassigned": False})
+
+        self.assertEqual(response.data["result"], [{
+            "id": self.appointment_assigned.id,
+            "planned_start_time": "December 01, 2024 09:00 AM"
+        }])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("bookingandbilling_customer", queries[0])
+        self.assertNotIn('"location"', queries[0])
+
+    def test_invalid_fields(self):
+        for url in ["/api/all-interpreters/?fields=id,password",
+                    "/api/all-interpreters/?fields=",
+                    f"/api/candidate-interpreters/?appID={self.appointment_assigned.id}"
+                    "&fields=id,secret"]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["error"]["error-code"], "invalid-fields")
+
 class TestOfferAppointment(BaseTestCase):
     """
     
@@ -204,6 +403,81 @@ class TestOfferAppointment(BaseTestCase):
         self.assertFalse(self.appointment_unassigned_1.offered_to.filter(
             id=self.interpreter_offered.id).exists())
 
+class TestBulkOfferAppointment(BaseTestCase):
+    """
+    
+    Test offering an appointment to several interpreters at once
+
+    test_invalid_tokens: test trying to bulk offer without valid auth
+    test_invalid_inputs: test bulk offer with missing or malformed interpreter IDs
+    test_bulk_offer: test offering to new, already offered and unknown interpreters
+    
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = "/api/bulk-offer-appointments/"
+
+    def test_invalid_tokens(self):
+        # no token
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # not admin token
+        self.client.cookies["authToken"] = self.invalid_token
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_inputs(self):
+        self.client.cookies["authToken"] = self.valid_token
+        for request_data in [
+            {"appID": self.appointment_unassigned_1.id},
+            {"appID": self.appointment_unassigned_1.id, "interpreterIDs": [True]},
+            {"appID": self.appointment_unassigned_1.id, "interpreterIDs": ["one"]},
+            {"appID": 0, "interpreterIDs": [self.interpreter_unoffered.id]},
+        ]:
+            response = self.client.post(
+                self.url, json.dumps(request_data), content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_offer(self):
+        self.client.cookies["authToken"] = self.valid_token
+        extra_interpreter = Interpreter.objects.create(email="extra@gmail.com")
+        missing_id = extra_interpreter.id + 1000
+        request_data = {
+            "appID": self.appointment_unassigned_1.id,
+            "interpreterIDs": [
+                self.interpreter_unoffered.id,
+                extra_interpreter.id,
+                self.interpreter_offered.id,
+                missing_id,
+            ]
+        }
+
+        response = self.client.post(
+            self.url, json.dumps(request_data), content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        results = {
+            result["interpreterID"]: result["result"]
+            for result in response.data["result"]["results"]
+        }
+        self.assertEqual(results, {
+            self.interpreter_unoffered.id: "queued",
+            extra_interpreter.id: "queued",
+            self.interpreter_offered.id: "already-offered",
+            missing_id: "not-found",
+        })
+
+        offered = set(self.appointment_unassigned_1.offered_to.values_list("id", flat=True))
+        self.assertEqual(offered, {
+            self.interpreter_offered.id, self.interpreter_unoffered.id, extra_interpreter.id
+        })
+        self.assertEqual(
+            set(QueuedEmail.objects.values_list("recipient", flat=True)),
+            {self.interpreter_unoffered.email, extra_interpreter.email}
+        )
+
 class TestFlaggingInvoiceGenerated(BaseTestCase):
     """
     
@@ -251,4 +525,101 @@ class TestFlaggingInvoiceGenerated(BaseTestCase):
         
         self.assertIsNotNone(response)
         self.assertEqual(response.status_code, 200)
-        self.assertFalse(self.appointment_assigned.invoice_generated)
\ No newline at end of file
+        self.assertFalse(self.appointment_assigned.invoice_generated)
+
+class TestSettingInvoiceGenerated(BaseTestCase):
+    """
+
+    Test setting invoice generated on many appointments at once
+
+    test_invalid_tokens: test only admins can set invoice generated
+    test_set_ids: test setting invoice generated on a list of appointments
+    test_set_filter: test setting invoice generated on the appointments matching a filter
+    test_idempotent: test repeating a request changes nothing more
+    test_invalid_input: test a missing value, malformed IDs, no selection or a bad filter
+    test_query_count: test the appointments are updated in a single query
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = "/api/set-appointment-invoice/"
+        self.client.cookies["authToken"] = self.valid_token
+
+    def post(self, data, query=""):
+        return self.client.post(
+            self.url + query, json.dumps(data), content_type="application/json")
+
+    def invoiced_ids(self):
+        return set(Appointment.objects.filter(invoice_generated=True).values_list("id", flat=True))
+
+    def test_invalid_tokens(self):
+        self.client.cookies["authToken"] = self.invalid_token
+        response = self.post({"invoiceGenerated": True, "appIDs": []})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_set_ids(self):
+        response = self.post({
+            "invoiceGenerated": True,
+            "appIDs": [self.appointment_unassigned_1.id, self.appointment_assigned.id]
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["result"]["updated"], 1)
+        self.assertEqual(self.invoiced_ids(),
+                         {self.appointment_assigned.id, self.appointment_unassigned_1.id})
+
+        response = self.post({"invoiceGenerated": False, "appIDs": [self.appointment_assigned.id]})
+        self.assertEqual(response.data["result"]["updated"], 1)
+        self.assertEqual(self.invoiced_ids(), {self.appointment_unassigned_1.id})
+
+    def test_set_filter(self):
+        response = self.post(
+            {"invoiceGenerated": True},
+            f"?customer={self.customer.id}&from=2024-12-01&to=2024-12-01"
+        )
+        self.assertEqual(response.data["result"]["updated"], 2)
+        self.assertEqual(len(self.invoiced_ids()), 3)
+
+        # IDs and filters together narrow each other
+        response = self.post(
+            {"invoiceGenerated": False, "appIDs": [self.appointment_unassigned_1.id]},
+            f"?interpreter={self.interpreter_offered.id}"
+        )
+        self.assertEqual(response.data["result"]["updated"], 0)
+
+    def test_idempotent(self):
+        data = {"invoiceGenerated": True, "appIDs": [self.appointment_unassigned_1.id]}
+        self.assertEqual(self.post(data).data["result"]["updated"], 1)
+        self.assertEqual(self.post(data).data["result"]["updated"], 0)
+        self.assertIn(self.appointment_unassigned_1.id, self.invoiced_ids())
+
+    def test_invalid_input(self):
+        for data, query in [
+            ({"appIDs": [self.appointment_unassigned_1.id]}, ""),
+            ({"invoiceGenerated": "true", "appIDs": [self.appointment_unassigned_1.id]}, ""),
+            ({"invoiceGenerated": True, "appIDs": self.appointment_unassigned_1.id}, ""),
+            ({"invoiceGenerated": True, "appIDs": ["1"]}, ""),
+            ({"invoiceGenerated": True}, ""),
+            ({"invoiceGenerated": True}, "?from=yesterday"),
+        ]:
+            response = self.post(data, query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.invoiced_ids(), {self.appointment_assigned.id})
+
+    def test_query_count(self):
+        for _ in range(10):
+            Appointment.objects.create(
+                customer=self.customer,
+                planned_start_time=timezone.make_aware(datetime(2024,12,2,9,0)),
+                planned_duration_minutes=60,
+                location="Glasgow",
+                language=self.spanish
+            )
+        ids = list(Appointment.objects.values_list("id", flat=True))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.post({"invoiceGenerated": True, "appIDs": ids})
+        self.assertEqual(response.data["result"]["updated"], 12)
+        updates = [query for query in context.captured_queries
+                   if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
@@ -99,6 +99,32 @@ class TestFetchTranslations(BaseTestCase):
         self.assertIn(self.translation_unassigned_2.id, ids)
         self.assertNotIn(self.translation_assigned.id, ids)
 
+class TestFetchTranslationsPagination(BaseTestCase):
+    """
+    
+    Test cursor pagination of the translation feed
+
+    test_walk_pages: test following next cursors through the feed
+    
+    """
+
+    def test_walk_pages(self):
+        self.client.cookies["authToken"] = self.valid_token
+        url = "/api/fetch-translations/?page_size=1"
+        ids = []
+
+        data = {"next": ""}
+        while data["next"] is not None:
+            response = self.client.post(
+                url + f"&cursor={data['next']}" if data["next"] else url,
+                json.dumps({"unassigned": True}), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            data = response.data
+            ids += [translation["id"] for translation in data["result"]]
+
+        self.assertEqual(
+            ids, sorted([self.translation_unassigned_1.id, self.translation_unassigned_2.id]))
+
 class TestOfferTranslation(BaseTestCase):
     """
     
@@ -209,4 +235,65 @@ class TestFlaggingInvoiceGenerated(BaseTestCase):
         
         self.assertIsNotNone(response)
         self.assertEqual(response.status_code, 200)
-        self.assertFalse(self.translation_assigned.invoice_generated)
\ No newline at end of file
+        self.assertFalse(self.translation_assigned.invoice_generated)
+
+class TestSettingInvoiceGenerated(BaseTestCase):
+    """
+
+    Test setting invoice generated on many translations at once
+
+    test_invalid_tokens: test only admins can set invoice generated
+    test_set_ids: test setting invoice generated on a list of translations
+    test_set_filter: test setting invoice generated on the translations matching a filter
+    test_idempotent: test repeating a request changes nothing more
+    test_invalid_input: test a missing value, malformed IDs or no selection
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = "/api/set-translation-invoice/"
+        self.client.cookies["authToken"] = self.valid_token
+
+    def post(self, data, query=""):
+        return self.client.post(
+            self.url + query, json.dumps(data), content_type="application/json")
+
+    def invoiced_ids(self):
+        return set(Translation.objects.filter(invoice_generated=True).values_list("id", flat=True))
+
+    def test_invalid_tokens(self):
+        self.client.cookies["authToken"] = self.invalid_token
+        response = self.post({"invoiceGenerated": True, "translationIDs": []})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_set_ids(self):
+        response = self.post({
+            "invoiceGenerated": True,
+            "translationIDs": [self.translation_unassigned_1.id, self.translation_unassigned_2.id]
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["result"]["updated"], 2)
+        self.assertEqual(len(self.invoiced_ids()), 3)
+
+    def test_set_filter(self):
+        response = self.post(
+            {"invoiceGenerated": False}, f"?interpreter={self.interpreter_offered.id}")
+        self.assertEqual(response.data["result"]["updated"], 1)
+        self.assertEqual(self.invoiced_ids(), set())
+
+    def test_idempotent(self):
+        data = {"invoiceGenerated": False, "translationIDs": [self.translation_assigned.id]}
+        self.assertEqual(self.post(data).data["result"]["updated"], 1)
+        self.assertEqual(self.post(data).data["result"]["updated"], 0)
+        self.assertEqual(self.invoiced_ids(), set())
+
+    def test_invalid_input(self):
+        for data in [
+            {"translationIDs": [self.translation_unassigned_1.id]},
+            {"invoiceGenerated": True, "translationIDs": "all"},
+            {"invoiceGenerated": True},
+        ]:
+            response = self.post(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.invoiced_ids(), {self.translation_assigned.id})
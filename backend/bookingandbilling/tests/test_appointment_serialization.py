@@ -0,0 +1,100 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import datetime
+from bookingandbilling.models import (
+    Appointment,
+    Customer,
+    Gender,
+    Interpreter,
+    Language,
+    Tag
+)
+from bookingandbilling.serializers.model_serializers import GetAppointmentSerializer
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+
+class TestBulkAppointmentSerialization(AppointmentFactoryMixin, TestCase):
+    """
+
+    Test serializing appointment querysets a column at a time
+
+    test_same_as_per_object: test the output matches serializing each appointment on its own
+    test_sparse_fields: test only the requested fields are read and rendered
+    test_raw_values: test the ISO 8601 times and durations in seconds
+    test_query_count: test the query count doesn't grow with appointments or related rows
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.interpreter = Interpreter.objects.create(
+            email="wowza@gmail.com", first_name="Maria", gender=Gender.FEMALE)
+        self.interpreter.languages.add(self.spanish)
+        self.interpreter.tag.add(Tag.objects.create(name="Medical"))
+
+        self.create_appointment(datetime(2024,12,1,9,0), 90, interpreter=self.interpreter)
+        self.create_appointment(
+            datetime(2024,9,5,14,5), 120, gender_preference=Gender.MALE,
+            actual_start_time=timezone.make_aware(datetime(2024,9,5,14,20)),
+            actual_duration_minutes=45, company="NHS Lothian", invoice_generated=True)
+        self.create_appointment(
+            datetime(2025,5,20,0,0), None, gender_preference=None, language=None)
+        self.offered = self.create_appointment(datetime(2025,1,1,12,30), 195)
+        self.offered.offered_to.add(self.interpreter)
+
+    def serialize(self, **kwargs):
+        return GetAppointmentSerializer(
+            Appointment.objects.order_by("planned_start_time"), many=True, **kwargs).data
+
+    def test_same_as_per_object(self):
+        per_object = [
+            GetAppointmentSerializer(appointment).data
+            for appointment in Appointment.objects.order_by("planned_start_time")
+        ]
+        bulk = self.serialize()
+        self.assertEqual([dict(app) for app in bulk], [dict(app) for app in per_object])
+        self.assertEqual([list(app) for app in bulk], [list(app) for app in per_object])
+
+        self.assertEqual(bulk[0]["planned_start_time"], "September 05, 2024 02:05 PM")
+        self.assertEqual(bulk[0]["actual_duration"], "45 minutes")
+        self.assertEqual(bulk[0]["gender_preference"], "Male")
+        self.assertEqual(bulk[1]["planned_duration"], "1 hours 30 minutes")
+        self.assertEqual(bulk[1]["interpreter"]["tag"][0]["name"], "Medical")
+        self.assertEqual(bulk[1]["interpreter"]["offered_appointments"], [self.offered.id])
+        self.assertIsNone(bulk[3]["language"])
+        self.assertIsNone(bulk[3]["planned_duration"])
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            result = self.serialize(fields=["id", "planned_start_time", "customer"])
+
+        self.assertEqual(list(result[1]), ["id", "customer", "planned_start_time"])
+        self.assertEqual(result[1]["customer"]["first_name"], "Yogi")
+        # The appointments, then their customers
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertNotIn('"location"', context.captured_queries[0]["sql"])
+
+    def test_raw_values(self):
+        result = self.serialize()
+        self.assertEqual(result[0]["planned_start_time_iso"], "2024-09-05T14:05:00Z")
+        self.assertEqual(result[0]["actual_start_time_iso"], "2024-09-05T14:20:00Z")
+        self.assertEqual(result[0]["planned_duration_seconds"], 7200)
+        self.assertEqual(result[0]["actual_duration_seconds"], 2700)
+        self.assertIsNone(result[1]["actual_start_time_iso"])
+        self.assertIsNone(result[1]["actual_duration_seconds"])
+
+    def test_query_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.serialize()
+            return len(context.captured_queries)
+
+        before = count_queries()
+        for i in range(5):
+            interpreter = Interpreter.objects.create(email=f"extra{i}@gmail.com")
+            interpreter.languages.add(Language.objects.create(language_name=f"Language {i}"))
+            self.create_appointment(datetime(2025,2,i + 1,9,0), 60,
+                                    interpreter=interpreter,
+                                    customer=Customer.objects.create(email=f"c{i}@gmail.com"))
+        self.assertEqual(count_queries(), before)
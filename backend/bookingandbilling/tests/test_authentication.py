@@ -1,16 +1,19 @@
 from django.test import TestCase, RequestFactory
 from rest_framework.exceptions import AuthenticationFailed
-from bookingandbilling.views.views_utility import IsUserType
+from bookingandbilling.views.views_utility import IsUserType, get_full_user
 from bookingandbilling.middleware import CookieTokenAuthentication
+from bookingandbilling.auth_cache import TokenCache, token_cache
 from bookingandbilling.models import (
     AccountType,
     Admin,
     Interpreter,
     Customer,
+    User,
 )
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 from rest_framework.test import APIClient
+from unittest import mock
 
 
 class CookieTokenAuthenticationTestCase(TestCase):
@@ -64,6 +67,52 @@ class CookieTokenAuthenticationTestCase(TestCase):
         self.assertIsNone(result)
 
 
+class AccountTypeResolutionTestCase(TestCase):
+    """
+    
+    Test the account type is resolved once per request
+
+    setUp: create required variables
+    test_authenticate_attaches_account_type: simulate authenticating a token in one query
+    test_get_full_user_single_query: simulate resolving plain users in one query each
+    
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.interpreter = Interpreter.objects.create(email="notapproved@gmail.com")
+        self.customer = Customer.objects.create(email="picnicbaskets@jellystone.com")
+        self.accounts = [
+            (self.admin, AccountType.ADMIN),
+            (self.interpreter, AccountType.INTERPRETER),
+            (self.customer, AccountType.CUSTOMER),
+        ]
+
+    def test_authenticate_attaches_account_type(self):
+        for account, account_type in self.accounts:
+            token, _created = Token.objects.get_or_create(user=account)
+            request = self.factory.get("/")
+            request.COOKIES["authToken"] = token.key
+
+            with self.assertNumQueries(1):
+                user, auth = CookieTokenAuthentication().authenticate(request)
+            self.assertEqual(user.account_type, account_type)
+
+            with self.assertNumQueries(0):
+                full_user, user_type = get_full_user(user)
+            self.assertEqual(full_user.pk, account.pk)
+            self.assertEqual(user_type, account_type)
+
+    def test_get_full_user_single_query(self):
+        for account, account_type in self.accounts:
+            user = User.objects.get(pk=account.pk)
+            with self.assertNumQueries(1):
+                full_user, user_type = get_full_user(user)
+            self.assertIsInstance(full_user, type(account))
+            self.assertEqual(user_type, account_type)
+
+
 class LoginTestCase(TestCase):
     """
     
@@ -263,4 +312,97 @@ class AccountTypePermissionTestCase(TestCase):
             token, _created = Token.objects.get_or_create(user=account)
             request.COOKIES["authToken"] = token
 
-            self.assertTrue(permission.has_permission(request, None))
\ No newline at end of file
+            self.assertTrue(permission.has_permission(request, None))
+
+
+class TokenCacheTestCase(TestCase):
+    """
+    
+    Test the in-process authToken cache
+
+    setUp: create required variables
+    test_warm_path_has_no_queries: simulate repeat requests resolving the user from the cache
+    test_logout_invalidates: simulate a cached token being used after logout
+    test_password_change_invalidates: simulate a password change dropping the cached user
+    test_cached_token: simulate warm requests getting their own copy of the token and user
+    test_expiry: simulate an entry outliving its TTL
+    test_eviction: simulate the least recently used entry being evicted
+    
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = Admin.objects.create(
+            first_name="John",
+            last_name="Brown",
+            email="johnbrown@gmail.com"
+        )
+        self.token, _created = Token.objects.get_or_create(user=self.admin)
+        self.client.cookies["authToken"] = self.token.key
+
+    def test_warm_path_has_no_queries(self):
+        response = self.client.get("/api/check-auth/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/check-auth/")
+        self.assertEqual(response.data["result"]["account_type"], AccountType.ADMIN)
+
+    def test_logout_invalidates(self):
+        self.client.get("/api/check-auth/")
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+        response = self.client.post("/api/logout/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+        self.client.cookies["authToken"] = self.token.key
+        response = self.client.get("/api/check-auth/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        self.client.get("/api/check-auth/")
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+        self.admin.set_password("newPassword123")
+        self.admin.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_cached_token(self):
+        authentication = CookieTokenAuthentication()
+        request = RequestFactory().get("/")
+        request.COOKIES["authToken"] = self.token.key
+
+        for _path in ["cold", "warm"]:
+            user, auth = authentication.authenticate(request)
+            self.assertIsInstance(auth, Token)
+            self.assertEqual(auth.key, self.token.key)
+            self.assertIs(auth.user, user)
+            self.assertEqual(user.account_type, AccountType.ADMIN)
+            user.first_name = "Changed"
+
+        with self.assertNumQueries(0):
+            user, _auth = authentication.authenticate(request)
+            full_user, user_type = get_full_user(user)
+        self.assertEqual(user.first_name, "John")
+        self.assertEqual((full_user.pk, user_type), (self.admin.pk, AccountType.ADMIN))
+
+    def test_expiry(self):
+        cache = TokenCache(max_size=10, ttl=60)
+        with mock.patch("bookingandbilling.auth_cache.time.monotonic", return_value=0):
+            cache.set("key", self.token, AccountType.ADMIN)
+        with mock.patch("bookingandbilling.auth_cache.time.monotonic", return_value=59):
+            self.assertIsNotNone(cache.get("key"))
+        with mock.patch("bookingandbilling.auth_cache.time.monotonic", return_value=60):
+            self.assertIsNone(cache.get("key"))
+
+    def test_eviction(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set("first", self.token, AccountType.ADMIN)
+        cache.set("second", self.token, AccountType.ADMIN)
+        cache.get("first")
+        cache.set("third", self.token, AccountType.ADMIN)
+
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("third"))
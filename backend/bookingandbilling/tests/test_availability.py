@@ -0,0 +1,180 @@
+from rest_framework.test import APIClient
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from datetime import datetime
+from io import StringIO
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.availability import busy_interpreter_ids, free_interpreters
+from bookingandbilling.models import Admin, Appointment, Interpreter
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+import json
+
+def at(hour, minute=0):
+    return timezone.make_aware(datetime(2025, 1, 1, hour, minute))
+
+class BaseTestCase(AppointmentFactoryMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.busy = Interpreter.objects.create(email="busy@gmail.com")
+        self.free = Interpreter.objects.create(email="free@gmail.com")
+
+        # busy is booked 09:00-10:30
+        self.booked = self.create_appointment(at(9), 90, interpreter=self.busy)
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.busy_token, _created = Token.objects.get_or_create(user=self.busy)
+
+    def free_ids(self, start, end, exclude_appointment_id=None):
+        return set(free_interpreters(start, end, exclude_appointment_id).values_list(
+            "id", flat=True))
+
+class TestAppointmentPeriod(BaseTestCase):
+    """
+
+    Test the planned end time kept alongside each appointment
+
+    test_end_time_on_create: test the end time is worked out when an appointment is created
+    test_end_time_on_update: test the end time follows changes to the start or duration
+    test_fill_end_times: test end times missing from older appointments are filled in
+
+    """
+
+    def test_end_time_on_create(self):
+        self.assertEqual(self.booked.planned_end_time, at(10, 30))
+
+    def test_end_time_on_update(self):
+        self.booked.planned_duration_minutes = 120
+        self.booked.save(update_fields=["planned_duration_minutes"])
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.planned_end_time, at(11))
+
+    def test_fill_end_times(self):
+        Appointment.objects.update(planned_end_time=None)
+        call_command("fill_appointment_end_times", stdout=StringIO())
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.planned_end_time, at(10, 30))
+
+class TestFreeInterpreters(BaseTestCase):
+    """
+
+    Test finding interpreters free for a time window
+
+    test_overlapping_window: test an interpreter booked during the window is not free
+    test_back_to_back: test windows touching a booking at either end are free
+    test_inactive_appointment: test cancelled appointments don't block an interpreter
+    test_own_appointment: test an appointment doesn't block its own interpreter
+    test_no_end_time: test an appointment without an end time doesn't block an interpreter
+    test_endpoint: test the free interpreters endpoint for a window and an appointment
+    test_endpoint_invalid: test the endpoint without a valid window
+
+    """
+
+    def test_overlapping_window(self):
+        for start, end in [(at(8), at(9, 1)), (at(10), at(12)), (at(9, 15), at(9, 45))]:
+            self.assertEqual(self.free_ids(start, end), {self.free.id})
+
+    def test_back_to_back(self):
+        for start, end in [(at(8), at(9)), (at(10, 30), at(11))]:
+            self.assertEqual(self.free_ids(start, end), {self.free.id, self.busy.id})
+
+    def test_inactive_appointment(self):
+        Appointment.objects.filter(id=self.booked.id).update(active=False)
+        self.assertEqual(self.free_ids(at(9), at(10)), {self.free.id, self.busy.id})
+
+    def test_own_appointment(self):
+        self.assertEqual(
+            self.free_ids(at(9), at(10, 30), exclude_appointment_id=self.booked.id),
+            {self.free.id, self.busy.id}
+        )
+
+    def test_no_end_time(self):
+        Appointment.objects.filter(id=self.booked.id).update(
+            planned_duration_minutes=None, planned_end_time=None)
+        for start, end in [(at(9), at(10)), (at(12), at(13))]:
+            self.assertEqual(self.free_ids(start, end), {self.free.id, self.busy.id})
+            self.assertEqual(busy_interpreter_ids(start, end, [self.busy.id]), set())
+
+    def test_endpoint(self):
+        self.client.cookies["authToken"] = self.admin_token
+        response = self.client.get(
+            "/api/free-interpreters/",
+            {"start": "2025-01-01T10:00:00+00:00", "end": "2025-01-01T11:00:00+00:00"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i["id"] for i in response.data["result"]], [self.free.id])
+
+        unassigned = self.create_appointment(at(10), 60)
+        response = self.client.get("/api/free-interpreters/", {"appID": unassigned.id})
+        self.assertEqual([i["id"] for i in response.data["result"]], [self.free.id])
+
+    def test_endpoint_invalid(self):
+        self.client.cookies["authToken"] = self.admin_token
+        for params in [{}, {"start": "2025-01-01T11:00"}, {"start": "2025-01-01T11:00",
+                                                           "end": "2025-01-01T10:00"}]:
+            response = self.client.get("/api/free-interpreters/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get("/api/free-interpreters/", {"appID": 0})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class TestOfferingBusyInterpreters(BaseTestCase):
+    """
+
+    Test interpreters can't be offered or accept overlapping appointments
+
+    test_offer: test offering an overlapping appointment is refused
+    test_bulk_offer: test bulk offers skip interpreters with overlapping appointments
+    test_accept: test accepting an overlapping appointment is refused
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.overlapping = self.create_appointment(at(10), 60)
+
+    def test_offer(self):
+        self.client.cookies["authToken"] = self.admin_token
+        response = self.client.post(
+            "/api/offer-appointments/",
+            json.dumps({"appID": self.overlapping.id, "interpreterID": self.busy.id,
+                        "offer": True}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(self.overlapping.offered_to.exists())
+
+    def test_bulk_offer(self):
+        self.client.cookies["authToken"] = self.admin_token
+        response = self.client.post(
+            "/api/bulk-offer-appointments/",
+            json.dumps({"appID": self.overlapping.id,
+                        "interpreterIDs": [self.busy.id, self.free.id]}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["result"]["results"], [
+            {"interpreterID": self.busy.id, "result": "unavailable"},
+            {"interpreterID": self.free.id, "result": "queued"},
+        ])
+        self.assertEqual(
+            list(self.overlapping.offered_to.values_list("id", flat=True)), [self.free.id])
+
+    def test_accept(self):
+        # Offered before the interpreter took the other appointment
+        self.overlapping.offered_to.add(self.busy)
+
+        self.client.cookies["authToken"] = self.busy_token
+        response = self.client.post(
+            "/api/updated-appointments/",
+            json.dumps({"appID": self.overlapping.id, "accepted": True}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.overlapping.refresh_from_db()
+        self.assertIsNone(self.overlapping.interpreter_id)
@@ -0,0 +1,148 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from datetime import date, datetime
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.billing import billed_hours
+from bookingandbilling.models import Admin, Appointment, Interpreter, Language
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+
+class TestBilledHours(AppointmentFactoryMixin, TestCase):
+    """
+
+    Test totalling billed hours in the database
+
+    test_total: test the totals of every assigned, active appointment
+    test_actual_duration: test an entered actual duration is billed instead of the planned one
+    test_group_by: test totals per interpreter and month, with their labels
+    test_group_by_customer_and_language: test totals per customer and language
+    test_filters: test the feed filters narrow the appointments billed
+    test_invalid_group_by: test unknown or repeated groupings are rejected
+    test_permissions: test only admins can see billed hours
+    test_query_count: test the totals are worked out in one query however many rows they cover
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.maria = Interpreter.objects.create(
+            email="wowza@gmail.com", first_name="Maria", last_name="Lopez")
+        self.pierre = Interpreter.objects.create(
+            email="pierre@gmail.com", first_name="Pierre", last_name="Dupont")
+        self.french = Language.objects.create(language_name="French")
+
+        self.create_appointment(datetime(2024,11,5,9,0), 90, interpreter=self.maria)
+        self.create_appointment(datetime(2024,11,20,9,0), 60, interpreter=self.maria,
+                                actual_duration_minutes=75)
+        self.create_appointment(datetime(2024,12,1,9,0), 1500, interpreter=self.maria)
+        self.create_appointment(datetime(2024,12,2,9,0), 30, interpreter=self.pierre,
+                                language=self.french)
+        # Not billed: unassigned and cancelled
+        self.create_appointment(datetime(2024,12,3,9,0), 600)
+        self.create_appointment(datetime(2024,12,4,9,0), 600, interpreter=self.pierre,
+                                active=False)
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.maria_token, _created = Token.objects.get_or_create(user=self.maria)
+        self.client.cookies["authToken"] = self.admin_token
+
+    def billed(self, query=""):
+        response = self.client.get(f"/api/billed-hours/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data["result"]
+
+    def test_total(self):
+        self.assertEqual(self.billed(), {
+            "appointments": 4,
+            "minutes": 1695,
+            "hours": Decimal("28.25")
+        })
+
+    def test_actual_duration(self):
+        totals = billed_hours(Appointment.objects.filter(interpreter=self.maria), [])
+        self.assertEqual(totals["minutes"], 90 + 75 + 1500)
+
+        Appointment.objects.update(actual_duration_minutes=None)
+        totals = billed_hours(Appointment.objects.filter(interpreter=self.maria), [])
+        self.assertEqual(totals["minutes"], 90 + 60 + 1500)
+
+    def test_group_by(self):
+        result = self.billed("?group_by=interpreter,month")
+        self.assertEqual([dict(row) for row in result], [
+            {
+                "interpreter_id": self.maria.id,
+                "month": date(2024,11,1),
+                "interpreter_name": "Maria Lopez",
+                "appointments": 2,
+                "minutes": 165,
+                "hours": Decimal("2.75")
+            },
+            {
+                "interpreter_id": self.maria.id,
+                "month": date(2024,12,1),
+                "interpreter_name": "Maria Lopez",
+                "appointments": 1,
+                "minutes": 1500,
+                "hours": Decimal("25.00")
+            },
+            {
+                "interpreter_id": self.pierre.id,
+                "month": date(2024,12,1),
+                "interpreter_name": "Pierre Dupont",
+                "appointments": 1,
+                "minutes": 30,
+                "hours": Decimal("0.50")
+            },
+        ])
+
+    def test_group_by_customer_and_language(self):
+        result = self.billed("?group_by=customer,language")
+        self.assertEqual(
+            [(row["customer_name"], row["organisation"], row["language_name"], row["minutes"])
+             for row in result],
+            [("Yogi Bear", "Jellystone Park", "Spanish", 1665),
+             ("Yogi Bear", "Jellystone Park", "French", 30)]
+        )
+
+    def test_filters(self):
+        result = self.billed(f"?from=2024-12-01&interpreter={self.maria.id}")
+        self.assertEqual(result["appointments"], 1)
+        self.assertEqual(result["minutes"], 1500)
+
+        result = self.billed("?to=2024-01-01")
+        self.assertEqual(result, {"appointments": 0, "minutes": 0, "hours": Decimal("0.00")})
+
+        response = self.client.get("/api/billed-hours/?from=yesterday")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_group_by(self):
+        for group_by in ["location", "month,month", "interpreter,location"]:
+            response = self.client.get(f"/api/billed-hours/?group_by={group_by}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["error"]["error-code"], "invalid-filter")
+
+    def test_permissions(self):
+        self.client.cookies["authToken"] = self.maria_token
+        response = self.client.get("/api/billed-hours/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_query_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.billed("?group_by=interpreter,customer,language,month")
+            return len(context.captured_queries)
+
+        # The first request also looks up the token, which is cached after that
+        count_queries()
+        before = count_queries()
+        for i in range(5):
+            interpreter = Interpreter.objects.create(email=f"extra{i}@gmail.com")
+            self.create_appointment(datetime(2025,1,i + 1,9,0), 60, interpreter=interpreter)
+        self.assertEqual(count_queries(), before)
+        self.assertEqual(before, 1)
@@ -0,0 +1,280 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from threading import Event
+from unittest import mock, skipIf
+from django.contrib.auth.models import update_last_login
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from datetime import datetime, time
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from bookingandbilling.models import (
+    Admin,
+    Appointment,
+    Customer,
+    Interpreter,
+    Language,
+    TableChange,
+    Translation
+)
+from bookingandbilling.renderers import ORJSONRenderer, orjson
+
+class TestConditionalRequests(TestCase):
+    """
+
+    Test ETags and 304 Not Modified responses on the polled endpoints
+
+    test_not_modified: test a matching If-None-Match gets an empty 304
+    test_changes: test saving a row the response is built from changes the ETag
+    test_queryset_update: test writes that skip model signals still change the ETag
+    test_related_changes: test changes to nested interpreters and their offers change the ETag
+    test_log_in_unchanged: test logging in doesn't change the ETag of responses listing users
+    test_fold: test folding the recorded changes leaves the ETag unchanged
+    test_per_user: test users don't share ETags for the same URL
+    test_per_query: test query parameters are part of the ETag
+    test_errors: test error responses aren't tagged
+    test_check_auth: test the auth check is tagged without reading any table
+    test_query_count: test a 304 is answered with a single query
+
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.interpreter = Interpreter.objects.create(email="wowza@gmail.com")
+        self.yogi = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com"
+        )
+        self.booboo = Customer.objects.create(
+            first_name="Boo",
+            last_name="Boo",
+            email="booboo@jellystone.com"
+        )
+        self.spanish = Language.objects.create(language_name="Spanish")
+        self.appointment = Appointment.objects.create(
+            customer=self.yogi,
+            planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+            planned_duration_minutes=60,
+            location="Glasgow",
+            language=self.spanish,
+            interpreter=self.interpreter
+        )
+        self.translation = Translation.objects.create(
+            customer=self.yogi, language=self.spanish, word_count=100)
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.yogi_token, _created = Token.objects.get_or_create(user=self.yogi)
+        self.booboo_token, _created = Token.objects.get_or_create(user=self.booboo)
+        self.client.cookies["authToken"] = self.yogi_token
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def assertNotModified(self, url, etag, if_none_match=None):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match or etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_not_modified(self):
+        for url in ["/api/appointments/", "/api/translations/", "/api/languages/"]:
+            etag = self.etag(url)
+            self.assertNotModified(url, etag)
+            self.assertNotModified(url, etag, f'"other", W/{etag}')
+
+        response = self.client.get("/api/languages/")
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+    def test_changes(self):
+        etag = self.etag("/api/appointments/")
+        self.appointment.location = "Edinburgh"
+        self.appointment.save()
+        self.assertModified("/api/appointments/", etag)
+
+        etag = self.etag("/api/languages/")
+        Language.objects.create(language_name="French")
+        self.assertModified("/api/languages/", etag)
+
+        etag = self.etag("/api/translations/")
+        self.translation.delete()
+        self.assertModified("/api/translations/", etag)
+
+    def test_queryset_update(self):
+        etag = self.etag("/api/appointments/")
+        Appointment.objects.filter(id=self.appointment.id).update(location="Edinburgh")
+        self.assertModified("/api/appointments/", etag)
+
+    def test_related_changes(self):
+        etag = self.etag("/api/appointments/")
+        self.translation.offered_to.add(self.interpreter)
+        self.assertModified("/api/appointments/", etag)
+
+        self.client.cookies["authToken"] = self.admin_token
+        etag = self.etag("/api/all-interpreters/")
+        self.interpreter.first_name = "Maria"
+        self.interpreter.save()
+        self.assertModified("/api/all-interpreters/", etag)
+
+    def test_log_in_unchanged(self):
+        etag = self.etag("/api/appointments/")
+        update_last_login(None, self.yogi)
+        self.assertNotModified("/api/appointments/", etag)
+
+        self.client.cookies["authToken"] = self.admin_token
+        etag = self.etag("/api/all-interpreters/")
+        update_last_login(None, self.interpreter)
+        update_last_login(None, self.admin)
+        self.assertNotModified("/api/all-interpreters/", etag)
+
+    def test_fold(self):
+        with mock.patch("bookingandbilling.versions.VERSION_FOLD_THRESHOLD", 3):
+            for location in ["Edinburgh", "Dundee", "Aberdeen"]:
+                Appointment.objects.filter(id=self.appointment.id).update(location=location)
+            etag = self.etag("/api/appointments/")
+            self.assertFalse(TableChange.objects.filter(table=Appointment._meta.db_table).exists())
+            self.assertNotModified("/api/appointments/", etag)
+
+            Appointment.objects.filter(id=self.appointment.id).update(location="Glasgow")
+            self.assertModified("/api/appointments/", etag)
+
+    def test_per_user(self):
+        etag = self.etag("/api/appointments/")
+        self.client.cookies["authToken"] = self.booboo_token
+        self.assertModified("/api/appointments/", etag)
+
+    def test_per_query(self):
+        etag = self.etag("/api/appointments/")
+        self.assertModified("/api/appointments/?search=glasgow", etag)
+
+    def test_errors(self):
+        response = self.client.get("/api/appointments/?from=yesterday")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_check_auth(self):
+        etag = self.etag("/api/check-auth/")
+        with CaptureQueriesContext(connection) as context:
+            self.assertNotModified("/api/check-auth/", etag)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_query_count(self):
+        # The first request also looks up the token, which is cached after that
+        etag = self.etag("/api/appointments/")
+        with CaptureQueriesContext(connection) as context:
+            self.assertNotModified("/api/appointments/", etag)
+        self.assertEqual(len(context.captured_queries), 1)
+
+class TestConcurrentVersionedWrites(TransactionTestCase):
+    """
+
+    Test writes to a versioned table from separate transactions
+
+    test_writers_dont_wait: test a write doesn't wait for another transaction writing the table
+
+    """
+
+    def setUp(self):
+        self.appointments = [
+            Appointment.objects.create(
+                planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+                planned_duration_minutes=60,
+                location="Glasgow"
+            )
+            for _ in range(2)
+        ]
+
+    def hold_write(self, written, release):
+        try:
+            with transaction.atomic():
+                Appointment.objects.filter(id=self.appointments[0].id).update(location="Dundee")
+                written.set()
+                release.wait(10)
+        finally:
+            connection.close()
+
+    def test_writers_dont_wait(self):
+        written, release = Event(), Event()
+        with ThreadPoolExecutor(1) as executor:
+            holder = executor.submit(self.hold_write, written, release)
+            try:
+                self.assertTrue(written.wait(10))
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")
+                    Appointment.objects.filter(id=self.appointments[1].id).update(
+                        location="Edinburgh")
+            finally:
+                release.set()
+            holder.result()
+
+        self.assertEqual(
+            TableChange.objects.filter(table=Appointment._meta.db_table).count(), 4)
+
+@skipIf(orjson is None, "orjson isn't installed")
+class TestORJSONRenderer(TestCase):
+    """
+
+    Test the orjson renderer writes the same JSON as DRF's JSONRenderer
+
+    test_same_output: test dates, decimals, lazy strings and nesting render identically
+    test_indent: test indented output falls back to JSONRenderer
+    test_feed: test a real feed response renders identically
+
+    """
+
+    def assertSameJSON(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type)
+        )
+
+    def test_same_output(self):
+        self.assertSameJSON({
+            "utc": timezone.make_aware(datetime(2024,12,1,9,0,30,250)),
+            "naive": datetime(2024,12,1,9,0),
+            "date": datetime(2024,12,1).date(),
+            "time": time(1,30),
+            "decimal": Decimal("1.50"),
+            "lazy": gettext_lazy("Translation"),
+            "text": "Glasgow Edinburgh é",
+            "nested": [{"id": 1, "ok": True, "none": None}],
+            1: "integer key",
+        })
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent(self):
+        self.assertSameJSON({"a": [1, 2]}, "application/json; indent=4")
+
+    def test_feed(self):
+        admin = Admin.objects.create(email="johnbrown@gmail.com")
+        customer = Customer.objects.create(email="picnicbaskets@jellystone.com")
+        Appointment.objects.create(
+            customer=customer,
+            planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+            planned_duration_minutes=90,
+            location="Glasgow",
+            language=Language.objects.create(language_name="Spanish"),
+            interpreter=Interpreter.objects.create(email="wowza@gmail.com")
+        )
+
+        client = APIClient()
+        client.cookies["authToken"], _created = Token.objects.get_or_create(user=admin)
+        response = client.post("/api/fetch-appointments/", {"unassigned": False},
+                               format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["result"]), 1)
+        self.assertSameJSON(response.data)
@@ -0,0 +1,121 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from datetime import datetime, time
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+from bookingandbilling.durations import format_duration, parse_duration
+from bookingandbilling.models import Appointment, Customer, Interpreter, Language
+from bookingandbilling.serializers.appointment_serializers import (
+    CreateAppointmentSerializer
+)
+
+class TestDurations(TestCase):
+    """
+
+    Test appointment durations stored as whole minutes
+
+    test_parse: test minutes and H:MM strings are parsed and anything else rejected
+    test_format: test minutes are written out in hours and minutes
+    test_create_long_appointment: test an appointment can be booked for over 24 hours
+    test_create_invalid_duration: test an unreadable or empty duration is rejected
+    test_edit_actual_duration: test the edit view stores the actual duration in minutes
+    test_fill_duration_minutes: test durations saved as times are copied into minutes
+
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com"
+        )
+        self.interpreter = Interpreter.objects.create(email="wowza@gmail.com")
+        self.appointment = Appointment.objects.create(
+            customer=self.customer,
+            planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+            planned_duration_minutes=90,
+            location="Glasgow",
+            language=Language.objects.create(language_name="Spanish"),
+            interpreter=self.interpreter
+        )
+        self.data = {
+            "customer": self.customer.id,
+            "language": "French",
+            "location": "Glasgow",
+            "planned_start_time": "2025-01-24T20:00",
+            "planned_duration": "26:30",
+            "gender": "X",
+        }
+
+    def test_parse(self):
+        self.assertEqual(parse_duration("01:30"), 90)
+        self.assertEqual(parse_duration("1:30:59"), 90)
+        self.assertEqual(parse_duration("26:05"), 1565)
+        self.assertEqual(parse_duration(45), 45)
+        for value in ["", "1:5", "01:60", "an hour", "-1:00", -5, True, None]:
+            with self.assertRaises(ValueError):
+                parse_duration(value)
+
+    def test_format(self):
+        self.assertEqual(format_duration(90), "1 hours 30 minutes")
+        self.assertEqual(format_duration(45), "45 minutes")
+        self.assertEqual(format_duration(1500), "25 hours")
+        self.assertIsNone(format_duration(0))
+        self.assertIsNone(format_duration(None))
+
+    def test_create_long_appointment(self):
+        serializer = CreateAppointmentSerializer(data=self.data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        appointment = serializer.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.planned_duration_minutes, 1590)
+        self.assertEqual(
+            appointment.planned_end_time,
+            timezone.make_aware(datetime(2025,1,25,22,30))
+        )
+
+        self.data["planned_duration"] = 45
+        serializer = CreateAppointmentSerializer(data=self.data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().planned_duration_minutes, 45)
+
+    def test_create_invalid_duration(self):
+        for duration in ["an hour", "00:00", "1:75"]:
+            self.data["planned_duration"] = duration
+            serializer = CreateAppointmentSerializer(data=self.data)
+            self.assertFalse(serializer.is_valid())
+            self.assertIn("planned_duration", serializer.errors)
+
+    def test_edit_actual_duration(self):
+        client = APIClient()
+        client.cookies["authToken"], _created = Token.objects.get_or_create(
+            user=self.interpreter)
+
+        def edit(duration):
+            response = client.post("/api/edit-appointments/", {
+                "appID": self.appointment.id,
+                "appActualStartTime": "09:10",
+                "appActualDuration": duration
+            }, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.appointment.refresh_from_db()
+
+        edit("01:15")
+        self.assertEqual(self.appointment.actual_duration_minutes, 75)
+        edit("not a duration")
+        self.assertEqual(self.appointment.actual_duration_minutes, 75)
+        edit("")
+        self.assertIsNone(self.appointment.actual_duration_minutes)
+
+    def test_fill_duration_minutes(self):
+        Appointment.objects.update(
+            planned_duration_minutes=None,
+            planned_duration=time(1,30),
+            actual_duration=time(1,15)
+        )
+        call_command("fill_duration_minutes", stdout=StringIO())
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.planned_duration_minutes, 90)
+        self.assertEqual(self.appointment.actual_duration_minutes, 75)
@@ -1,5 +1,6 @@
 from django.test import TestCase, RequestFactory
 from django.core import mail
+from django.core.management import call_command
 from bookingandbilling.views.views_registration import send_validation_email, check_email_validation
 from bookingandbilling.models import Customer
 from django.utils.http import urlsafe_base64_encode
@@ -31,10 +32,17 @@ class emailTestCase(TestCase):
 
         email = send_validation_email(request, self.customer)
 
-        self.assertEqual(len(mail.outbox), 1)
+        # Queued during the request, delivered by the worker
+        self.assertEqual(len(mail.outbox), 0)
         self.assertEqual(email.subject, "Account Validation")
-        self.assertEqual(email.content_subtype, "html")
-        self.assertEqual(email.to, ["bookingandbillingtest0@example.com"])
+        self.assertEqual(email.recipient, "bookingandbillingtest0@example.com")
+
+        call_command("send_queued_emails", "--once")
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Account Validation")
+        self.assertEqual(mail.outbox[0].content_subtype, "html")
+        self.assertEqual(mail.outbox[0].to, ["bookingandbillingtest0@example.com"])
    
     def test_email_checking_customer(self):
 
@@ -0,0 +1,163 @@
+from datetime import datetime
+from rest_framework.test import APIClient
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.models import (
+    Admin,
+    Customer,
+    Interpreter,
+    Language,
+    Translation
+)
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+import json
+
+class BaseTestCase(AppointmentFactoryMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.interpreter = Interpreter.objects.create(email="wowza@gmail.com")
+        self.booboo = Customer.objects.create(
+            first_name="Boo",
+            last_name="Boo",
+            email="booboo@jellystone.com"
+        )
+        self.french = Language.objects.create(language_name="French")
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.customer_token, _created = Token.objects.get_or_create(user=self.yogi)
+        self.client.cookies["authToken"] = self.admin_token
+
+    def fetch(self, url, query, unassigned=False):
+        response = self.client.post(
+            url + query, json.dumps({"unassigned": unassigned}),
+            content_type="application/json"
+        )
+        return response
+
+    def fetch_ids(self, url, query, unassigned=False):
+        response = self.fetch(url, query, unassigned)
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["result"]]
+
+class TestAppointmentFilters(BaseTestCase):
+    """
+
+    Test narrowing the appointment feeds with query parameters
+
+    test_date_range: test from and to bound the planned start time, a date including its day
+    test_related_filters: test filtering by language, customer and interpreter IDs
+    test_status_and_invoice: test filtering by status and invoice state
+    test_search: test every word of a search prefix matches the location or company
+    test_combined_with_pages: test filters apply before the feed is paginated
+    test_customer_feed: test a customer's own feed takes the same filters
+    test_invalid_filters: test unparseable filter values are rejected
+
+    """
+
+    url = "/api/fetch-appointments/"
+
+    def setUp(self):
+        super().setUp()
+        self.glasgow = self.create_appointment(
+            datetime(2024,12,1,9,0), location="Glasgow Royal Infirmary",
+            company="NHS Greater Glasgow", interpreter=self.interpreter)
+        self.edinburgh = self.create_appointment(
+            datetime(2024,12,2,9,0), location="Edinburgh Sheriff Court",
+            company="Scottish Courts", interpreter=self.interpreter, customer=self.booboo,
+            language=self.french, status="Complete", invoice_generated=True)
+        self.dundee = self.create_appointment(
+            datetime(2024,12,3,23,30), location="Ninewells Hospital",
+            interpreter=self.interpreter)
+
+    def test_date_range(self):
+        self.assertEqual(self.fetch_ids(self.url, "?from=2024-12-02"),
+                         [self.edinburgh.id, self.dundee.id])
+        self.assertEqual(self.fetch_ids(self.url, "?to=2024-12-02"),
+                         [self.glasgow.id, self.edinburgh.id])
+        self.assertEqual(
+            self.fetch_ids(self.url, "?from=2024-12-01T10:00:00Z&to=2024-12-03T23:30:00Z"),
+            [self.edinburgh.id]
+        )
+
+    def test_related_filters(self):
+        self.assertEqual(self.fetch_ids(self.url, f"?language={self.french.id}"),
+                         [self.edinburgh.id])
+        self.assertEqual(
+            self.fetch_ids(self.url, f"?customer={self.yogi.id},{self.booboo.id}"),
+            [self.glasgow.id, self.edinburgh.id, self.dundee.id]
+        )
+        self.assertEqual(self.fetch_ids(self.url, f"?interpreter={self.admin.id}"), [])
+
+    def test_status_and_invoice(self):
+        self.assertEqual(self.fetch_ids(self.url, "?status=Complete"), [self.edinburgh.id])
+        self.assertEqual(self.fetch_ids(self.url, "?invoice_generated=false"),
+                         [self.glasgow.id, self.dundee.id])
+
+    def test_search(self):
+        self.assertEqual(self.fetch_ids(self.url, "?search=glas"), [self.glasgow.id])
+        self.assertEqual(self.fetch_ids(self.url, "?search=Royal%20NHS"), [self.glasgow.id])
+        self.assertEqual(self.fetch_ids(self.url, "?search=court"), [self.edinburgh.id])
+        self.assertEqual(self.fetch_ids(self.url, "?search=hospital%20glasgow"), [])
+        # Query syntax in the search is only treated as words
+        self.assertEqual(self.fetch_ids(self.url, "?search=ninewells%27%20%7C%20!"),
+                         [self.dundee.id])
+
+    def test_combined_with_pages(self):
+        response = self.fetch(self.url, f"?language={self.spanish.id}&page_size=1")
+        self.assertEqual([app["id"] for app in response.data["result"]], [self.glasgow.id])
+
+        response = self.fetch(
+            self.url, f"?language={self.spanish.id}&page_size=1&cursor={response.data['next']}")
+        self.assertEqual([app["id"] for app in response.data["result"]], [self.dundee.id])
+        self.assertIsNone(response.data["next"])
+
+    def test_customer_feed(self):
+        self.client.cookies["authToken"] = self.customer_token
+        response = self.client.get("/api/appointments/?search=ninewells")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([app["id"] for app in response.data["result"]["result"]],
+                         [self.dundee.id])
+
+    def test_invalid_filters(self):
+        for query in ["?from=yesterday", "?language=spanish", "?invoice_generated=maybe",
+                      "?search=%21%21"]:
+            response = self.fetch(self.url, query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["error"]["error-code"], "invalid-filter")
+
+class TestTranslationFilters(BaseTestCase):
+    """
+
+    Test narrowing the translation feeds with query parameters
+
+    test_filters: test filtering translations by language, customer and invoice state
+    test_search: test searching translations by company
+
+    """
+
+    url = "/api/fetch-translations/"
+
+    def setUp(self):
+        super().setUp()
+        self.nhs = Translation.objects.create(
+            customer=self.yogi, language=self.spanish, word_count=100,
+            company="NHS Lothian")
+        self.courts = Translation.objects.create(
+            customer=self.booboo, language=self.french, word_count=100,
+            company="Scottish Courts", invoice_generated=True)
+
+    def test_filters(self):
+        self.assertEqual(self.fetch_ids(self.url, f"?language={self.french.id}", True),
+                         [self.courts.id])
+        self.assertEqual(self.fetch_ids(self.url, f"?customer={self.yogi.id}", True),
+                         [self.nhs.id])
+        self.assertEqual(self.fetch_ids(self.url, "?invoice_generated=true", True),
+                         [self.courts.id])
+
+    def test_search(self):
+        self.assertEqual(self.fetch_ids(self.url, "?search=loth", True), [self.nhs.id])
@@ -0,0 +1,198 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from datetime import date, datetime
+from io import StringIO
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.invoicing import generate_invoices, render_invoice_documents
+from bookingandbilling.models import (
+    Admin,
+    Appointment,
+    Customer,
+    Invoice,
+    Translation
+)
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+import csv
+import os
+import shutil
+import tempfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+NOVEMBER = (date(2024,11,1), date(2024,12,1))
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestInvoiceDocuments(AppointmentFactoryMixin, TestCase):
+    """
+
+    Test exporting invoice lines and rendering and downloading invoice documents
+
+    test_export: test a month's invoice lines are streamed as CSV
+    test_export_customer: test the export can be narrowed to some customers
+    test_export_invalid: test a missing or malformed period or customer is rejected
+    test_export_permissions: test only admins can export invoices
+    test_formula_cells: test text starting like a formula is escaped in exports and documents
+    test_render: test each invoice's document is written by worker processes and stored
+    test_render_command: test the command renders only invoices without a document
+    test_download_permissions: test who may download an invoice document
+    test_download_missing: test invoices without a document or file are not found
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.booboo = Customer.objects.create(email="booboo@jellystone.com")
+
+        self.yogi_appointment = self.create_appointment(
+            datetime(2024,11,5,9,0), actual_duration_minutes=75)
+        self.booboo_appointment = self.create_appointment(
+            datetime(2024,11,12,9,0), actual_duration_minutes=30, customer=self.booboo)
+        self.yogi_translation = Translation.objects.create(
+            customer=self.yogi,
+            language=self.spanish,
+            company="Jellystone Park",
+            word_count=1000,
+            actual_word_count=1200
+        )
+        self.yogi_invoice, self.booboo_invoice = generate_invoices(*NOVEMBER)
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.yogi_token, _created = Token.objects.get_or_create(user=self.yogi)
+        self.booboo_token, _created = Token.objects.get_or_create(user=self.booboo)
+        self.client.cookies["authToken"] = self.admin_token
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def export(self, query):
+        response = self.client.get("/api/invoices/export/" + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(content.splitlines()))
+
+    def test_export(self):
+        rows = self.export("?period=2024-11")
+        self.assertEqual(rows[0][:6], ["Invoice", "Period", "Customer Email", "Customer Name",
+                                       "Organisation", "Item"])
+        self.assertEqual(rows[1:], [
+            [str(self.yogi_invoice.id), "2024-11", "picnicbaskets@jellystone.com", "Yogi Bear",
+             "Jellystone Park", "Appointment", str(self.yogi_appointment.id),
+             "2024-11-05 09:00", "Spanish", "Glasgow", "75", "minutes"],
+            [str(self.yogi_invoice.id), "2024-11", "picnicbaskets@jellystone.com", "Yogi Bear",
+             "Jellystone Park", "Translation", str(self.yogi_translation.id), "", "Spanish",
+             "Jellystone Park", "1200", "words"],
+            [str(self.booboo_invoice.id), "2024-11", "booboo@jellystone.com", "", "",
+             "Appointment", str(self.booboo_appointment.id), "2024-11-12 09:00", "Spanish",
+             "Glasgow", "30", "minutes"],
+        ])
+
+        response = self.client.get("/api/invoices/export/?period=2024-11")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"],
+                         'attachment; filename="invoices-2024-11.csv"')
+
+        self.assertEqual(len(self.export("?period=2024-10")), 1)
+
+    def test_export_customer(self):
+        rows = self.export(f"?period=2024-11&customer={self.booboo.id}")
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.booboo_invoice.id)])
+
+    def test_export_invalid(self):
+        for query in ["", "?period=November", "?period=2024-11&customer=yogi"]:
+            response = self.client.get("/api/invoices/export/" + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["error"]["error-code"], "invalid-filter")
+
+    def test_export_permissions(self):
+        self.client.cookies["authToken"] = self.yogi_token
+        response = self.client.get("/api/invoices/export/?period=2024-11")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_formula_cells(self):
+        Customer.objects.filter(pk=self.yogi.pk).update(
+            first_name="=HYPERLINK(\"http://example.com\")", organisation="@SUM(A1)")
+        Appointment.objects.filter(pk=self.yogi_appointment.pk).update(location="+44 141")
+        Translation.objects.filter(pk=self.yogi_translation.pk).update(company="-1+1")
+
+        rows = self.export("?period=2024-11")
+        self.assertEqual(rows[1][3:5], ["'=HYPERLINK(\"http://example.com\") Bear", "'@SUM(A1)"])
+        self.assertEqual(rows[1][9], "'+44 141")
+        self.assertEqual(rows[2][9], "'-1+1")
+        self.assertEqual(rows[3][9], "Glasgow")
+
+        render_invoice_documents(Invoice.objects.filter(pk=self.yogi_invoice.pk), workers=1)
+        self.yogi_invoice.refresh_from_db()
+        with open(os.path.join(MEDIA_ROOT, self.yogi_invoice.document.name), newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual([row[4] for row in rows[1:3]], ["'+44 141", "'-1+1"])
+
+    def test_render(self):
+        rendered = render_invoice_documents(Invoice.objects.all(), workers=2)
+        self.assertEqual(rendered, 2)
+
+        self.yogi_invoice.refresh_from_db()
+        self.assertEqual(self.yogi_invoice.document.name,
+                         f"invoice_documents/2024-11/invoice-{self.yogi_invoice.id}.csv")
+        with open(os.path.join(MEDIA_ROOT, self.yogi_invoice.document.name), newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[1:3], [
+            ["Appointment", str(self.yogi_appointment.id), "2024-11-05 09:00", "Spanish",
+             "Glasgow", "75", "minutes"],
+            ["Translation", str(self.yogi_translation.id), "", "Spanish", "Jellystone Park",
+             "1200", "words"],
+        ])
+        self.assertEqual(rows[-2:], [["Total", "", "", "", "", "75", "minutes"],
+                                     ["Total", "", "", "", "", "1200", "words"]])
+        self.assertFalse(any(name.endswith(".part") for name in
+                             os.listdir(os.path.join(MEDIA_ROOT, "invoice_documents/2024-11"))))
+
+    def test_render_command(self):
+        render_invoice_documents(Invoice.objects.filter(pk=self.yogi_invoice.pk), workers=1)
+
+        out = StringIO()
+        call_command("render_invoices", period="2024-11", workers=1, stdout=out)
+        self.assertEqual(
+            out.getvalue().strip(), "Rendered 1 invoice document(s) for November 2024.")
+
+        out = StringIO()
+        call_command("render_invoices", period="2024-11", workers=1, force=True, stdout=out)
+        self.assertEqual(
+            out.getvalue().strip(), "Rendered 2 invoice document(s) for November 2024.")
+
+        for options in [{"period": "last month"}, {"period": "2024-11", "workers": 0}]:
+            with self.assertRaises(CommandError):
+                call_command("render_invoices", stdout=StringIO(), **options)
+
+    def test_download_permissions(self):
+        render_invoice_documents(Invoice.objects.all(), workers=1)
+        url = f"/api/invoices/{self.yogi_invoice.id}/document/"
+
+        for token, expected in [
+            (self.admin_token, status.HTTP_200_OK),
+            (self.yogi_token, status.HTTP_200_OK),
+            (self.booboo_token, status.HTTP_403_FORBIDDEN),
+        ]:
+            self.client.cookies["authToken"] = token
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, expected)
+
+        self.client.cookies["authToken"] = self.yogi_token
+        response = self.client.get(url)
+        self.assertIn(b"Total", b"".join(response.streaming_content))
+
+    def test_download_missing(self):
+        url = f"/api/invoices/{self.yogi_invoice.id}/document/"
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get("/api/invoices/0/document/").status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        render_invoice_documents(Invoice.objects.all(), workers=1)
+        os.remove(os.path.join(MEDIA_ROOT, Invoice.objects.get(pk=self.yogi_invoice.pk)
+                               .document.name))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
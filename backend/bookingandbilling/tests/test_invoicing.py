@@ -0,0 +1,155 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from datetime import date, datetime
+from io import StringIO
+from bookingandbilling.invoicing import generate_invoices, parse_period
+from bookingandbilling.models import (
+    Appointment,
+    Customer,
+    Invoice,
+    InvoiceLine,
+    Translation
+)
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+
+NOVEMBER = (date(2024,11,1), date(2024,12,1))
+
+class TestInvoiceGeneration(AppointmentFactoryMixin, TestCase):
+    """
+
+    Test generating a period's invoices in bulk
+
+    test_parse_period: test a month is parsed into the first days of it and the next month
+    test_invoices: test each customer gets one invoice with the totals of their lines
+    test_billable: test only completed, active, uninvoiced work in the period is billed
+    test_marks_invoiced: test billed rows are marked invoiced and not billed again
+    test_unflagged_not_rebilled: test clearing the invoiced flag doesn't bill a row twice
+    test_customers: test invoicing can be limited to some customers
+    test_query_count: test the number of queries doesn't grow with customers or rows
+    test_command: test the command generates invoices for a month and rejects bad periods
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.booboo = Customer.objects.create(email="booboo@jellystone.com")
+
+        self.yogi_appointments = [
+            self.create_appointment(datetime(2024,11,5,9,0), actual_duration_minutes=75),
+            self.create_appointment(datetime(2024,11,30,23,0), actual_duration_minutes=120),
+        ]
+        self.booboo_appointment = self.create_appointment(
+            datetime(2024,11,12,9,0), actual_duration_minutes=30, customer=self.booboo)
+        self.yogi_translation = self.create_translation(self.yogi, 1200)
+
+    def create_translation(self, customer, actual_word_count, **kwargs):
+        return Translation.objects.create(**{
+            "customer": customer,
+            "language": self.spanish,
+            "word_count": 1000,
+            "actual_word_count": actual_word_count,
+            **kwargs
+        })
+
+    def test_parse_period(self):
+        self.assertEqual(parse_period("2024-11"), NOVEMBER)
+        self.assertEqual(parse_period("2024-12"), (date(2024,12,1), date(2025,1,1)))
+        for value in ["2024-13", "November", "2024-11-01"]:
+            with self.assertRaises(ValueError):
+                parse_period(value)
+
+    def test_invoices(self):
+        invoices = list(generate_invoices(*NOVEMBER))
+        self.assertEqual([invoice.customer for invoice in invoices], [self.yogi, self.booboo])
+
+        yogi, booboo = invoices
+        self.assertEqual((yogi.period_start, yogi.period_end), NOVEMBER)
+        self.assertEqual(yogi.appointment_count, 2)
+        self.assertEqual(yogi.billed_minutes, 195)
+        self.assertEqual(yogi.translation_count, 1)
+        self.assertEqual(yogi.billed_words, 1200)
+        self.assertEqual(
+            {(line.appointment_id, line.translation_id, line.quantity)
+             for line in yogi.lines.all()},
+            {(self.yogi_appointments[0].id, None, 75),
+             (self.yogi_appointments[1].id, None, 120),
+             (None, self.yogi_translation.id, 1200)}
+        )
+        self.assertEqual(booboo.billed_minutes, 30)
+        self.assertEqual(booboo.billed_words, 0)
+
+    def test_billable(self):
+        not_billed = [
+            self.create_appointment(datetime(2024,11,6,9,0), actual_duration_minutes=None),
+            self.create_appointment(datetime(2024,12,1,0,0), actual_duration_minutes=60),
+            self.create_appointment(datetime(2024,10,31,23,59), actual_duration_minutes=60),
+            self.create_appointment(datetime(2024,11,7,9,0), actual_duration_minutes=60,
+                                    active=False),
+            self.create_appointment(datetime(2024,11,8,9,0), actual_duration_minutes=60,
+                                    invoice_generated=True),
+            self.create_appointment(datetime(2024,11,9,9,0), actual_duration_minutes=60,
+                                    customer=None),
+        ]
+        self.create_translation(self.yogi, None)
+
+        generate_invoices(*NOVEMBER)
+        self.assertFalse(InvoiceLine.objects.filter(appointment__in=not_billed).exists())
+        self.assertEqual(InvoiceLine.objects.count(), 4)
+
+    def test_marks_invoiced(self):
+        generate_invoices(*NOVEMBER)
+        self.assertFalse(Appointment.objects.filter(invoice_generated=False).exists())
+        self.assertFalse(Translation.objects.filter(invoice_generated=False).exists())
+
+        self.assertEqual(list(generate_invoices(*NOVEMBER)), [])
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_unflagged_not_rebilled(self):
+        generate_invoices(*NOVEMBER)
+        Appointment.objects.filter(id=self.booboo_appointment.id).update(invoice_generated=False)
+        Translation.objects.filter(id=self.yogi_translation.id).update(invoice_generated=False)
+
+        self.assertEqual(list(generate_invoices(*NOVEMBER)), [])
+        self.assertEqual(InvoiceLine.objects.filter(appointment=self.booboo_appointment).count(), 1)
+        self.assertEqual(InvoiceLine.objects.filter(translation=self.yogi_translation).count(), 1)
+
+    def test_customers(self):
+        invoices = list(generate_invoices(*NOVEMBER, customers=[self.booboo.id]))
+        self.assertEqual([invoice.customer for invoice in invoices], [self.booboo])
+        self.assertFalse(InvoiceLine.objects.filter(invoice__customer=self.yogi).exists())
+        self.assertFalse(Translation.objects.get(pk=self.yogi_translation.pk).invoice_generated)
+
+        invoices = list(generate_invoices(*NOVEMBER))
+        self.assertEqual([invoice.customer for invoice in invoices], [self.yogi])
+
+    def test_query_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                generate_invoices(*NOVEMBER)
+            return len(context.captured_queries)
+
+        before = count_queries()
+        Invoice.objects.all().delete()
+        Appointment.objects.update(invoice_generated=False)
+        Translation.objects.update(invoice_generated=False)
+        for i in range(5):
+            customer = Customer.objects.create(email=f"c{i}@gmail.com")
+            self.create_appointment(datetime(2024,11,i + 1,9,0), actual_duration_minutes=60,
+                                    customer=customer)
+            self.create_translation(customer, 500)
+        self.assertEqual(count_queries(), before)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("generate_invoices", period="2024-11", stdout=out)
+        self.assertEqual(
+            out.getvalue().strip(),
+            "Generated 2 invoice(s) for November 2024 covering 3 appointment(s) and "
+            "1 translation(s)."
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("generate_invoices", period="last month", stdout=StringIO())
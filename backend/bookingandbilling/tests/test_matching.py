@@ -0,0 +1,137 @@
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import datetime, timedelta
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.matching import candidate_interpreters
+from bookingandbilling.models import (
+    Admin,
+    Gender,
+    Interpreter,
+    Language,
+    Tag
+)
+from bookingandbilling.tests.factories import AppointmentFactoryMixin
+
+class TestCandidateInterpreters(AppointmentFactoryMixin, TestCase):
+    """
+
+    Test ranking the interpreters an appointment could be offered to
+
+    test_language: test only interpreters speaking the appointment's language match
+    test_gender_preference: test a gender preference narrows the candidates
+    test_tags: test candidates must have every requested tag
+    test_availability: test interpreters booked at the same time don't match
+    test_ranking: test interpreters with fewer upcoming appointments come first
+    test_endpoint: test the candidate interpreters endpoint
+    test_endpoint_invalid: test the endpoint with a missing appointment or bad parameters
+    test_query_count: test the endpoint's query count doesn't grow with the candidates
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.french = Language.objects.create(language_name="French")
+        self.medical = Tag.objects.create(name="Medical")
+        self.legal = Tag.objects.create(name="Legal")
+
+        self.maria = self.create_interpreter("maria", Gender.FEMALE, [self.spanish])
+        self.jose = self.create_interpreter("jose", Gender.MALE, [self.spanish, self.french])
+        self.claire = self.create_interpreter("claire", Gender.FEMALE, [self.french])
+        self.maria.tag.add(self.medical, self.legal)
+        self.jose.tag.add(self.medical)
+
+        self.start = timezone.now() + timedelta(days=7)
+        self.appointment = self.create_appointment(self.start)
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+
+    def create_interpreter(self, name, gender, languages):
+        interpreter = Interpreter.objects.create(email=f"{name}@gmail.com", gender=gender)
+        interpreter.languages.add(*languages)
+        return interpreter
+
+    def candidate_ids(self, appointment=None, tag_ids=()):
+        return [
+            interpreter.id for interpreter in
+            candidate_interpreters(appointment or self.appointment, tag_ids)
+        ]
+
+    def test_language(self):
+        self.assertEqual(self.candidate_ids(), [self.maria.id, self.jose.id])
+
+    def test_gender_preference(self):
+        appointment = self.create_appointment(
+            self.start + timedelta(days=1), gender_preference=Gender.MALE)
+        self.assertEqual(self.candidate_ids(appointment), [self.jose.id])
+
+    def test_tags(self):
+        self.assertEqual(self.candidate_ids(tag_ids=[self.medical.id]),
+                         [self.maria.id, self.jose.id])
+        self.assertEqual(self.candidate_ids(tag_ids=[self.medical.id, self.legal.id]),
+                         [self.maria.id])
+
+    def test_availability(self):
+        self.create_appointment(self.start + timedelta(minutes=30), interpreter=self.maria)
+        self.assertEqual(self.candidate_ids(), [self.jose.id])
+
+    def test_ranking(self):
+        self.create_appointment(self.start + timedelta(days=2), interpreter=self.maria)
+        # Past appointments don't count towards an interpreter's workload
+        self.create_appointment(timezone.now() - timedelta(days=2), interpreter=self.jose)
+        self.create_appointment(timezone.now() - timedelta(days=3), interpreter=self.jose)
+
+        candidates = list(candidate_interpreters(self.appointment))
+        self.assertEqual([c.id for c in candidates], [self.jose.id, self.maria.id])
+        self.assertEqual([c.upcoming_appointments for c in candidates], [0, 1])
+
+    def test_endpoint(self):
+        self.appointment.offered_to.add(self.jose)
+
+        self.client.cookies["authToken"] = self.admin_token
+        response = self.client.get(
+            "/api/candidate-interpreters/",
+            {"appID": self.appointment.id, "tags": f"{self.medical.id}", "limit": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["result"]), 1)
+        self.assertEqual(response.data["result"][0]["id"], self.maria.id)
+        self.assertEqual(response.data["result"][0]["tag"][0]["name"], "Medical")
+        self.assertFalse(response.data["result"][0]["already_offered"])
+
+        response = self.client.get("/api/candidate-interpreters/",
+                                   {"appID": self.appointment.id})
+        self.assertTrue(response.data["result"][1]["already_offered"])
+
+    def test_endpoint_invalid(self):
+        self.client.cookies["authToken"] = self.admin_token
+        for params in [{"appID": self.appointment.id, "tags": "medical"},
+                       {"appID": self.appointment.id, "limit": 0}]:
+            response = self.client.get("/api/candidate-interpreters/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for params in [{}, {"appID": 0}, {"appID": "abc"}]:
+            response = self.client.get("/api/candidate-interpreters/", params)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_count(self):
+        self.client.cookies["authToken"] = self.admin_token
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get("/api/candidate-interpreters/", {"appID": self.appointment.id})
+            return len(context.captured_queries)
+
+        # The first request also looks up the token, which is cached after that
+        count_queries()
+        before = count_queries()
+        for i in range(5):
+            self.create_interpreter(f"extra{i}", Gender.OTHER, [self.spanish]).tag.add(
+                self.legal)
+        self.assertEqual(count_queries(), before)
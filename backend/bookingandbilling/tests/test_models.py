@@ -2,7 +2,7 @@ from django.test import TestCase
 from django.db import IntegrityError
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime, time
+from datetime import datetime
 from django.core.files.uploadedfile import SimpleUploadedFile
 from bookingandbilling.models import (Admin,
                                       Interpreter,
@@ -490,7 +490,7 @@ class AppointmentTestCase(BaseTestCase):
         appointment = Appointment.objects.create(
             customer=self.customer_approved,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30),
+            planned_duration_minutes=90,
             location="Glasgow",
             language=self.spanish
         )
@@ -504,13 +504,13 @@ class AppointmentTestCase(BaseTestCase):
         appointment = Appointment.objects.create(
             customer=self.customer_approved,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30),
+            planned_duration_minutes=90,
             location="Glasgow",
             language=self.spanish,
             interpreter=self.interpreter,
             admin=self.admin1,
             actual_start_time=timezone.make_aware(datetime(2024,12,1,9,10)),
-            actual_duration=time(1,15),
+            actual_duration_minutes=75,
             status="Cancelled",
             gender_preference=Gender.MALE,
             notes="This is a test, let's hope\nthat the notes are stored correctly!",
@@ -522,7 +522,7 @@ class AppointmentTestCase(BaseTestCase):
             appointment.planned_start_time,
             timezone.make_aware(datetime(2024,12,1,9,0))
         )
-        self.assertEqual(appointment.planned_duration, time(1,30))
+        self.assertEqual(appointment.planned_duration_minutes, 90)
         self.assertEqual(appointment.location, "Glasgow")
         self.assertEqual(appointment.language, self.spanish)
         self.assertEqual(appointment.interpreter, self.interpreter)
@@ -531,7 +531,7 @@ class AppointmentTestCase(BaseTestCase):
             appointment.actual_start_time,
             timezone.make_aware(datetime(2024,12,1,9,10))
         )
-        self.assertEqual(appointment.actual_duration, time(1,15))
+        self.assertEqual(appointment.actual_duration_minutes, 75)
         self.assertEqual(appointment.status, "Cancelled")
         self.assertEqual(appointment.gender_preference, Gender.MALE)
         self.assertEqual(
@@ -543,11 +543,11 @@ class AppointmentTestCase(BaseTestCase):
     def test_admin_assigning_appointment(self):
         '''
         Appointment is created with a planned_start_time
-        and planned_duration to prevent an Integrity error
+        and planned_duration_minutes to prevent an Integrity error
         '''
         appointment = Appointment.objects.create(
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30)
+            planned_duration_minutes=90
         )
         appointment.interpreter = self.interpreter
         appointment.admin = self.admin1
@@ -562,12 +562,12 @@ class AppointmentTestCase(BaseTestCase):
     def test_customer_relation(self):
         '''
         Appointment is created with a planned_start_time
-        and planned_duration to prevent an Integrity error
+        and planned_duration_minutes to prevent an Integrity error
         '''
         appointment = Appointment.objects.create(
             customer=self.customer_approved,
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30)
+            planned_duration_minutes=90
         )
 
         self.assertEqual(appointment.customer, self.customer_approved)
@@ -576,11 +576,11 @@ class AppointmentTestCase(BaseTestCase):
     def test_defaults(self):
         '''
         Appointment is created with a planned_start_time
-        and planned_duration to prevent an Integrity error
+        and planned_duration_minutes to prevent an Integrity error
         '''
         appointment = Appointment.objects.create(
             planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
-            planned_duration=time(1,30)
+            planned_duration_minutes=90
         )
         self.assertEqual(appointment.status, "Upcoming")
         self.assertTrue(appointment.active)
@@ -0,0 +1,310 @@
+from rest_framework.test import APIClient
+from django.test import TestCase, TransactionTestCase
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import datetime
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from bookingandbilling.access_cache import access_cache
+from bookingandbilling.models import (
+    AccountType,
+    Appointment,
+    Customer,
+    Interpreter,
+    Language,
+    QueuedEmail,
+    Translation
+)
+from bookingandbilling.offers import AlreadyClaimed, claim_offer
+from bookingandbilling.permissions import can_read_translation
+from bookingandbilling.management.commands.benchmark_translation_claims import contend
+from django.core.management import call_command
+from io import StringIO
+import json
+
+INTERPRETER_COUNT = 10
+
+def create_offered_appointment(interpreters):
+    customer = Customer.objects.create(
+        first_name="Yogi",
+        last_name="Bear",
+        email="picnicbaskets@jellystone.com"
+    )
+    appointment = Appointment.objects.create(
+        customer=customer,
+        planned_start_time=timezone.make_aware(datetime(2025, 1, 1, 9, 0)),
+        planned_duration_minutes=90,
+        location="Glasgow",
+        language=Language.objects.create(language_name="Spanish")
+    )
+    appointment.offered_to.add(*interpreters)
+    return appointment
+
+class TestAcceptTranslationOffer(TestCase):
+    """
+
+    Test interpreters accepting offered translations
+
+    test_accept_after_other: test accepting a translation someone else accepted conflicts
+    test_accept_not_offered: test accepting a translation not offered is refused
+    test_claim_drops_cached_access: test cached document access is dropped once a claim commits
+
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        access_cache.clear()
+        self.interpreters = [
+            Interpreter.objects.create(email=f"interpreter{i}@gmail.com") for i in range(3)
+        ]
+        self.translation = Translation.objects.create(
+            customer=Customer.objects.create(email="picnicbaskets@jellystone.com"),
+            word_count=100
+        )
+        self.translation.offered_to.add(*self.interpreters[:2])
+
+    def respond(self, interpreter):
+        token, _created = Token.objects.get_or_create(user=interpreter)
+        self.client.cookies["authToken"] = token.key
+        return self.client.post(
+            "/api/update-translation/",
+            json.dumps({"translationID": self.translation.id, "accepted": True}),
+            content_type="application/json"
+        )
+
+    def test_accept_after_other(self):
+        self.assertEqual(self.respond(self.interpreters[0]).status_code, 200)
+        response = self.respond(self.interpreters[1])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.translation.refresh_from_db()
+        self.assertEqual(self.translation.interpreter_id, self.interpreters[0].id)
+        self.assertFalse(self.translation.offered_to.exists())
+
+    def test_accept_not_offered(self):
+        response = self.respond(self.interpreters[2])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.translation.refresh_from_db()
+        self.assertIsNone(self.translation.interpreter_id)
+
+    def test_claim_drops_cached_access(self):
+        winner, loser = self.interpreters[:2]
+        self.assertTrue(can_read_translation(loser, AccountType.INTERPRETER, self.translation.id))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                claim_offer(Translation, self.translation.id, winner)
+                # Left alone until the claim commits, so a concurrent read can't
+                # re-cache the answer from before it
+                self.assertTrue(access_cache.get(loser.pk, self.translation.id))
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertIsNone(access_cache.get(loser.pk, self.translation.id))
+        self.assertFalse(can_read_translation(loser, AccountType.INTERPRETER, self.translation.id))
+
+class TestAcceptAppointmentOffer(TestCase):
+    """
+
+    Test interpreters accepting and declining offered appointments
+
+    test_accept: test accepting assigns the appointment and withdraws the other offers
+    test_accept_after_other: test accepting an appointment someone else accepted conflicts
+    test_accept_not_offered: test accepting an appointment not offered is refused
+    test_decline: test declining only withdraws that interpreter's offer
+
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/api/updated-appointments/"
+
+        self.interpreters = [
+            Interpreter.objects.create(email=f"interpreter{i}@gmail.com") for i in range(3)
+        ]
+        self.appointment = create_offered_appointment(self.interpreters[:2])
+
+    def respond(self, interpreter, accepted):
+        token, _created = Token.objects.get_or_create(user=interpreter)
+        self.client.cookies["authToken"] = token.key
+        return self.client.post(
+            self.url,
+            json.dumps({"appID": self.appointment.id, "accepted": accepted}),
+            content_type="application/json"
+        )
+
+    def test_accept(self):
+        response = self.respond(self.interpreters[0], True)
+
+        self.assertEqual(response.status_code, 200)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.interpreter_id, self.interpreters[0].id)
+        self.assertFalse(self.appointment.offered_to.exists())
+        self.assertEqual(
+            list(QueuedEmail.objects.values_list("recipient", flat=True)),
+            [self.appointment.customer.email]
+        )
+
+    def test_accept_after_other(self):
+        self.respond(self.interpreters[0], True)
+        response = self.respond(self.interpreters[1], True)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["error"]["error-code"], "already-accepted")
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.interpreter_id, self.interpreters[0].id)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+
+    def test_accept_not_offered(self):
+        response = self.respond(self.interpreters[2], True)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.appointment.refresh_from_db()
+        self.assertIsNone(self.appointment.interpreter_id)
+
+    def test_decline(self):
+        response = self.respond(self.interpreters[0], False)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(self.appointment.offered_to.values_list("id", flat=True)),
+            [self.interpreters[1].id]
+        )
+
+class TestConcurrentAppointmentAcceptance(TransactionTestCase):
+    """
+
+    Test simultaneous acceptances against the database's real locking
+
+    test_one_winner: test exactly one of many interpreters accepting at once wins
+
+    """
+
+    def setUp(self):
+        self.interpreters = [
+            Interpreter.objects.create(email=f"interpreter{i}@gmail.com")
+            for i in range(INTERPRETER_COUNT)
+        ]
+        self.appointment = create_offered_appointment(self.interpreters)
+
+    def accept(self, interpreter, barrier):
+        try:
+            barrier.wait()
+            with transaction.atomic():
+                claim_offer(Appointment, self.appointment.id, interpreter)
+            return interpreter.id
+        except AlreadyClaimed:
+            return None
+        finally:
+            connection.close()
+
+    def test_one_winner(self):
+        barrier = Barrier(INTERPRETER_COUNT)
+        with ThreadPoolExecutor(INTERPRETER_COUNT) as executor:
+            results = list(executor.map(
+                lambda interpreter: self.accept(interpreter, barrier), self.interpreters
+            ))
+
+        winners = [result for result in results if result is not None]
+        self.assertEqual(len(winners), 1)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.interpreter_id, winners[0])
+        self.assertFalse(self.appointment.offered_to.exists())
+
+class TestConcurrentOverlappingAcceptance(TransactionTestCase):
+    """
+
+    Test one interpreter accepting overlapping appointments at the same time
+
+    test_one_accepted: test only one of two overlapping appointments accepted at once is confirmed
+
+    """
+
+    def setUp(self):
+        self.interpreter = Interpreter.objects.create(email="interpreter@gmail.com")
+        self.token, _created = Token.objects.get_or_create(user=self.interpreter)
+        self.appointments = [create_offered_appointment([self.interpreter])]
+        # Starts half way through the first
+        self.appointments.append(Appointment.objects.create(
+            customer=self.appointments[0].customer,
+            planned_start_time=timezone.make_aware(datetime(2025, 1, 1, 9, 45)),
+            planned_duration_minutes=90,
+            location="Glasgow",
+            language=self.appointments[0].language
+        ))
+        self.appointments[1].offered_to.add(self.interpreter)
+
+    def accept(self, appointment, barrier):
+        client = APIClient()
+        client.cookies["authToken"] = self.token.key
+        try:
+            barrier.wait()
+            return client.post(
+                "/api/updated-appointments/",
+                json.dumps({"appID": appointment.id, "accepted": True}),
+                content_type="application/json"
+            ).status_code
+        finally:
+            connection.close()
+
+    def test_one_accepted(self):
+        for _ in range(5):
+            Appointment.objects.update(interpreter=None)
+            for appointment in self.appointments:
+                appointment.offered_to.add(self.interpreter)
+
+            barrier = Barrier(2)
+            with ThreadPoolExecutor(2) as executor:
+                codes = list(executor.map(
+                    lambda appointment: self.accept(appointment, barrier), self.appointments
+                ))
+
+            self.assertEqual(sorted(codes), [status.HTTP_200_OK, status.HTTP_409_CONFLICT])
+            self.assertEqual(
+                Appointment.objects.filter(interpreter=self.interpreter).count(), 1)
+
+class TestConcurrentTranslationAcceptance(TransactionTestCase):
+    """
+
+    Test simultaneous translation acceptances against the database's real locking
+
+    test_one_winner_each: test each of several contended translations has exactly one winner
+    test_benchmark: test the contention benchmark runs and cleans up after itself
+
+    """
+
+    def test_one_winner_each(self):
+        interpreters = [
+            Interpreter.objects.create(email=f"interpreter{i}@gmail.com")
+            for i in range(INTERPRETER_COUNT)
+        ]
+        customer = Customer.objects.create(email="picnicbaskets@jellystone.com")
+        translations = []
+        for _ in range(5):
+            translation = Translation.objects.create(customer=customer, word_count=100)
+            translation.offered_to.add(*interpreters)
+            translations.append(translation)
+
+        results, elapsed = contend([translation.id for translation in translations], interpreters)
+
+        winners = {
+            translation_id: interpreter_id
+            for interpreter_id, won in results.items() for translation_id in won
+        }
+        self.assertEqual(sum(len(won) for won in results.values()), len(translations))
+        self.assertEqual(
+            dict(Translation.objects.values_list("id", "interpreter_id")), winners
+        )
+        self.assertFalse(Translation.offered_to.through.objects.exists())
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            "benchmark_translation_claims", "--interpreters", "4", "--translations", "10",
+            stdout=out
+        )
+        self.assertIn("exactly one interpreter", out.getvalue())
+        self.assertFalse(Translation.objects.exists())
+        self.assertFalse(Interpreter.objects.exists())
@@ -0,0 +1,266 @@
+from rest_framework.test import APIClient
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+from bookingandbilling.access_cache import access_cache
+from bookingandbilling.models import (
+    AccountType,
+    Admin,
+    Customer,
+    Interpreter,
+    Language,
+    Translation
+)
+from bookingandbilling.permissions import can_read_any_translation, can_read_translation
+from bookingandbilling.serializers.translation_serializers import CreateTranslationSerializer
+import shutil
+import tempfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BaseTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        access_cache.clear()
+
+        self.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        self.interpreter = Interpreter.objects.create(email="wowza@gmail.com")
+        self.customer = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com"
+        )
+        self.other_customer = Customer.objects.create(
+            first_name="Boo",
+            last_name="Boo",
+            email="booboo@jellystone.com"
+        )
+        self.spanish = Language.objects.create(language_name="Spanish")
+
+        self.content = b"0123456789" * 10
+        self.translation = Translation.objects.create(
+            customer=self.customer,
+            language=self.spanish,
+            word_count=10,
+            document=ContentFile(self.content, name="document.txt")
+        )
+        self.url = "/api/protected-media/" + self.translation.document.name.removeprefix(
+            "translation_documents/") + "/"
+
+        self.admin_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.interpreter_token, _created = Token.objects.get_or_create(user=self.interpreter)
+        self.customer_token, _created = Token.objects.get_or_create(user=self.customer)
+        self.other_customer_token, _created = Token.objects.get_or_create(
+            user=self.other_customer)
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+class TestProtectedMedia(BaseTestCase):
+    """
+
+    Test downloading translation documents through protected media
+
+    test_permissions: test who may download a translation document
+    test_etag: test a repeated download with a matching ETag is not sent again
+    test_range: test resuming a download with a byte range
+    test_range_not_satisfiable: test a range past the end of the file
+    test_stale_if_range: test a range with an outdated If-Range gets the whole file
+    test_accel_redirect: test nginx is told to send the file in X-Accel-Redirect mode
+    test_shared_document: test a document shared by identical uploads is readable by each owner
+    test_shared_document_name: test each owner of a shared document gets their own file name
+
+    """
+
+    def test_permissions(self):
+        for token, expected in [
+            (self.admin_token, status.HTTP_200_OK),
+            (self.customer_token, status.HTTP_200_OK),
+            (self.other_customer_token, status.HTTP_403_FORBIDDEN),
+            (self.interpreter_token, status.HTTP_403_FORBIDDEN),
+        ]:
+            self.client.cookies["authToken"] = token
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, expected)
+
+        self.translation.offered_to.add(self.interpreter)
+        self.client.cookies["authToken"] = self.interpreter_token
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_etag(self):
+        self.client.cookies["authToken"] = self.customer_token
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_range(self):
+        self.client.cookies["authToken"] = self.customer_token
+        for header, expected, content_range in [
+            ("bytes=10-19", self.content[10:20], "bytes 10-19/100"),
+            ("bytes=90-", self.content[90:], "bytes 90-99/100"),
+            ("bytes=-5", self.content[-5:], "bytes 95-99/100"),
+            ("bytes=95-500", self.content[95:], "bytes 95-99/100"),
+        ]:
+            response = self.client.get(self.url, headers={"Range": header})
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(b"".join(response.streaming_content), expected)
+
+    def test_range_not_satisfiable(self):
+        self.client.cookies["authToken"] = self.customer_token
+        response = self.client.get(self.url, headers={"Range": "bytes=100-"})
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_stale_if_range(self):
+        self.client.cookies["authToken"] = self.customer_token
+        response = self.client.get(
+            self.url, headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    @patch("bookingandbilling.media.ACCEL_REDIRECT", True)
+    def test_accel_redirect(self):
+        self.client.cookies["authToken"] = self.customer_token
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media-internal/" + self.translation.document.name
+        )
+        self.assertEqual(response.content, b"")
+
+        # Access is still checked before handing over to nginx
+        self.client.cookies["authToken"] = self.other_customer_token
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_shared_document(self):
+        shared = [
+            CreateTranslationSerializer().create({
+                "customer": customer,
+                "language": "Spanish",
+                "word_count": 10,
+                "document": ContentFile(self.content, name="shared.txt")
+            })
+            for customer in [self.customer, self.other_customer]
+        ]
+        self.assertEqual(shared[0].document.name, shared[1].document.name)
+        url = "/api/protected-media/" + shared[0].document.name.removeprefix(
+            "translation_documents/") + "/"
+
+        for token, expected in [
+            (self.customer_token, status.HTTP_200_OK),
+            (self.other_customer_token, status.HTTP_200_OK),
+            (self.interpreter_token, status.HTTP_403_FORBIDDEN),
+        ]:
+            self.client.cookies["authToken"] = token
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, expected)
+
+    def test_shared_document_name(self):
+        for customer, name in [(self.customer, "yogi.txt"), (self.other_customer, "booboo.txt")]:
+            translation = CreateTranslationSerializer().create({
+                "customer": customer,
+                "language": "Spanish",
+                "word_count": 10,
+                "document": ContentFile(self.content, name=name)
+            })
+        url = "/api/protected-media/" + translation.document.name.removeprefix(
+            "translation_documents/") + "/"
+
+        # Each customer is sent the name they uploaded the document with, never the other's
+        for token, name in [
+            (self.customer_token, "yogi.txt"),
+            (self.other_customer_token, "booboo.txt"),
+        ]:
+            self.client.cookies["authToken"] = token
+            response = self.client.get(url)
+            self.assertEqual(response["Content-Disposition"], f'inline; filename="{name}"')
+
+class TestMediaAccessCheck(BaseTestCase):
+    """
+
+    Test the access check behind protected media
+
+    test_single_query: test the check is one query however many translations a user has
+    test_shared_single_query: test checking the translations sharing a file is one query
+    test_cached: test a repeated check is answered from the cache
+    test_offer_change_invalidates: test changing offers drops cached decisions
+    test_reassignment_invalidates: test reassigning a translation drops cached decisions
+
+    """
+
+    def check(self, user, user_type):
+        return can_read_translation(user, user_type, self.translation.id)
+
+    def test_single_query(self):
+        for _ in range(20):
+            Translation.objects.create(
+                customer=self.customer,
+                language=self.spanish,
+                word_count=10,
+                interpreter=self.interpreter
+            ).offered_to.add(self.interpreter)
+        self.translation.offered_to.add(self.interpreter)
+
+        for user, user_type in [
+            (self.admin, AccountType.ADMIN),
+            (self.interpreter, AccountType.INTERPRETER),
+            (self.customer, AccountType.CUSTOMER),
+        ]:
+            with CaptureQueriesContext(connection) as context:
+                self.assertTrue(self.check(user, user_type))
+            self.assertEqual(len(context.captured_queries), 1)
+            self.assertIn("LIMIT 1", context.captured_queries[0]["sql"])
+
+    def test_shared_single_query(self):
+        shared = [self.translation.id] + [
+            Translation.objects.create(
+                customer=self.other_customer,
+                language=self.spanish,
+                word_count=10
+            ).id
+            for _ in range(5)
+        ]
+
+        for user, user_type, expected in [
+            (self.customer, AccountType.CUSTOMER, True),
+            (self.interpreter, AccountType.INTERPRETER, False),
+        ]:
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(can_read_any_translation(user, user_type, shared), expected)
+            self.assertEqual(len(context.captured_queries), 1)
+
+    def test_cached(self):
+        self.assertTrue(self.check(self.customer, AccountType.CUSTOMER))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check(self.customer, AccountType.CUSTOMER))
+
+    def test_offer_change_invalidates(self):
+        self.assertFalse(self.check(self.interpreter, AccountType.INTERPRETER))
+
+        self.translation.offered_to.add(self.interpreter)
+        self.assertTrue(self.check(self.interpreter, AccountType.INTERPRETER))
+
+        self.interpreter.offered_translations.remove(self.translation)
+        self.assertFalse(self.check(self.interpreter, AccountType.INTERPRETER))
+
+    def test_reassignment_invalidates(self):
+        self.assertTrue(self.check(self.customer, AccountType.CUSTOMER))
+
+        self.translation.customer = self.other_customer
+        self.translation.save()
+        self.assertFalse(self.check(self.customer, AccountType.CUSTOMER))
+        self.assertTrue(self.check(self.other_customer, AccountType.CUSTOMER))
@@ -0,0 +1,312 @@
+from django.utils import timezone
+from datetime import datetime, timedelta
+from rest_framework.test import APIClient
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from bookingandbilling.availability import (
+    booked_appointments,
+    busy_interpreter_ids,
+    free_interpreters
+)
+from bookingandbilling.filters import search_query
+from bookingandbilling.search import ranked_matches
+from bookingandbilling.models import (
+    Admin,
+    Appointment,
+    Customer,
+    Interpreter,
+    APPOINTMENT_SEARCH_FIELDS,
+    CUSTOMER_SEARCH_FIELDS,
+    USER_SEARCH_FIELDS,
+    Language,
+    Translation,
+    User,
+    search_vector
+)
+import json
+
+# Spread over the seeded appointments, so a search for one of them is selective
+LOCATIONS = ["Edinburgh", "Dundee", "Aberdeen", "Inverness", "Stirling", "Perth"]
+
+class BaseTestCase(TestCase):
+    """
+    Plans are checked against tables seeded to a realistic size and ANALYZEd, so the
+    planner weighs each index against scanning the table as it would in production.
+    The statistics ANALYZE records aren't rolled back with the seeded rows, so the
+    tables are analyzed again once the class is done, leaving the tests after it to
+    plan for the tables they actually have.
+    """
+
+    seeded_models = (User, Customer, Interpreter)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Admin.objects.create(email="johnbrown@gmail.com")
+        cls.interpreter = Interpreter.objects.create(email="wowza@gmail.com")
+        cls.customer = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com"
+        )
+        cls.spanish = Language.objects.create(language_name="Spanish")
+
+        for interpreter in [None, cls.interpreter]:
+            Appointment.objects.create(
+                customer=cls.customer,
+                planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+                planned_duration_minutes=90,
+                location="Glasgow",
+                language=cls.spanish,
+                interpreter=interpreter
+            )
+            Translation.objects.create(
+                customer=cls.customer,
+                language=cls.spanish,
+                interpreter=interpreter,
+                word_count=100
+            )
+        cls.seed()
+        cls.analyze()
+
+        cls.admin_token, _created = Token.objects.get_or_create(user=cls.admin)
+        cls.interpreter_token, _created = Token.objects.get_or_create(user=cls.interpreter)
+        cls.customer_token, _created = Token.objects.get_or_create(user=cls.customer)
+
+    @classmethod
+    def seed(cls):
+        """
+        A hundred customers and a hundred interpreters, to share several years of work
+        between them: nearly every appointment and translation assigned, a few waiting
+        for an interpreter and a few cancelled. Each has a small share of the tables, but
+        enough that their feeds run to several pages.
+        """
+        # Customers and interpreters are multi-table inherited, so can't be bulk created
+        cls.customers = [cls.customer, *(
+            Customer.objects.create(email=f"customer{i}@example.com", organisation=f"Firm {i}")
+            for i in range(99)
+        )]
+        cls.interpreters = [cls.interpreter, *(
+            Interpreter.objects.create(email=f"interpreter{i}@example.com") for i in range(99)
+        )]
+
+    @classmethod
+    def seeded_customer(cls, i):
+        return cls.customers[i % len(cls.customers)]
+
+    @classmethod
+    def seeded_interpreter(cls, i):
+        return None if i % 25 == 1 else cls.interpreters[i % len(cls.interpreters)]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.analyze()
+
+    @classmethod
+    def analyze(cls):
+        with connection.cursor() as cursor:
+            for model in cls.seeded_models:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def feed_query_plan(self, token, method, url, table, data=None):
+        """
+        Calls the view for a page of its feed, as clients read them, and EXPLAINs the
+        query it ran against the given table.
+        """
+        self.client.cookies["authToken"] = token
+        url += "?page_size=50"
+        with CaptureQueriesContext(connection) as context:
+            if data is None:
+                response = method(url)
+            else:
+                response = method(url, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        sql = next(
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("SELECT") and f'FROM "{table}"' in query["sql"]
+        )
+
+        return self.query_plan(sql)
+
+    def query_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN " + sql, params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+class TestAppointmentFeedIndexes(BaseTestCase):
+    """
+
+    Test appointment feeds are served by their indexes
+
+    test_unassigned_feed: test admin unassigned feed uses the partial unassigned index
+    test_assigned_feed: test admin assigned feed uses the partial assigned index
+    test_customer_feed: test customer feed uses the customer index
+    test_interpreter_feed: test interpreter accepted feed does not scan the table
+    test_booked_appointments: test finding overlapping bookings uses the period index
+    test_free_interpreters: test the bookings in a window are looked up once, not per interpreter
+    test_search: test searching appointments uses the search index
+
+    """
+
+    table = "bookingandbilling_appointment"
+    seeded_models = BaseTestCase.seeded_models + (Appointment,)
+
+    @classmethod
+    def seed(cls):
+        super().seed()
+        start = timezone.make_aware(datetime(2022,1,1,9,0))
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=cls.seeded_customer(i),
+                planned_start_time=start + timedelta(hours=3 * i),
+                planned_duration_minutes=60,
+                planned_end_time=start + timedelta(hours=3 * i, minutes=60),
+                location=LOCATIONS[i % len(LOCATIONS)],
+                language=cls.spanish,
+                interpreter=cls.seeded_interpreter(i),
+                active=i % 50 != 2
+            )
+            for i in range(20000)
+        ], batch_size=5000)
+
+    def test_unassigned_feed(self):
+        plan = self.feed_query_plan(
+            self.admin_token, self.client.post, "/api/fetch-appointments/", self.table,
+            {"unassigned": True})
+        self.assertIn("appointment_unassigned_idx", plan)
+
+    def test_assigned_feed(self):
+        plan = self.feed_query_plan(
+            self.admin_token, self.client.post, "/api/fetch-appointments/", self.table,
+            {"unassigned": False})
+        self.assertIn("appointment_assigned_idx", plan)
+
+    def test_customer_feed(self):
+        plan = self.feed_query_plan(
+            self.customer_token, self.client.get, "/api/appointments/", self.table)
+        self.assertIn("appointment_customer_idx", plan)
+
+    def test_interpreter_feed(self):
+        plan = self.feed_query_plan(
+            self.interpreter_token, self.client.get, "/api/accepted-appointments/", self.table)
+        # Unpaginated, so sorting the interpreter's appointments may well beat reading
+        # them in order, but they are still looked up by interpreter
+        self.assertIn("Index Cond: (interpreter_id = ", plan)
+        self.assertNotIn(f"Seq Scan on {self.table}", plan)
+
+    def test_booked_appointments(self):
+        # The queries the overlap checks actually run, active and assigned conditions included
+        start = timezone.make_aware(datetime(2024,12,1,9,0))
+        end = timezone.make_aware(datetime(2024,12,1,10,0))
+        plan = self.query_plan(*booked_appointments(start, end).query.sql_with_params())
+        self.assertIn("appointment_booked_period_idx", plan)
+
+        # As for a bulk offer to every interpreter
+        with CaptureQueriesContext(connection) as context:
+            busy_interpreter_ids(start, end, Interpreter.objects.values_list("pk", flat=True))
+        plan = self.query_plan(context.captured_queries[-1]["sql"])
+        self.assertIn("appointment_booked_period_idx", plan)
+
+    def test_free_interpreters(self):
+        plan = self.query_plan(*free_interpreters(
+            timezone.make_aware(datetime(2024,12,1,9,0)),
+            timezone.make_aware(datetime(2024,12,1,10,0))
+        ).query.sql_with_params())
+        self.assertIn("appointment_booked_period_idx", plan)
+        self.assertIn("hashed SubPlan", plan)
+
+    def test_search(self):
+        plan = self.query_plan(*Appointment.objects.alias(
+            search=search_vector(APPOINTMENT_SEARCH_FIELDS)
+        ).filter(search=search_query("glas")).query.sql_with_params())
+        self.assertIn("appointment_search_idx", plan)
+
+class TestTranslationFeedIndexes(BaseTestCase):
+    """
+
+    Test translation feeds are served by their indexes
+
+    test_unassigned_feed: test admin unassigned feed uses the partial unassigned index
+    test_assigned_feed: test admin assigned feed does not scan the table
+    test_customer_feed: test customer feed uses the customer index
+
+    """
+
+    table = "bookingandbilling_translation"
+    seeded_models = BaseTestCase.seeded_models + (Translation,)
+
+    @classmethod
+    def seed(cls):
+        super().seed()
+        Translation.objects.bulk_create([
+            Translation(
+                customer=cls.seeded_customer(i),
+                language=cls.spanish,
+                interpreter=cls.seeded_interpreter(i),
+                word_count=1000,
+                active=i % 50 != 2
+            )
+            for i in range(20000)
+        ], batch_size=5000)
+
+    def test_unassigned_feed(self):
+        plan = self.feed_query_plan(
+            self.admin_token, self.client.post, "/api/fetch-translations/", self.table,
+            {"unassigned": True})
+        self.assertIn("translation_unassigned_idx", plan)
+
+    def test_assigned_feed(self):
+        plan = self.feed_query_plan(
+            self.admin_token, self.client.post, "/api/fetch-translations/", self.table,
+            {"unassigned": False})
+        self.assertNotIn(f"Seq Scan on {self.table}", plan)
+
+    def test_customer_feed(self):
+        plan = self.feed_query_plan(
+            self.customer_token, self.client.get, "/api/translations/", self.table)
+        self.assertIn("translation_customer_idx", plan)
+
+class TestSearchIndexes(BaseTestCase):
+    """
+
+    Test the user search is served by its indexes
+
+    test_user_search: test searching names and emails uses the user search index
+    test_organisation_search: test searching organisations uses the customer search index
+
+    """
+
+    @classmethod
+    def seed(cls):
+        super().seed()
+        users = User.objects.bulk_create([
+            User(email=f"user{i}@example.com", first_name="Ranger", last_name=f"Smith {i}")
+            for i in range(5000)
+        ])
+        # Customers are multi-table inherited, so can't be bulk created, but half of the
+        # users can be made customers by adding their rows directly
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {connection.ops.quote_name(Customer._meta.db_table)} "
+                "(user_ptr_id, address, postcode, organisation, approved, email_validated) "
+                "VALUES (%s, '', '', %s, false, false)",
+                [(user.pk, f"Firm {i}") for i, user in enumerate(users[::2])]
+            )
+
+    def test_user_search(self):
+        plan = self.query_plan(*ranked_matches(
+            User.objects.all(), USER_SEARCH_FIELDS, search_query("yogi"), 10
+        ).values_list("id", "rank").query.sql_with_params())
+        self.assertIn("user_search_idx", plan)
+
+    def test_organisation_search(self):
+        plan = self.query_plan(*ranked_matches(
+            Customer.objects.all(), CUSTOMER_SEARCH_FIELDS, search_query("jelly"), 10
+        ).values_list("user_ptr_id", "rank").query.sql_with_params())
+        self.assertIn("customer_search_idx", plan)
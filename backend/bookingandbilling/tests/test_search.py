@@ -0,0 +1,130 @@
+from django.utils import timezone
+from datetime import datetime
+from rest_framework.test import APIClient
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from bookingandbilling.models import (
+    AccountType,
+    Admin,
+    Appointment,
+    Customer,
+    Interpreter,
+    Language
+)
+
+class TestSearch(TestCase):
+    """
+
+    Test searching users and appointments
+
+    test_invalid_tokens: test searching without admin auth
+    test_search_names: test users are found by first and last name
+    test_search_email: test users are found by any part of their email
+    test_search_organisation: test customers are found by organisation
+    test_search_appointments: test appointments are found by location
+    test_autocomplete: test autocomplete matches the words typed so far as prefixes
+    test_full_words: test without autocomplete only whole words and web search syntax match
+    test_ranking_and_limit: test the best matches come first and at most limit are returned
+    test_invalid_search: test a search without words or with a bad limit
+
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/api/search/"
+
+        self.admin = Admin.objects.create(
+            email="johnbrown@gmail.com", first_name="John", last_name="Brown")
+        self.interpreter = Interpreter.objects.create(
+            email="maria.lopez@translators.co.uk", first_name="Maria", last_name="Lopez")
+        self.yogi = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com",
+            organisation="Jellystone Park"
+        )
+        self.booboo = Customer.objects.create(
+            first_name="Boo",
+            last_name="Boo",
+            email="booboo@gmail.com",
+            organisation="Ranger Smith Enterprises"
+        )
+        self.appointment = Appointment.objects.create(
+            customer=self.yogi,
+            planned_start_time=timezone.make_aware(datetime(2024,12,1,9,0)),
+            planned_duration_minutes=60,
+            location="Glasgow Royal Infirmary",
+            language=Language.objects.create(language_name="Spanish")
+        )
+
+        self.valid_token, _created = Token.objects.get_or_create(user=self.admin)
+        self.invalid_token, _created = Token.objects.get_or_create(user=self.yogi)
+        self.client.cookies["authToken"] = self.valid_token
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["result"]
+
+    def user_ids(self, **params):
+        return [user["id"] for user in self.search(**params)["users"]]
+
+    def test_invalid_tokens(self):
+        self.client.cookies["authToken"] = self.invalid_token
+        response = self.client.get(self.url, {"q": "yogi"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_search_names(self):
+        self.assertEqual(self.user_ids(q="maria"), [self.interpreter.id])
+        self.assertEqual(self.user_ids(q="Yogi Bear"), [self.yogi.id])
+
+        result = self.search(q="lopez")["users"][0]
+        self.assertEqual(result["email"], "maria.lopez@translators.co.uk")
+        self.assertEqual(result["account_type"], AccountType.INTERPRETER)
+        self.assertIsNone(result["organisation"])
+
+    def test_search_email(self):
+        self.assertEqual(self.user_ids(q="picnicbaskets"), [self.yogi.id])
+        self.assertEqual(self.user_ids(q="translators"), [self.interpreter.id])
+        self.assertEqual(self.user_ids(q="picnicbaskets@jellystone.com"), [self.yogi.id])
+        self.assertEqual(
+            self.user_ids(q="maria.lopez@translators.co.uk"), [self.interpreter.id])
+        self.assertEqual(
+            self.user_ids(q="picnicbaskets@jelly", autocomplete="true"), [self.yogi.id])
+
+    def test_search_organisation(self):
+        result = self.search(q="ranger")["users"]
+        self.assertEqual([user["id"] for user in result], [self.booboo.id])
+        self.assertEqual(result[0]["account_type"], AccountType.CUSTOMER)
+        self.assertEqual(result[0]["organisation"], "Ranger Smith Enterprises")
+
+        # Found by email and organisation, but listed once
+        self.assertEqual(self.user_ids(q="jellystone"), [self.yogi.id])
+
+    def test_search_appointments(self):
+        result = self.search(q="infirmary")
+        self.assertEqual(result["users"], [])
+        self.assertEqual([app["id"] for app in result["appointments"]], [self.appointment.id])
+        self.assertEqual(result["appointments"][0]["location"], "Glasgow Royal Infirmary")
+
+    def test_autocomplete(self):
+        self.assertEqual(self.user_ids(q="mar", autocomplete="true"), [self.interpreter.id])
+        self.assertEqual(self.user_ids(q="mar lo", autocomplete="true"), [self.interpreter.id])
+        self.assertEqual(self.user_ids(q="mar br", autocomplete="true"), [])
+
+    def test_full_words(self):
+        self.assertEqual(self.user_ids(q="mar"), [])
+        self.assertEqual(set(self.user_ids(q="boo or john")), {self.booboo.id, self.admin.id})
+        self.assertEqual(self.user_ids(q="gmail -boo"), [self.admin.id])
+
+    def test_ranking_and_limit(self):
+        # Boo Boo's name and email both match, John Brown only his email
+        self.assertEqual(self.user_ids(q="boo or gmail"), [self.booboo.id, self.admin.id])
+        self.assertEqual(self.user_ids(q="boo or gmail", limit=1), [self.booboo.id])
+
+    def test_invalid_search(self):
+        for params in [{}, {"q": "  "}, {"q": "!!", "autocomplete": "true"},
+                       {"q": "yogi", "limit": 0}, {"q": "yogi", "limit": "ten"}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,334 @@
+from rest_framework.test import APIClient
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from io import StringIO
+from bookingandbilling.models import Customer, Language, Translation, TranslationUpload
+from bookingandbilling.uploads import DocumentDigest
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BaseTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.customer = Customer.objects.create(
+            first_name="Yogi",
+            last_name="Bear",
+            email="picnicbaskets@jellystone.com"
+        )
+        self.other_customer = Customer.objects.create(
+            first_name="Boo",
+            last_name="Boo",
+            email="booboo@jellystone.com"
+        )
+
+        self.token, _created = Token.objects.get_or_create(user=self.customer)
+        self.other_token, _created = Token.objects.get_or_create(user=self.other_customer)
+        self.client.cookies["authToken"] = self.token
+
+        self.document = b"The quick brown fox jumps over the lazy dog\n" * 100
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def start_upload(self, document_name="document.txt", size=None):
+        response = self.client.post(
+            "/api/translation-uploads/",
+            json.dumps({
+                "document_name": document_name,
+                "size": len(self.document) if size is None else size
+            }),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["result"]["uploadID"]
+
+    def send_chunk(self, upload_id, offset, chunk):
+        return self.client.put(
+            f"/api/translation-uploads/{upload_id}/",
+            chunk,
+            content_type="application/octet-stream",
+            headers={"Upload-Offset": str(offset)}
+        )
+
+    def complete(self, upload_id, **data):
+        return self.client.post(
+            f"/api/translation-uploads/{upload_id}/complete/",
+            json.dumps({"language": "Spanish", **data}),
+            content_type="application/json"
+        )
+
+class TestTranslationUpload(BaseTestCase):
+    """
+
+    Test uploading a translation document in chunks
+
+    test_invalid_start: test starting an upload without a name or with a bad size
+    test_chunked_upload: test a document sent in chunks becomes a translation
+    test_resume_upload: test an upload resumes from the offset the server reports
+    test_offset_mismatch: test a chunk sent at the wrong offset is rejected
+    test_upload_too_large: test a chunk past the declared size is rejected
+    test_checksum_mismatch: test completing with the wrong checksum is rejected
+    test_invalid_details: test a checksum that isn't a string or a bad word count is rejected
+    test_incomplete_upload: test an upload can't be completed before all bytes arrive
+    test_other_customer: test a customer can't see another customer's upload
+    test_cancel_upload: test cancelling an upload removes it and its part file
+
+    """
+
+    def test_invalid_start(self):
+        for request_data in [
+            {"size": 10},
+            {"document_name": "document.txt"},
+            {"document_name": "document.txt", "size": 0},
+            {"document_name": "document.txt", "size": "10"},
+            {"document_name": "document.txt", "size": True},
+        ]:
+            response = self.client.post(
+                "/api/translation-uploads/",
+                json.dumps(request_data),
+                content_type="application/json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("bookingandbilling.uploads.UPLOAD_CHUNK_SIZE", 64)
+    def test_chunked_upload(self):
+        upload_id = self.start_upload()
+
+        offset = 0
+        for start in range(0, len(self.document), 1000):
+            response = self.send_chunk(upload_id, offset, self.document[start:start + 1000])
+            self.assertEqual(response.status_code, 200)
+            offset = response.data["result"]["offset"]
+        self.assertEqual(offset, len(self.document))
+
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["result"]["word_count"], 900)
+        self.assertEqual(
+            response.data["result"]["checksum"],
+            hashlib.sha256(self.document).hexdigest()
+        )
+
+        translation = Translation.objects.get(id=response.data["result"]["translationID"])
+        self.assertEqual(translation.customer_id, self.customer.id)
+        self.assertEqual(translation.language.language_name, "Spanish")
+        self.assertEqual(
+            translation.document.name,
+            f"translation_documents/{hashlib.sha256(self.document).hexdigest()}/document.txt"
+        )
+        self.assertEqual(translation.document_name, "document.txt")
+        with translation.document.open("rb") as document:
+            self.assertEqual(document.read(), self.document)
+        self.assertFalse(TranslationUpload.objects.exists())
+
+    def test_resume_upload(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document[:1500])
+
+        response = self.client.get(f"/api/translation-uploads/{upload_id}/")
+        self.assertEqual(response.status_code, 200)
+        offset = response.data["result"]["offset"]
+        self.assertEqual(offset, 1500)
+
+        response = self.send_chunk(upload_id, offset, self.document[offset:])
+        self.assertEqual(response.data["result"]["offset"], len(self.document))
+
+        response = self.complete(upload_id, word_count="850")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # A word count given by the customer is kept
+        self.assertEqual(response.data["result"]["word_count"], 850)
+
+    def test_offset_mismatch(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document[:100])
+
+        response = self.send_chunk(upload_id, 0, self.document[:100])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["error"]["error-data"], {"offset": 100})
+
+    def test_upload_too_large(self):
+        upload_id = self.start_upload(size=100)
+        self.send_chunk(upload_id, 0, self.document[:50])
+
+        response = self.send_chunk(upload_id, 50, self.document[50:200])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload = TranslationUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.offset, 50)
+        self.assertEqual(os.path.getsize(upload.part_path), 50)
+
+    def test_checksum_mismatch(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document)
+
+        response = self.complete(upload_id, checksum="0" * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Translation.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, "translation_documents")))
+
+    def test_invalid_details(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document)
+
+        for details in [{"checksum": 123}, {"word_count": "many"}, {"word_count": 0}]:
+            response = self.complete(upload_id, **details)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Translation.objects.exists())
+        self.assertTrue(TranslationUpload.objects.filter(id=upload_id).exists())
+
+    def test_incomplete_upload(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document[:100])
+
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Translation.objects.exists())
+
+    def test_other_customer(self):
+        upload_id = self.start_upload()
+
+        self.client.cookies["authToken"] = self.other_token
+        response = self.send_chunk(upload_id, 0, self.document)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cancel_upload(self):
+        upload_id = self.start_upload()
+        self.send_chunk(upload_id, 0, self.document[:100])
+        part_path = TranslationUpload.objects.get(id=upload_id).part_path
+
+        response = self.client.delete(f"/api/translation-uploads/{upload_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(TranslationUpload.objects.exists())
+        self.assertFalse(os.path.exists(part_path))
+
+class TestDocumentStorage(BaseTestCase):
+    """
+
+    Test translation documents are stored once per content
+
+    test_identical_uploads_share_file: test identical documents share one file on disk
+    test_shared_file_named_by_content: test a shared file doesn't carry an uploader's name
+    test_base64_request_deduplicated: test the base64 request endpoint shares files too
+    test_store_existing_documents: test older documents are moved to hashed storage
+
+    """
+
+    def upload(self, document_name):
+        upload_id = self.start_upload(document_name=document_name)
+        self.send_chunk(upload_id, 0, self.document)
+        response = self.complete(upload_id)
+        return Translation.objects.get(id=response.data["result"]["translationID"])
+
+    def test_identical_uploads_share_file(self):
+        first = self.upload("document.txt")
+        second = self.upload("copy.txt")
+
+        self.assertEqual(first.document_sha256, second.document_sha256)
+        self.assertEqual(first.document.name, second.document.name)
+        self.assertEqual(
+            os.listdir(os.path.join(MEDIA_ROOT, "translation_documents", first.document_sha256)),
+            ["document.txt"]
+        )
+
+    def test_shared_file_named_by_content(self):
+        first = self.upload("Yogi's picnic plans.TXT")
+        second = self.upload("copy.txt")
+
+        self.assertEqual(
+            first.document.name, f"translation_documents/{first.document_sha256}/document.txt")
+        self.assertEqual(second.document.name, first.document.name)
+        self.assertEqual(
+            [first.document_name, second.document_name], ["Yogi's picnic plans.TXT", "copy.txt"])
+
+    def test_base64_request_deduplicated(self):
+        first = self.upload("document.txt")
+
+        response = self.client.post(
+            "/api/translation-request/",
+            json.dumps({
+                "document": "data:text/plain;base64," + base64.b64encode(self.document).decode(),
+                "document_name": "copy.txt",
+                "language": "Spanish",
+                "word_count": "900"
+            }),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        second = Translation.objects.exclude(id=first.id).get()
+        self.assertEqual(second.document_sha256, first.document_sha256)
+        self.assertEqual(second.document.name, first.document.name)
+        self.assertEqual(second.document_name, "copy.txt")
+
+    def test_store_existing_documents(self):
+        legacy = [
+            Translation.objects.create(
+                customer=self.customer,
+                language=Language.objects.get_or_create(language_name="Spanish")[0],
+                word_count=10,
+                document=ContentFile(self.document, name=name)
+            )
+            for name in ["legacy.txt", "legacy_copy.txt"]
+        ]
+        old_names = [translation.document.name for translation in legacy]
+
+        call_command("store_documents_by_hash", stdout=StringIO())
+
+        sha256 = hashlib.sha256(self.document).hexdigest()
+        for translation, old_name in zip(legacy, old_names):
+            translation.refresh_from_db()
+            self.assertEqual(translation.document_sha256, sha256)
+            self.assertEqual(
+                translation.document.name, f"translation_documents/{sha256}/document.txt")
+            self.assertEqual(translation.document_name, os.path.basename(old_name))
+            self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, old_name)))
+
+        # Documents stored under the first uploader's file name are renamed too
+        shared = f"translation_documents/{sha256}/legacy.txt"
+        default_storage.save(shared, ContentFile(self.document))
+        Translation.objects.filter(id=legacy[1].id).update(document=shared)
+
+        call_command("store_documents_by_hash", stdout=StringIO())
+
+        legacy[1].refresh_from_db()
+        self.assertEqual(legacy[1].document.name, f"translation_documents/{sha256}/document.txt")
+        self.assertEqual(legacy[1].document_name, os.path.basename(old_names[1]))
+        self.assertFalse(default_storage.exists(shared))
+
+class TestDocumentDigest(TestCase):
+    """
+
+    Test counting words across chunk boundaries
+
+    test_word_split_across_chunks: test a word split between chunks is counted once
+    test_binary_documents_not_counted: test documents that aren't text have no word count
+
+    """
+
+    def test_word_split_across_chunks(self):
+        text = b"one two  three\nfour five"
+        for size in range(1, len(text) + 1):
+            digest = DocumentDigest(count_words=True)
+            for start in range(0, len(text), size):
+                digest.update(text[start:start + size])
+            self.assertEqual(digest.word_count, 5)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(text).hexdigest())
+
+    def test_binary_documents_not_counted(self):
+        digest = DocumentDigest(count_words=False)
+        digest.update(b"%PDF-1.7 ...")
+        self.assertIsNone(digest.word_count)
@@ -1,16 +1,30 @@
 from django.test import TestCase, RequestFactory
 from django.urls import reverse
-from bookingandbilling.models import Customer, Interpreter, Appointment
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.utils import timezone
+from unittest.mock import patch
+from io import StringIO
+from bookingandbilling.models import Customer, Interpreter, Appointment, EmailStatus, QueuedEmail
 from bookingandbilling.views.views_registration import send_reset_email
 from django.utils.http import urlsafe_base64_encode
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_bytes
 from rest_framework.test import APIClient
 from rest_framework import status
+import os
 import re
+import tempfile
 from bookingandbilling.email_utils import (
+    EMAIL_QUEUE_MAX_ATTEMPTS,
+    LOGO_PATH,
+    LogoCache,
+    build_email,
+    queue_email,
     send_appointment_offered_email,
-    send_appointment_accepted_email
+    send_appointment_accepted_email,
+    send_queued_emails
 )
 
 class PasswordResetTestCase(TestCase):
@@ -36,7 +50,7 @@ class PasswordResetTestCase(TestCase):
         request = self.factory.post(self.reset_url, {'email': self.user.email})
         email = send_reset_email(request, self.user)
         self.assertEqual(email.subject, 'Password Reset Request')
-        self.assertEqual(email.to, [self.user.email])
+        self.assertEqual(email.recipient, self.user.email)
         uid = urlsafe_base64_encode(force_bytes(self.user.email))
         self.assertIn(uid, email.body)
         token_match = re.search(r'/new-password/[^/]+/([^/]+)/?', email.body)
@@ -46,7 +60,7 @@ class PasswordResetTestCase(TestCase):
         request = self.factory.post(self.reset_url, {'email': self.user2.email})
         email = send_reset_email(request, self.user2)
         self.assertEqual(email.subject, 'Password Reset Request')
-        self.assertEqual(email.to, [self.user2.email])
+        self.assertEqual(email.recipient, self.user2.email)
         uid = urlsafe_base64_encode(force_bytes(self.user2.email))
         self.assertIn(uid, email.body)
         token_match = re.search(r'/new-password/.+/(.+)/', email.body)
@@ -95,7 +109,7 @@ class AppointmentEmailsTestCase(TestCase):
             customer=self.user,
             interpreter=self.user2,
             planned_start_time='2025-01-24T20:00',
-            planned_duration='01:00',
+            planned_duration_minutes=60,
             location='testlocation',
             notes='testnotes'
         )
@@ -103,13 +117,124 @@ class AppointmentEmailsTestCase(TestCase):
     def test_appointment_offered_email(self):
         email = send_appointment_offered_email(self.appointment, self.user2)
         self.assertEqual(email.subject, 'Appointment Offered')
-        self.assertEqual(email.to, [self.user2.email])
+        self.assertEqual(email.recipient, self.user2.email)
         self.assertIn('You have Been Offered an Appointment', email.body)
         self.assertIn('testlocation', email.body)
         
     def test_appointment_accepted_email(self):
         email = send_appointment_accepted_email(self.appointment, self.user)
         self.assertEqual(email.subject, 'Appointment Accepted')
-        self.assertEqual(email.to, [self.user.email])
+        self.assertEqual(email.recipient, self.user.email)
         self.assertIn('An Interpreter has accepted your Appointment', email.body)
         self.assertIn('testlocation', email.body)
+
+class EmailQueueTestCase(TestCase):
+    """
+
+    Test the outbox and the worker that drains it
+
+    test_request_does_not_send: test queueing an email does not deliver it
+    test_worker_sends_batch: test the worker delivers the outbox over one connection
+    test_failed_email_retried: test a failed email is retried later with backoff
+    test_failed_email_gives_up: test an email is marked failed after the last attempt
+
+    """
+
+    def setUp(self):
+        self.user = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            email="testuser@example.com"
+        )
+
+    def test_request_does_not_send(self):
+        queue_email(self.user, "Subject", "<p>Body</p>")
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.filter(status=EmailStatus.PENDING).count(), 1)
+
+    def test_worker_sends_batch(self):
+        for i in range(3):
+            queue_email(self.user, f"Subject {i}", "<p>Body</p>")
+
+        with patch("bookingandbilling.management.commands.send_queued_emails.get_connection",
+                   wraps=get_connection) as mock_get_connection:
+            call_command("send_queued_emails", "--once", stdout=StringIO())
+
+        mock_get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(QueuedEmail.objects.exclude(status=EmailStatus.SENT).exists())
+
+    def test_failed_email_retried(self):
+        queued = queue_email(self.user, "Subject", "<p>Body</p>")
+        connection = get_connection()
+
+        with patch.object(connection, "send_messages", side_effect=OSError("Relay down")):
+            sent, failed = send_queued_emails(connection)
+
+        self.assertEqual((sent, failed), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailStatus.PENDING)
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.last_error, "Relay down")
+        self.assertGreater(queued.next_attempt, timezone.now())
+
+        # Not due yet so the next batch skips it
+        self.assertEqual(send_queued_emails(connection), (0, 0))
+
+    def test_failed_email_gives_up(self):
+        queued = queue_email(self.user, "Subject", "<p>Body</p>")
+        queued.attempts = EMAIL_QUEUE_MAX_ATTEMPTS - 1
+        queued.save()
+        connection = get_connection()
+
+        with patch.object(connection, "send_messages", side_effect=OSError("Relay down")):
+            send_queued_emails(connection)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailStatus.FAILED)
+
+class LogoCacheTestCase(TestCase):
+    """
+
+    Test the inline logo is prepared once and reloaded when the file changes
+
+    test_logo_read_once: test building several emails reads the logo file once
+    test_logo_reloaded_on_change: test a changed logo file is picked up
+    test_logo_attached: test the logo is attached inline with its content ID
+
+    """
+
+    def setUp(self):
+        with open(LOGO_PATH, "rb") as img:
+            self.logo = img.read()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "company_logo.png")
+        with open(self.path, "wb") as img:
+            img.write(self.logo)
+        self.cache = LogoCache(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_logo_read_once(self):
+        with patch("bookingandbilling.email_utils.open", wraps=open, create=True) as mock_open:
+            for _ in range(3):
+                self.cache.get()
+        mock_open.assert_called_once()
+
+    def test_logo_reloaded_on_change(self):
+        first = self.cache.get().get_payload()
+
+        with open(self.path, "wb") as img:
+            img.write(self.logo + b"changed")
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertNotEqual(self.cache.get().get_payload(), first)
+
+    def test_logo_attached(self):
+        email = build_email("testuser@example.com", "Subject", "<p>Body</p>")
+        image = email.message().get_payload()[1]
+        self.assertEqual(image.get_content_type(), "image/png")
+        self.assertEqual(image["Content-ID"], "<logo>")
+        self.assertEqual(image.get_payload(decode=True), self.logo)
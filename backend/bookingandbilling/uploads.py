@@ -0,0 +1,131 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .models import Translation
+
+# Chunked, resumable uploads and content addressed storage of translation documents.
+# The request body is copied to a part file UPLOAD_CHUNK_SIZE bytes at a time, so a
+# worker never holds more than one chunk of a document in memory whatever its size.
+# Documents are stored by SHA-256, so a document is only kept once however often it's sent.
+
+UPLOAD_CHUNK_SIZE = getattr(settings, "TRANSLATION_UPLOAD_CHUNK_SIZE", 1024 * 1024)
+UPLOAD_MAX_SIZE = getattr(settings, "TRANSLATION_UPLOAD_MAX_SIZE", 100 * 1024 * 1024)
+
+# Only plain text can be counted without parsing the document format
+WORD_COUNTED_EXTENSIONS = (".txt",)
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+class DocumentDigest:
+    """
+    SHA-256 and (for text documents) word count of a document, updated chunk by chunk.
+    """
+
+    def __init__(self, count_words):
+        self.sha256 = hashlib.sha256()
+        self.word_count = 0 if count_words else None
+        self._in_word = False
+
+    def update(self, chunk):
+        self.sha256.update(chunk)
+        if self.word_count is None or not chunk:
+            return
+
+        self.word_count += len(chunk.split())
+        # A word split across two chunks was counted in both
+        if self._in_word and not chunk[:1].isspace():
+            self.word_count -= 1
+        self._in_word = not chunk[-1:].isspace()
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def digest_file(file, count_words=False):
+    digest = DocumentDigest(count_words)
+    for chunk in file.chunks(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest
+
+
+def stored_document_name(sha256, file_name):
+    # Derived from the content alone, so a file shared by several uploads never carries
+    # one uploader's file name
+    extension = os.path.splitext(os.path.basename(file_name))[1].lower()
+    return os.path.join("translation_documents", sha256, "document" + extension)
+
+
+def store_document(file, sha256):
+    """
+    Saves a translation document as translation_documents/<sha256>/document<extension>
+    and returns its name. A document already stored with the same SHA-256 is reused
+    instead, so identical uploads share one file on disk. Each uploader's own file name
+    is kept on their Translation as document_name.
+    """
+    name = default_storage.generate_filename(stored_document_name(sha256, file.name))
+    if default_storage.exists(name):
+        return name
+
+    return default_storage.save(
+        name,
+        file,
+        max_length=Translation._meta.get_field("document").max_length
+    )
+
+
+def append_chunk(upload, stream):
+    """
+    Appends the request body to the upload's part file and advances upload.offset.
+    Raises InvalidUpload, leaving the part file as it was, if the body runs past the
+    declared size. The caller saves upload.
+    """
+    os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+
+    with open(upload.part_path, "ab") as part:
+        # Drop anything written by an earlier request that failed before saving its offset
+        part.truncate(upload.offset)
+        part.seek(upload.offset)
+
+        remaining = upload.size - upload.offset
+        received = 0
+        while stream is not None:
+            chunk = stream.read(min(UPLOAD_CHUNK_SIZE, remaining - received + 1))
+            if not chunk:
+                break
+
+            received += len(chunk)
+            if received > remaining:
+                part.truncate(upload.offset)
+                raise InvalidUpload("Upload is larger than its declared size.")
+            part.write(chunk)
+
+    upload.offset += received
+    return received
+
+
+def digest_upload(upload):
+    """
+    Returns the DocumentDigest of a completed upload, read from its part file
+    UPLOAD_CHUNK_SIZE bytes at a time. Text documents also get a word count.
+    """
+    if not upload.complete:
+        raise InvalidUpload("Upload is not complete.")
+
+    with open(upload.part_path, "rb") as part:
+        return digest_file(
+            File(part, upload.document_name),
+            count_words=upload.document_name.lower().endswith(WORD_COUNTED_EXTENSIONS)
+        )
+
+
+def discard_upload(upload):
+    if os.path.exists(upload.part_path):
+        os.remove(upload.part_path)
+    upload.delete()
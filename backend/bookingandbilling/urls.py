@@ -25,33 +25,47 @@ from .views.views_appointments import (
     AppointmentsView,
     AppointmentRequestView,
     AllInterpretersView,
+    FreeInterpretersView,
+    CandidateInterpretersView,
     UpdateAppointmentOffering,
+    BulkAppointmentOffering,
     ToggleAppointmentInvoiceAppView,
+    SetAppointmentInvoiceView,
     OfferedAppointmentsView,
     UpdateInterpreterOffering,
     AcceptedAppointments,
     EditAppointments,
+    BilledHoursView,
 )
 from .views.views_translations import (
     FetchTranslationsView,
     UpdateTranslationOffering,
     ToggleTranslationInvoiceAppView,
+    SetTranslationInvoiceView,
 )
 from .views.views_translations import (
     TranslationsView,
     TranslationRequestView,
+    TranslationUploadsView,
+    TranslationUploadView,
+    CompleteTranslationUploadView,
     UnassignedTranslationsView,
     OfferedTranslationsView,
     TranslationOfferingResponse,
     FetchInterpreterAcceptedTranslations,
     SetTranslationActualWordCount
 )
+from .views.views_invoices import (
+    InvoiceExportView,
+    InvoiceDocumentView,
+)
 
 
 from .views.views_user_edit import (
     EditView,
     GetUserEditFieldsView,
-    RetrieveEmails
+    RetrieveEmails,
+    SearchView
 )
 
 urlpatterns = [
@@ -66,7 +80,14 @@ urlpatterns = [
     path('auth/edit_profile', EditView.as_view(), name="edit_profile"),
     path('auth/get_user_edit_fields', GetUserEditFieldsView.as_view(), name="get_user_edit_fields"),
     path('all-interpreters/', AllInterpretersView.as_view(), name='all-interpreters'),
+    path('free-interpreters/', FreeInterpretersView.as_view(), name='free-interpreters'),
+    path(
+        'candidate-interpreters/',
+        CandidateInterpretersView.as_view(),
+        name='candidate-interpreters'
+    ),
     path('emails/', RetrieveEmails.as_view(), name='emails'),
+    path('search/', SearchView.as_view(), name='search'),
     path('fetch-appointments/', FetchAppointmentsView.as_view(), name='fetch-appointments'),
     path('all-interpreters/', AllInterpretersView.as_view(), name='all-interpreters'),
     path('fetch-appointments/', FetchAppointmentsView.as_view(), name='fetch-appointments'),
@@ -77,19 +98,47 @@ urlpatterns = [
     path("appointment-request/", AppointmentRequestView.as_view(), name="appointment-request-view"),
     path('translations/', TranslationsView.as_view(), name="translations-list"),
     path("translation-request/", TranslationRequestView.as_view(), name="translation-request-view"),
+    path('translation-uploads/', TranslationUploadsView.as_view(), name='translation-uploads'),
+    path(
+        'translation-uploads/<uuid:upload_id>/',
+        TranslationUploadView.as_view(),
+        name='translation-upload'
+    ),
+    path(
+        'translation-uploads/<uuid:upload_id>/complete/',
+        CompleteTranslationUploadView.as_view(),
+        name='complete-translation-upload'
+    ),
     path('all-translations/', UnassignedTranslationsView.as_view(), name='all-translations'),
     path('all-interpreters/', AllInterpretersView.as_view(), name='all-interpreters'),
     path('offer-appointments/', UpdateAppointmentOffering.as_view(), name='offer-appointments'),
+    path(
+        'bulk-offer-appointments/',
+        BulkAppointmentOffering.as_view(),
+        name='bulk-offer-appointments'
+    ),
     path('offered-appointments/', OfferedAppointmentsView.as_view(), name='offered-appointments'),
     path('offered-translations/', OfferedTranslationsView.as_view(), name='offered-appointments'),
     path('updated-appointments/', UpdateInterpreterOffering.as_view(), name='updated-appointments'),
     path('accepted-appointments/', AcceptedAppointments.as_view(), name='accepted-appointments'),
     path('edit-appointments/', EditAppointments.as_view(), name='edit-appointments'),
+    path('billed-hours/', BilledHoursView.as_view(), name='billed-hours'),
     path(
         'toggle-appointment-invoice/',
         ToggleAppointmentInvoiceAppView.as_view(),
         name='toggle-appointment-invoice'
     ),
+    path(
+        'set-appointment-invoice/',
+        SetAppointmentInvoiceView.as_view(),
+        name='set-appointment-invoice'
+    ),
+    path('invoices/export/', InvoiceExportView.as_view(), name='invoice-export'),
+    path(
+        'invoices/<int:invoice_id>/document/',
+        InvoiceDocumentView.as_view(),
+        name='invoice-document'
+    ),
     path('fetch-translations/', FetchTranslationsView.as_view(), name='fetch-translations'),
     path('offer-translations/', UpdateTranslationOffering.as_view(), name='offer-translations'),
     path(
@@ -97,6 +146,11 @@ urlpatterns = [
         ToggleTranslationInvoiceAppView.as_view(),
         name='toggle-translation-invoice'
     ),
+    path(
+        'set-translation-invoice/',
+        SetTranslationInvoiceView.as_view(),
+        name='set-translation-invoice'
+    ),
     path('offered-appointments/', OfferedAppointmentsView.as_view(), name='offered-appointments'),
     path('updated-appointments/', UpdateInterpreterOffering.as_view(), name='updated-appointments'),
     path('update-translation/', TranslationOfferingResponse.as_view(), name='updated-appointments'),
@@ -33,18 +33,26 @@ def custom_exception_handler(exc, context):
     return response
 
 class APIresponse(Response):
-    def __init__(self, response_data, http_code=status.HTTP_200_OK):
+    def __init__(self, response_data, http_code=status.HTTP_200_OK, cursors=None):
         super().__init__()
         self.status = "success"
         self.response_data = response_data
+        self.cursors = cursors
         self.data = self.dict()
         self.status_code = http_code
 
     def dict(self):
-        return {
+        result = {
             "status": self.status,
             "result": self.response_data
         }
+
+        # Paginated responses carry the cursors for the neighbouring pages
+        if self.cursors is not None:
+            result["next"] = self.cursors["next"]
+            result["prev"] = self.cursors["prev"]
+
+        return result
     
     def __dict__(self):
         return self.dict()
@@ -100,6 +108,24 @@ class ErrorResponse(APIresponse):
         }
 
 
+def invalid_cursor_response(error):
+    return ErrorResponse(
+        APIerror("invalid-cursor", status.HTTP_400_BAD_REQUEST, str(error))
+    )
+
+
+def invalid_fields_response(error):
+    return ErrorResponse(
+        APIerror("invalid-fields", status.HTTP_400_BAD_REQUEST, str(error))
+    )
+
+
+def invalid_filter_response(error):
+    return ErrorResponse(
+        APIerror("invalid-filter", status.HTTP_400_BAD_REQUEST, str(error))
+    )
+
+
 INTERNAL_ERROR_RESPONSE = ErrorResponse(
     APIerror(
         "django-error", 
@@ -0,0 +1,188 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .media import etag_matches
+from .models import (
+    Appointment,
+    Interpreter,
+    Language,
+    TableChange,
+    TableVersion,
+    Tag,
+    Translation,
+    User
+)
+
+# Conditional GET for the polled read endpoints.
+# A trigger on each versioned table adds a TableChange row for every INSERT, UPDATE,
+# DELETE or TRUNCATE statement. That includes QuerySet.update() and writes made by other
+# workers, and the row commits together with the change. A table's version is the number
+# of these rows plus its TableVersion count, which they are folded into once enough have
+# built up. Writers only ever insert rows of their own, so they never wait on each other
+# as they would updating a shared counter.
+# A response's ETag is a hash of the request and the versions of the tables it is built
+# from, so while none of them change a client sending If-None-Match gets a 304 after one
+# small query, without the response being serialized or sent again.
+
+# Everything an InterpreterSerializer renders, nested or not
+INTERPRETER_MODELS = (
+    User,
+    Interpreter,
+    Tag,
+    Language,
+    Interpreter.tag.through,
+    Interpreter.languages.through,
+    Appointment.offered_to.through,
+    Translation.offered_to.through,
+)
+APPOINTMENT_FEED_MODELS = (Appointment, *INTERPRETER_MODELS)
+TRANSLATION_FEED_MODELS = (Translation, *INTERPRETER_MODELS)
+VERSIONED_MODELS = {*APPOINTMENT_FEED_MODELS, *TRANSLATION_FEED_MODELS}
+
+# Tables that are also written for reasons the feeds don't show (such as User.last_login
+# on every log in) only change version when one of these fields is updated. Rows are
+# added and removed through their Interpreter/Customer/Admin table.
+VERSIONED_FIELDS = {
+    User: ("first_name", "last_name", "email"),
+}
+
+# Pending TableChange rows after which they are folded into TableVersion
+VERSION_FOLD_THRESHOLD = getattr(settings, "VERSION_FOLD_THRESHOLD", 1000)
+
+CHANGE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {changes} ("table") VALUES (TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+CHANGE_TRIGGER_SQL = """
+CREATE OR REPLACE TRIGGER bump_table_version
+AFTER {events} ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+"""
+
+# One statement, so a fold committing in between can't be seen half done
+VERSIONS_SQL = """
+SELECT "table", SUM("version")::bigint, SUM("pending")::bigint FROM (
+    SELECT "table", "version", 0 AS "pending" FROM {versions} WHERE "table" = ANY(%s)
+    UNION ALL
+    SELECT "table", COUNT(*), COUNT(*) FROM {changes} WHERE "table" = ANY(%s)
+    GROUP BY "table"
+) AS "versions"
+GROUP BY "table"
+"""
+# Only the changes visible when it starts are deleted and counted, so changes committed
+# while it runs are left for the next fold
+FOLD_SQL = """
+WITH "folded" AS (DELETE FROM {changes} RETURNING "table")
+INSERT INTO {versions} ("table", "version")
+SELECT "table", COUNT(*) FROM "folded" GROUP BY "table" ORDER BY "table"
+ON CONFLICT ("table") DO UPDATE SET "version" = {versions}."version" + EXCLUDED."version"
+"""
+# Advisory lock key, so only one fold runs at a time
+FOLD_LOCK = 0x7461626c65
+
+
+def version_tables(connection):
+    quote = connection.ops.quote_name
+    return {
+        "versions": quote(TableVersion._meta.db_table),
+        "changes": quote(TableChange._meta.db_table),
+    }
+
+
+def install_version_triggers(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Creates (or replaces) the version triggers. Connected to post_migrate, so the
+    triggers exist wherever the tables do.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(CHANGE_FUNCTION_SQL.format(**version_tables(connection)))
+        for model in VERSIONED_MODELS:
+            events = "INSERT OR UPDATE OR DELETE OR TRUNCATE"
+            if model in VERSIONED_FIELDS:
+                columns = [model._meta.get_field(name).column
+                           for name in VERSIONED_FIELDS[model]]
+                events = "UPDATE OF " + ", ".join(map(quote, columns))
+            cursor.execute(CHANGE_TRIGGER_SQL.format(
+                events=events, table=quote(model._meta.db_table)))
+
+
+def fold_table_changes(using=DEFAULT_DB_ALIAS):
+    """
+    Moves the count of pending TableChange rows into TableVersion, leaving every
+    table's version as it was. Does nothing if another fold is running.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [FOLD_LOCK])
+        if cursor.fetchone()[0]:
+            cursor.execute(FOLD_SQL.format(**version_tables(connection)))
+
+
+def table_versions(models, using=DEFAULT_DB_ALIAS):
+    """
+    The current version of each model's table, in table name order. A table that
+    hasn't been written to since the triggers were installed is version 0.
+    """
+    tables = sorted({model._meta.db_table for model in models})
+    if not tables:
+        return []
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(VERSIONS_SQL.format(**version_tables(connection)), [tables, tables])
+        rows = cursor.fetchall()
+
+    if any(pending >= VERSION_FOLD_THRESHOLD for _table, _version, pending in rows):
+        fold_table_changes(using)
+    versions = {table: version for table, version, _pending in rows}
+    return [versions.get(table, 0) for table in tables]
+
+
+def response_etag(request, models):
+    # The user is part of the key because the same URL gives each user their own data
+    key = "|".join([
+        request.get_full_path(),
+        str(request.user.pk),
+        request.accepted_media_type,
+        *map(str, table_versions(models)),
+    ])
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def conditional(*models):
+    """
+    Decorates a view's GET handler whose response only depends on the request and the
+    tables of models. Successful responses are tagged with an ETag, and a request whose
+    If-None-Match still matches is answered 304 Not Modified without calling the handler.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            # Read before the handler runs, so a write landing in between only costs a
+            # refetch later rather than a stale response being kept
+            etag = response_etag(request, models)
+
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response["ETag"] = etag
+            # Let browsers keep the response but always check it with the server
+            response["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
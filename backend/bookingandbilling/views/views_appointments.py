@@ -1,28 +1,53 @@
 from bookingandbilling.serializers.model_serializers import (
     GetAppointmentSerializer,
     InterpreterSerializer,
-    
+    CandidateInterpreterSerializer,
+    InvalidFields,
+    requested_fields
 )
 
 from bookingandbilling.serializers.appointment_serializers import (
     CreateAppointmentSerializer
 )
 
-from ..email_utils import send_appointment_accepted_email, send_appointment_offered_email
+from ..email_utils import (
+    send_appointment_accepted_email,
+    send_appointment_offered_email,
+    send_appointment_offered_emails
+)
 
+from ..availability import busy_interpreter_ids, free_interpreters, is_free_for
+from ..billing import billed_hours, parse_group_by
+from ..durations import parse_duration
+from ..filters import APPOINTMENT_FILTER, InvalidFilter
+from ..matching import candidate_interpreters
 from ..models import AccountType, Appointment, Interpreter
-from .views_utility import IsUserType, get_full_user, get_user_from_token
+from ..offers import AlreadyClaimed, NotOffered, claim_offer
+from ..pagination import (
+    APPOINTMENT_PAGINATOR,
+    DEFAULT_PAGE_SIZE,
+    INTERPRETER_PAGINATOR,
+    MAX_PAGE_SIZE,
+    InvalidCursor
+)
+from .views_utility import IsUserType, get_full_user, set_invoice_generated
 from rest_framework.views import APIView
+from ..versions import APPOINTMENT_FEED_MODELS, INTERPRETER_MODELS, conditional
 from ..utilities import (
     APIerror,
     APIresponse,
     INTERNAL_ERROR_RESPONSE,
-    ErrorResponse
+    ErrorResponse,
+    invalid_cursor_response,
+    invalid_fields_response,
+    invalid_filter_response
 )
 from rest_framework import status
 from datetime import datetime
 import traceback
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
 
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -41,13 +66,23 @@ class FetchAppointmentsView(APIView):
             )
 
         try:
-            appointments = Appointment.objects.filter(
+            appointments = APPOINTMENT_FILTER.filter(request, Appointment.objects.filter(
                 interpreter__isnull=request.data["unassigned"],
                 active=True
-            ).order_by("planned_start_time")
-            serializer = GetAppointmentSerializer(appointments, many=True)
-            return APIresponse(serializer.data)
+            ))
+            fields = requested_fields(request, GetAppointmentSerializer)
+            appointments, cursors = APPOINTMENT_PAGINATOR.paginate_if_requested(
+                request, appointments
+            )
+            serializer = GetAppointmentSerializer(appointments, many=True, fields=fields)
+            return APIresponse(serializer.data, cursors=cursors)
         
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
         except Exception as e:
             print(e)
             return INTERNAL_ERROR_RESPONSE
@@ -57,9 +92,7 @@ class OfferedAppointmentsView(APIView):
 
     def post(self, request, *args, **kwargs):
         try:
-            token = request.COOKIES.get('authToken')
-            user = get_user_from_token(token)
-            user, user_type = get_full_user(user)
+            user, user_type = get_full_user(request.user)
             
             appointments = Appointment.objects.filter(
                 offered_to=user).order_by("planned_start_time")
@@ -73,12 +106,126 @@ class OfferedAppointmentsView(APIView):
 class AllInterpretersView(APIView):
     permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
 
+    @conditional(*INTERPRETER_MODELS)
     def get(self, request, *args, **kwargs):
         try:
-            interpreters = Interpreter.objects.filter()
-            serializer = InterpreterSerializer(interpreters, many=True)
-            return APIresponse(serializer.data)
+            fields = requested_fields(request, InterpreterSerializer)
+            interpreters, cursors = INTERPRETER_PAGINATOR.paginate_if_requested(
+                request, Interpreter.objects.all()
+            )
+            serializer = InterpreterSerializer(interpreters, many=True, fields=fields)
+            return APIresponse(serializer.data, cursors=cursors)
         
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except Exception as e:
+            print(traceback.print_exception(e))
+            return INTERNAL_ERROR_RESPONSE
+
+class FreeInterpretersView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Interpreters with no assigned appointment overlapping a time window, given
+        either as an appointment (appID) or as ISO 8601 start and end times.
+        """
+        params = request.query_params
+        exclude_appointment_id = None
+
+        if "appID" in params:
+            appointment = Appointment.objects.filter(id=params["appID"]).only(
+                "planned_start_time", "planned_end_time"
+            ).first()
+            if appointment is None:
+                return ErrorResponse(
+                    APIerror(
+                        "appointment-not-found",
+                        status.HTTP_404_NOT_FOUND,
+                        "Appointment not found."
+                    )
+                )
+            start, end = appointment.planned_start_time, appointment.planned_end_time
+            exclude_appointment_id = appointment.id
+        else:
+            start = parse_datetime(params.get("start", ""))
+            end = parse_datetime(params.get("end", ""))
+            if start is None or end is None or start >= end:
+                return ErrorResponse(
+                    APIerror(
+                        "window-errors",
+                        status.HTTP_400_BAD_REQUEST,
+                        "An appID, or a start before an end in ISO 8601, is required."
+                    )
+                )
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end)
+
+        try:
+            fields = requested_fields(request, InterpreterSerializer)
+            interpreters, cursors = INTERPRETER_PAGINATOR.paginate_if_requested(
+                request, free_interpreters(start, end, exclude_appointment_id)
+            )
+            serializer = InterpreterSerializer(interpreters, many=True, fields=fields)
+            return APIresponse(serializer.data, cursors=cursors)
+
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except Exception as e:
+            print(traceback.print_exception(e))
+            return INTERNAL_ERROR_RESPONSE
+
+class CandidateInterpretersView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def get(self, request, *args, **kwargs):
+        """
+        The best interpreters to offer an appointment to (see matching.py), optionally
+        narrowed to those with every tag in a comma separated list of tag IDs.
+        At most limit interpreters (default 50, max 500) are returned.
+        """
+        params = request.query_params
+
+        try:
+            tag_ids = [int(tag_id) for tag_id in params.get("tags", "").split(",") if tag_id]
+            limit = min(int(params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return ErrorResponse(
+                APIerror(
+                    "candidate-errors",
+                    status.HTTP_400_BAD_REQUEST,
+                    "Tags must be comma separated IDs and limit a positive integer."
+                )
+            )
+
+        appointment = Appointment.objects.filter(id=params.get("appID")).only(
+            "language", "gender_preference", "planned_start_time", "planned_end_time"
+        ).first() if params.get("appID", "").isdigit() else None
+        if appointment is None:
+            return ErrorResponse(
+                APIerror(
+                    "appointment-not-found",
+                    status.HTTP_404_NOT_FOUND,
+                    "Appointment not found."
+                )
+            )
+
+        try:
+            fields = requested_fields(request, CandidateInterpreterSerializer)
+            interpreters = candidate_interpreters(appointment, tag_ids)[:limit]
+            serializer = CandidateInterpreterSerializer(interpreters, many=True, fields=fields)
+            return APIresponse(serializer.data)
+
+        except InvalidFields as e:
+            return invalid_fields_response(e)
         except Exception as e:
             print(traceback.print_exception(e))
             return INTERNAL_ERROR_RESPONSE
@@ -102,12 +249,26 @@ class AppointmentRequestView(APIView):
 class AppointmentsView(APIView):
     permission_classes = [IsAuthenticated]
  
+    @conditional(*APPOINTMENT_FEED_MODELS)
     def get(self, request):
-        appointments = Appointment.objects.filter(
-            customer=request.user.customer).order_by("planned_start_time")
-        serializer = GetAppointmentSerializer(appointments, many=True)
+        appointments = Appointment.objects.filter(customer=request.user.customer)
+        try:
+            appointments = APPOINTMENT_FILTER.filter(request, appointments)
+            fields = requested_fields(request, GetAppointmentSerializer)
+            appointments, cursors = APPOINTMENT_PAGINATOR.paginate_if_requested(
+                request, appointments
+            )
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
+
+        serializer = GetAppointmentSerializer(appointments, many=True, fields=fields)
         return APIresponse(
             {"result": serializer.data},
+            cursors=cursors
         )
    
 class AppointmentAcceptanceView(APIView):
@@ -147,6 +308,14 @@ class UpdateAppointmentOffering(APIView):
                 interpreter = Interpreter.objects.get(id=data["interpreterID"])
                 
                 if data["offer"]:
+                    if not is_free_for(interpreter, appointment):
+                        return ErrorResponse(
+                            APIerror(
+                                "interpreter-unavailable",
+                                status.HTTP_409_CONFLICT,
+                                "Interpreter has an overlapping appointment."
+                            )
+                        )
                     appointment.offered_to.add(interpreter)
                     send_appointment_offered_email(appointment, interpreter)
                 else:
@@ -171,6 +340,82 @@ class UpdateAppointmentOffering(APIView):
             )
         )
                 
+class BulkAppointmentOffering(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def post(self, request):
+        app_id = request.data.get("appID")
+        interpreter_ids = request.data.get("interpreterIDs")
+
+        valid_ids = isinstance(interpreter_ids, list) and all(
+            type(interpreter_id) is int for interpreter_id in interpreter_ids
+        )
+        if app_id is None or not valid_ids:
+            return ErrorResponse(
+                APIerror(
+                    "offer-errors", 
+                    status.HTTP_400_BAD_REQUEST, 
+                    "Errors in offer inputs."
+                )
+            )
+
+        try:
+            appointment = Appointment.objects.select_related("language").get(id=app_id)
+        except (Appointment.DoesNotExist, ValueError):
+            return ErrorResponse(
+                APIerror(
+                    "offer-errors", 
+                    status.HTTP_400_BAD_REQUEST, 
+                    "Errors in offering appointment."
+                )
+            )
+
+        try:
+            interpreters = list(Interpreter.objects.filter(id__in=interpreter_ids).only(
+                "id", "email", "first_name"
+            ))
+            already_offered = set(
+                appointment.offered_to.filter(id__in=interpreter_ids).values_list("id", flat=True)
+            )
+            busy = busy_interpreter_ids(
+                appointment.planned_start_time,
+                appointment.planned_end_time,
+                interpreter_ids,
+                exclude_appointment_id=appointment.id
+            )
+            newly_offered = [
+                interpreter for interpreter in interpreters
+                if interpreter.id not in already_offered and interpreter.id not in busy
+            ]
+
+            # Offers and their notifications are written together, the emails
+            # are delivered by the outbox worker
+            with transaction.atomic():
+                appointment.offered_to.add(*[interpreter.id for interpreter in newly_offered])
+                send_appointment_offered_emails(appointment, newly_offered)
+
+            found = {interpreter.id for interpreter in interpreters}
+            results = []
+            for interpreter_id in interpreter_ids:
+                if interpreter_id in already_offered:
+                    result = "already-offered"
+                elif interpreter_id in busy:
+                    result = "unavailable"
+                elif interpreter_id in found:
+                    result = "queued"
+                else:
+                    result = "not-found"
+                results.append({"interpreterID": interpreter_id, "result": result})
+
+            return APIresponse({
+                "message": "Appointment offering updated.",
+                "results": results
+            })
+
+        except Exception as e:
+            print(traceback.print_exception(e))
+            return INTERNAL_ERROR_RESPONSE
+                
 class UpdateInterpreterOffering(APIView):
     permission_classes = [lambda : IsUserType(allowed_types=[AccountType.INTERPRETER])]
     
@@ -183,18 +428,49 @@ class UpdateInterpreterOffering(APIView):
 
         if all(data[attr] is not None for attr in expected):
             try:
-                appointment = Appointment.objects.get(id=data["appID"])
-                token = request.COOKIES.get('authToken')
-                user = get_user_from_token(token)
-                user, user_type = get_full_user(user)
+                user, user_type = get_full_user(request.user)
                 if data["accepted"]:
-                    appointment.offered_to.clear()
-                    appointment.interpreter = user
-                    send_appointment_accepted_email(appointment, appointment.customer)
-                    appointment.save()
+                    with transaction.atomic():
+                        # Accepts by the same interpreter queue on their row, so two
+                        # overlapping appointments can't both pass the check below
+                        # before either is claimed
+                        Interpreter.objects.select_for_update(of=("self",)).filter(
+                            pk=user.pk
+                        ).values_list("pk").get()
+                        appointment = Appointment.objects.select_related(
+                            "customer", "language"
+                        ).get(id=data["appID"])
+                        if not is_free_for(user, appointment):
+                            return ErrorResponse(
+                                APIerror(
+                                    "interpreter-unavailable",
+                                    status.HTTP_409_CONFLICT,
+                                    "You have an overlapping appointment."
+                                )
+                            )
+                        claim_offer(Appointment, appointment.id, user)
+                        appointment.interpreter = user
+                        send_appointment_accepted_email(appointment, appointment.customer)
                 else:
+                    appointment = Appointment.objects.get(id=data["appID"])
                     appointment.offered_to.remove(user)
                 return APIresponse({"message": "Offering successfully accepted."})
+            except AlreadyClaimed:
+                return ErrorResponse(
+                    APIerror(
+                        "already-accepted",
+                        status.HTTP_409_CONFLICT,
+                        "Appointment has already been accepted by another interpreter."
+                    )
+                )
+            except NotOffered:
+                return ErrorResponse(
+                    APIerror(
+                        "not-offered",
+                        status.HTTP_403_FORBIDDEN,
+                        "Appointment is not offered to you."
+                    )
+                )
             except Exception:
                 print("Exception occurred:", traceback.format_exc())
                 return ErrorResponse(
@@ -220,9 +496,7 @@ class AcceptedAppointments(APIView):
 
         try:
 
-            token = request.COOKIES.get('authToken')
-            user = get_user_from_token(token)
-            user, user_type = get_full_user(user)
+            user, user_type = get_full_user(request.user)
             appointments = Appointment.objects.filter(
                 interpreter=user).order_by("planned_start_time")
             serializer = GetAppointmentSerializer(appointments, many=True)
@@ -253,12 +527,12 @@ class EditAppointments(APIView):
                         appointment.actual_start_time = None
 
                 try:
-                    appointment.actual_duration = datetime.strptime(
-                        data["appActualDuration"], "%H:%M"
+                    appointment.actual_duration_minutes = parse_duration(
+                        data["appActualDuration"]
                     )
-                except Exception:
+                except ValueError:
                     if data["appActualDuration"] == "":
-                        appointment.actual_duration = None
+                        appointment.actual_duration_minutes = None
                 appointment.save()
             except Exception:
                 print("Exception occurred:", traceback.format_exc())
@@ -271,6 +545,45 @@ class EditAppointments(APIView):
                 )
         return APIresponse({"message": "Appointment successfully edited"})
     
+class BilledHoursView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Billed hours of the assigned appointments matching the feed filters, grouped by
+        a comma separated list of interpreter, customer, language and month (see
+        billing.py), or in total if group_by is left out.
+        """
+        try:
+            groups = parse_group_by(request.query_params.get("group_by", ""))
+            appointments = APPOINTMENT_FILTER.filter(request, Appointment.objects.filter(
+                interpreter__isnull=False,
+                active=True
+            ))
+            totals = billed_hours(appointments, groups)
+            return APIresponse(list(totals) if groups else totals)
+
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
+        except Exception as e:
+            print(e)
+            return INTERNAL_ERROR_RESPONSE
+
+class SetAppointmentInvoiceView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def post(self, request):
+        """
+        Sets invoice_generated on the appointments in appIDs and/or matching the feed
+        filters in the query string (see set_invoice_generated).
+        """
+        try:
+            return set_invoice_generated(
+                request, Appointment.objects.all(), APPOINTMENT_FILTER, "appIDs")
+        except Exception as e:
+            print(e)
+            return INTERNAL_ERROR_RESPONSE
+
 class ToggleAppointmentInvoiceAppView(APIView):
     permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
 
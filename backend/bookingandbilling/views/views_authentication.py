@@ -1,6 +1,6 @@
 from django.contrib.auth import authenticate
 from ..models import AccountType
-from .views_utility import get_full_user, get_user_from_token
+from .views_utility import get_full_user
 
 from rest_framework.views import APIView
 from rest_framework import status
@@ -11,6 +11,7 @@ from ..serializers.authentication_serializers import (
     LoginSerializer, 
     UserSerializer
 )
+from ..versions import conditional
 from ..utilities import (
     APIresponse,
     APIerror,
@@ -18,10 +19,10 @@ from ..utilities import (
 )
 
 class CheckAuthView(APIView):
+    # The response only depends on who is logged in
+    @conditional()
     def get(self, request):
-        token = request.COOKIES.get('authToken')
-        user = get_user_from_token(token)
-        user, user_type = get_full_user(user)
+        user, user_type = get_full_user(request.user)
         return APIresponse(
                 {
                     "message": "Authenticated!",
@@ -0,0 +1,90 @@
+import os
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.views import APIView
+
+from ..filters import InvalidFilter, parse_ids
+from ..invoice_documents import export_csv
+from ..invoicing import LINE_CHUNK_SIZE, line_values, parse_period
+from ..media import serve_protected_file
+from ..models import AccountType, Invoice
+from ..permissions import can_read_invoice
+from ..utilities import (
+    APIerror,
+    ErrorResponse,
+    INTERNAL_ERROR_RESPONSE,
+    invalid_filter_response
+)
+from .views_utility import IsUserType, get_full_user
+
+
+class InvoiceExportView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Streams the lines of a month's invoices (period=YYYY-MM), optionally only those
+        of some customers (customer=1,2), as CSV. The lines are read through a
+        server side cursor and written a row at a time, so memory use doesn't grow
+        with the export.
+        """
+        try:
+            period = request.query_params.get("period")
+            if period is None:
+                raise InvalidFilter("period is required")
+            try:
+                period_start, period_end = parse_period(period)
+            except ValueError:
+                raise InvalidFilter(f"Invalid period: {period!r}")
+
+            invoices = Invoice.objects.filter(period_start=period_start)
+            customers = request.query_params.get("customer")
+            if customers is not None:
+                try:
+                    invoices = invoices.filter(customer__in=parse_ids(customers))
+                except ValueError:
+                    raise InvalidFilter(f"Invalid customer: {customers!r}")
+
+            lines = line_values(invoices).iterator(chunk_size=LINE_CHUNK_SIZE)
+            response = StreamingHttpResponse(export_csv(lines), content_type="text/csv")
+            response["Content-Disposition"] = (
+                f'attachment; filename="invoices-{period_start:%Y-%m}.csv"'
+            )
+            return response
+
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
+        except Exception as e:
+            print(e)
+            return INTERNAL_ERROR_RESPONSE
+
+
+class InvoiceDocumentView(APIView):
+    def get(self, request, invoice_id):
+        invoice = Invoice.objects.filter(pk=invoice_id).only("customer", "document").first()
+        if invoice is None or not invoice.document:
+            return ErrorResponse(
+                APIerror("404", status.HTTP_404_NOT_FOUND, "Invoice document not found")
+            )
+
+        user, user_type = get_full_user(request.user)
+        if not can_read_invoice(user, user_type, invoice):
+            return ErrorResponse(
+                APIerror(
+                    "permission-error",
+                    status.HTTP_403_FORBIDDEN,
+                    "You may not read this invoice."
+                )
+            )
+
+        document = invoice.document.name
+        try:
+            return serve_protected_file(
+                request, os.path.join(settings.MEDIA_ROOT, document), document
+            )
+        except FileNotFoundError:
+            return ErrorResponse(
+                APIerror("404", status.HTTP_404_NOT_FOUND, "File not found")
+            )
@@ -7,7 +7,7 @@ from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
 from django.http import HttpResponse
 from django.shortcuts import redirect
-from .views_utility import get_full_user, get_user_from_token, IsUserType
+from .views_utility import get_full_user, IsUserType
 
 from ..tokens import account_activation_token
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -143,10 +143,7 @@ class RegisterAdminViewSet(CreateAPIView):
                 if serializer_class == RegisterCustomerSerializer:
                     user.approved = True
                     user.email_validated = True
-                    token = request.COOKIES.get('authToken')
-        
-                    admin = get_user_from_token(token)
-                    admin, user_type = get_full_user(admin)
+                    admin, user_type = get_full_user(request.user)
                     user.approver = admin
                     
                     user.save()
@@ -1,7 +1,10 @@
 import traceback
-from .views_utility import IsUserType, get_full_user, get_user_from_token
+from .views_utility import IsUserType, get_full_user, set_invoice_generated
 from rest_framework.views import APIView
 from django.core.files.base import ContentFile
+from django.core.files import File
+from django.db import transaction
+import os
 import base64
 
 from rest_framework.response import Response
@@ -9,19 +12,37 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from ..serializers.translation_serializers import (
+    CompleteTranslationUploadSerializer,
     CreateTranslationSerializer
 )
 
 from ..serializers.model_serializers import (
-    GetTranslationSerializer
+    GetTranslationSerializer,
+    InvalidFields,
+    requested_fields
 )
 
-from ..models import AccountType, Interpreter, Translation
+from ..filters import TRANSLATION_FILTER, InvalidFilter
+from ..models import AccountType, Interpreter, Translation, TranslationUpload
+from ..offers import AlreadyClaimed, NotOffered, claim_offer
+from ..pagination import TRANSLATION_PAGINATOR, InvalidCursor
+from ..uploads import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_SIZE,
+    InvalidUpload,
+    append_chunk,
+    digest_upload,
+    discard_upload
+)
+from ..versions import TRANSLATION_FEED_MODELS, conditional
 from ..utilities import (
     APIerror,
     APIresponse,
     INTERNAL_ERROR_RESPONSE,
-    ErrorResponse
+    ErrorResponse,
+    invalid_cursor_response,
+    invalid_fields_response,
+    invalid_filter_response
 )
 
 class UnassignedTranslationsView(APIView):
@@ -62,13 +83,23 @@ class FetchTranslationsView(APIView):
             )
 
         try:
-            translations = Translation.objects.filter(
+            translations = TRANSLATION_FILTER.filter(request, Translation.objects.filter(
                 interpreter__isnull=request.data["unassigned"],
                 active=True
+            ))
+            fields = requested_fields(request, GetTranslationSerializer)
+            translations, cursors = TRANSLATION_PAGINATOR.paginate_if_requested(
+                request, translations
             )
-            serializer = GetTranslationSerializer(translations, many=True)
-            return APIresponse(serializer.data)
-
+            serializer = GetTranslationSerializer(translations, many=True, fields=fields)
+            return APIresponse(serializer.data, cursors=cursors)
+
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
         except Exception as e:
             print(e)
             return INTERNAL_ERROR_RESPONSE
@@ -96,15 +127,184 @@ class TranslationRequestView(APIView):
             )
         return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
 
+class TranslationUploadsView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.CUSTOMER])]
+
+    def post(self, request):
+        document_name = os.path.basename(str(request.data.get("document_name") or ""))
+        size = request.data.get("size")
+
+        if not document_name or type(size) is not int or not 0 < size <= UPLOAD_MAX_SIZE:
+            return ErrorResponse(
+                APIerror(
+                    "upload-errors",
+                    status.HTTP_400_BAD_REQUEST,
+                    f"A document name and a size of up to {UPLOAD_MAX_SIZE} bytes are required."
+                )
+            )
+
+        user, user_type = get_full_user(request.user)
+        upload = TranslationUpload.objects.create(
+            customer=user,
+            document_name=document_name,
+            size=size
+        )
+        return APIresponse(
+            {
+                "uploadID": str(upload.id),
+                "offset": upload.offset,
+                "chunkSize": UPLOAD_CHUNK_SIZE
+            },
+            status.HTTP_201_CREATED
+        )
+
+class TranslationUploadView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.CUSTOMER])]
+
+    def get_upload(self, request, upload_id, lock=False):
+        user, user_type = get_full_user(request.user)
+        uploads = TranslationUpload.objects.filter(customer=user)
+        if lock:
+            uploads = uploads.select_for_update()
+        return uploads.filter(id=upload_id).first()
+
+    def upload_not_found(self):
+        return ErrorResponse(
+            APIerror("upload-not-found", status.HTTP_404_NOT_FOUND, "Upload not found.")
+        )
+
+    def get(self, request, upload_id):
+        # Where to resume from after an interrupted upload
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return self.upload_not_found()
+        return APIresponse({"offset": upload.offset, "size": upload.size})
+
+    def put(self, request, upload_id):
+        """
+        Appends the raw request body at the offset given in the Upload-Offset header.
+        """
+        with transaction.atomic():
+            # Locked so two requests can't append to the same upload at once
+            upload = self.get_upload(request, upload_id, lock=True)
+            if upload is None:
+                return self.upload_not_found()
+
+            if request.headers.get("Upload-Offset") != str(upload.offset):
+                return ErrorResponse(
+                    APIerror(
+                        "upload-offset-mismatch",
+                        status.HTTP_409_CONFLICT,
+                        "Upload-Offset does not match the bytes received so far.",
+                        error_data={"offset": upload.offset}
+                    )
+                )
+
+            try:
+                append_chunk(upload, request.stream)
+            except InvalidUpload as e:
+                return ErrorResponse(
+                    APIerror("upload-errors", status.HTTP_400_BAD_REQUEST, str(e))
+                )
+            upload.save(update_fields=["offset"])
+
+        return APIresponse({"offset": upload.offset, "size": upload.size})
+
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return self.upload_not_found()
+
+        discard_upload(upload)
+        return APIresponse({"message": "Upload cancelled."})
+
+class CompleteTranslationUploadView(TranslationUploadView):
+
+    def post(self, request, upload_id):
+        """
+        Turns a fully received upload into a translation request. The document is
+        hashed (and word counted, for plain text) in one streaming pass before it is
+        stored. An optional checksum is compared with the SHA-256 received.
+        """
+        with transaction.atomic():
+            upload = self.get_upload(request, upload_id, lock=True)
+            if upload is None:
+                return self.upload_not_found()
+
+            data = {
+                field: request.data.get(field)
+                for field in ["language", "word_count", "company", "notes"]
+                if field in request.data
+            }
+            serializer = CompleteTranslationUploadSerializer(
+                data={**data, "customer": upload.customer_id}
+            )
+            if not serializer.is_valid():
+                return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+            try:
+                digest = digest_upload(upload)
+            except InvalidUpload as e:
+                return ErrorResponse(
+                    APIerror("upload-errors", status.HTTP_400_BAD_REQUEST, str(e))
+                )
+
+            checksum = request.data.get("checksum")
+            word_count = serializer.validated_data.get("word_count", digest.word_count)
+            error = None
+            if checksum is not None and not isinstance(checksum, str):
+                error = "Checksum must be a hex SHA-256 string."
+            elif checksum is not None and checksum.lower() != digest.hexdigest():
+                error = "Checksum does not match the uploaded document."
+            elif not word_count:
+                error = "A word count is required for this document type."
+
+            if error is not None:
+                return ErrorResponse(
+                    APIerror("upload-errors", status.HTTP_400_BAD_REQUEST, error)
+                )
+
+            with open(upload.part_path, "rb") as part:
+                translation = serializer.save(
+                    document=File(part, upload.document_name),
+                    document_sha256=digest.hexdigest(),
+                    word_count=word_count
+                )
+            discard_upload(upload)
+
+        return APIresponse(
+            {
+                "message": "Translation requested successfully!",
+                "translationID": translation.id,
+                "checksum": translation.document_sha256,
+                "word_count": translation.word_count
+            },
+            status.HTTP_201_CREATED
+        )
+
 class TranslationsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional(*TRANSLATION_FEED_MODELS)
     def get(self, request):
         translations = Translation.objects.filter(customer=request.user.customer)
-        serializer = GetTranslationSerializer(translations, many=True)
-
+        try:
+            translations = TRANSLATION_FILTER.filter(request, translations)
+            fields = requested_fields(request, GetTranslationSerializer)
+            translations, cursors = TRANSLATION_PAGINATOR.paginate_if_requested(
+                request, translations
+            )
+        except InvalidCursor as e:
+            return invalid_cursor_response(e)
+        except InvalidFields as e:
+            return invalid_fields_response(e)
+        except InvalidFilter as e:
+            return invalid_filter_response(e)
+
+        serializer = GetTranslationSerializer(translations, many=True, fields=fields)
         return APIresponse(
             {"result": serializer.data},
+            cursors=cursors
         )
     
 class OfferedTranslationsView(APIView):
@@ -112,9 +312,7 @@ class OfferedTranslationsView(APIView):
 
     def post(self, request, *args, **kwargs):
         try:
-            token = request.COOKIES.get('authToken')
-            user = get_user_from_token(token)
-            user, user_type = get_full_user(user)
+            user, user_type = get_full_user(request.user)
             
             appointments = Translation.objects.filter(offered_to=user)
             serializer = GetTranslationSerializer(appointments, many=True)
@@ -136,19 +334,32 @@ class TranslationOfferingResponse(APIView):
 
         if all(data[attr] is not None for attr in expected):
             try:
-                translation = Translation.objects.get(id=data["translationID"])
-                token = request.COOKIES.get('authToken')
-                user = get_user_from_token(token)
-                user, user_type = get_full_user(user)
+                user, user_type = get_full_user(request.user)
                 
                 if data["accepted"]:
-                    translation.offered_to.clear()
-                    translation.interpreter = user
-                    translation.save()
+                    with transaction.atomic():
+                        claim_offer(Translation, data["translationID"], user)
                 else:
+                    translation = Translation.objects.get(id=data["translationID"])
                     translation.offered_to.remove(user)
                 return APIresponse({"message": "Offering successfully accepted."})
             
+            except AlreadyClaimed:
+                return ErrorResponse(
+                    APIerror(
+                        "already-accepted",
+                        status.HTTP_409_CONFLICT,
+                        "Translation has already been accepted by another interpreter."
+                    )
+                )
+            except NotOffered:
+                return ErrorResponse(
+                    APIerror(
+                        "not-offered",
+                        status.HTTP_403_FORBIDDEN,
+                        "Translation is not offered to you."
+                    )
+                )
             except Exception:
                 print("Exception occurred:", traceback.format_exc())
                 return ErrorResponse(
@@ -226,6 +437,21 @@ class UpdateTranslationOffering(APIView):
             )
         )
     
+class SetTranslationInvoiceView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def post(self, request):
+        """
+        Sets invoice_generated on the translations in translationIDs and/or matching the
+        feed filters in the query string (see set_invoice_generated).
+        """
+        try:
+            return set_invoice_generated(
+                request, Translation.objects.all(), TRANSLATION_FILTER, "translationIDs")
+        except Exception as e:
+            print(e)
+            return INTERNAL_ERROR_RESPONSE
+
 class ToggleTranslationInvoiceAppView(APIView):
     permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
 
@@ -262,9 +488,7 @@ class FetchInterpreterAcceptedTranslations(APIView):
 
     def post(self, request):
         try:
-            token = request.COOKIES.get('authToken')
-            user = get_user_from_token(token)
-            user, user_type = get_full_user(user)
+            user, user_type = get_full_user(request.user)
             
             appointments = Translation.objects.filter(interpreter=user)
             serializer = GetTranslationSerializer(appointments, many=True)
@@ -2,6 +2,7 @@ import traceback
 import sys
 from collections import OrderedDict
 from rest_framework.views import APIView
+from rest_framework import status
 
 from django.contrib.auth.hashers import check_password
 
@@ -28,6 +29,14 @@ from ..models import (
     AccountType
 )
 
+from ..search import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    search_appointments,
+    search_users,
+    text_query
+)
+
 from .views_utility import IsUserType, get_full_user
 
 class RetrieveEmails(APIView):
@@ -47,6 +56,40 @@ class RetrieveEmails(APIView):
             print(traceback.print_exception(e))
             return INTERNAL_ERROR_RESPONSE
 
+class SearchView(APIView):
+    permission_classes = [lambda : IsUserType(allowed_types=[AccountType.ADMIN])]
+
+    def get(self, request):
+        """
+        The best matching users and appointments for q (see search.py), at most limit
+        (default 10, max 50) of each. autocomplete=true matches words as prefixes.
+        """
+        params = request.query_params
+        try:
+            query = text_query(
+                params.get("q", ""), params.get("autocomplete", "").lower() == "true"
+            )
+            limit = min(int(params.get("limit", DEFAULT_SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return ErrorResponse(
+                APIerror(
+                    "search-errors",
+                    status.HTTP_400_BAD_REQUEST,
+                    "A search with at least one word and a positive limit is required."
+                )
+            )
+
+        try:
+            return APIresponse({
+                "users": search_users(query, limit),
+                "appointments": search_appointments(query, limit),
+            })
+        except Exception as e:
+            print(traceback.print_exception(e))
+            return INTERNAL_ERROR_RESPONSE
+
 # Returns the fields that are editable for the authenticated user
 class GetUserEditFieldsView(APIView):
     def get(self, request):
@@ -1,21 +1,27 @@
 import traceback
 
-from ..models import AccountType, Language, Translation
+from ..models import ACCOUNT_TYPE_RELATIONS, AccountType, Language, Translation, User
+from ..auth_cache import token_cache
+from ..filters import InvalidFilter
+from ..media import serve_protected_file
+from ..permissions import can_read_any_translation
 
-from django.http import FileResponse
 from django.conf import settings
 import os
+import re
 
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import BasePermission
 from rest_framework.authtoken.models import Token
 
+from ..versions import conditional
 from ..utilities import (
     APIresponse,
     APIerror,
     ErrorResponse,
-    INTERNAL_ERROR_RESPONSE
+    INTERNAL_ERROR_RESPONSE,
+    invalid_filter_response
 )
 
 
@@ -25,12 +31,15 @@ class IsUserType(BasePermission):
         super().__init__()
 
     def has_permission(self, request, view):
-        token = request.COOKIES.get('authToken')
-        user = get_user_from_token(token)
+        # request.user is already resolved by CookieTokenAuthentication for API views
+        user = getattr(request, "user", None)
+        if not getattr(user, "is_authenticated", False):
+            user = get_user_from_token(request.COOKIES.get('authToken'))
         user, user_type = get_full_user(user)
         return user and user_type in self.allowed_types
     
 class RetrieveLanguages(APIView):
+    @conditional(Language)
     def get(self, request):
         try:
             languages = Language.objects.all().values_list('language_name', flat=True)
@@ -45,25 +54,65 @@ class RetrieveLanguages(APIView):
 
             
 def get_user_from_token(token_key):
+    cached = token_cache.get(token_key)
+    if cached is not None:
+        token, _user_type = cached
+        return token.user
+
     try:
-        token = Token.objects.get(key=token_key)  # Get the token object
-        user = token.user  # Access the associated user
-        return user
+        # Get the token, its user and the user's account model in one query
+        token = Token.objects.select_related(*account_type_lookups("user__")).get(key=token_key)
+        return token.user
     except Token.DoesNotExist:
         return None
+
+
+def account_type_lookups(prefix=""):
+    """
+    select_related lookups that load a user's Admin/Interpreter/Customer row alongside it
+    """
+    return [prefix + relation for relation in ACCOUNT_TYPE_RELATIONS.values()]
+
     
 def get_full_user(user):
-    if not user:
+    """
+    Returns the Admin/Interpreter/Customer for a user and its AccountType.
+
+    Users loaded with account_type_lookups (such as request.user) already carry their
+    account model, anything else is reloaded with a single joined query.
+    """
+    if not isinstance(user, User):
         return None, None
-    if hasattr(user, 'admin'):
-        return user.admin, AccountType.ADMIN
-    elif hasattr(user, 'interpreter'):
-        return user.interpreter, AccountType.INTERPRETER
-    elif hasattr(user, 'customer'):
-        return user.customer, AccountType.CUSTOMER
+
+    relations_cached = all(
+        getattr(User, relation).is_cached(user) for relation in ACCOUNT_TYPE_RELATIONS.values()
+    )
+    if not relations_cached:
+        user = User.objects.select_related(*account_type_lookups()).filter(pk=user.pk).first()
+
+    for user_type, relation in ACCOUNT_TYPE_RELATIONS.items():
+        full_user = getattr(user, relation, None)
+        if full_user is not None:
+            return full_user, user_type
     return None, None
 
 
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def download_name(user, user_type, translations):
+    """
+    The file name to send a shared translation document to the user as, given the
+    (id, customer_id, interpreter_id, document_name) of the translations sharing it:
+    the name the user's own or assigned translation was uploaded with (admins may see
+    any), otherwise the stored name, so no other customer's file name is given away.
+    """
+    for _id, customer_id, interpreter_id, name in translations:
+        if name and (user_type == AccountType.ADMIN or user.pk in (customer_id, interpreter_id)):
+            return name
+    return None
+
+
 class protected_media(APIView):
     def get(self, request, path):
         if not path:
@@ -71,32 +120,35 @@ class protected_media(APIView):
                 APIerror("missing-path", status.HTTP_400_BAD_REQUEST, "Path is required")
             )
 
-        file_path = os.path.join(settings.MEDIA_ROOT, "translation_documents", path)
-        
-        if not os.path.exists(file_path):
-            return ErrorResponse(APIerror("404", status.HTTP_404_NOT_FOUND, "File not found"))
-        
-        translation = Translation.objects.filter(
-            document=os.path.join("translation_documents", path)
-        ).first()
+        document = os.path.join("translation_documents", path)
+        file_path = os.path.join(settings.MEDIA_ROOT, document)
+
+        # Documents are stored under their SHA-256, so the indexed key finds them.
+        # Older documents stored by name alone fall back to the document column.
+        translations = Translation.objects.filter(document=document)
+        sha256 = path.split("/", 1)[0]
+        if SHA256_RE.fullmatch(sha256):
+            translations = translations.filter(document_sha256=sha256)
+        translations = list(
+            translations.values_list("id", "customer_id", "interpreter_id", "document_name")
+        )
         user, user_type = get_full_user(request.user)
         
-        if translation is None:
+        if not translations:
             return ErrorResponse(
                 APIerror("404", status.HTTP_404_NOT_FOUND, "Translation not found")
             )
         
-        if user_type == AccountType.ADMIN:
-            return FileResponse(open(file_path, 'rb'))
-        elif user_type == AccountType.INTERPRETER:
-            interpreter = user.interpreter
-            case_1 = translation in interpreter.translations.all()
-            case_2 = translation in interpreter.offered_translations.all()
-            if case_1 or case_2:
-                return FileResponse(open(file_path, 'rb'))
-        elif user_type == AccountType.CUSTOMER:
-            if translation in user.customer.translations.all():
-                return FileResponse(open(file_path, 'rb'))
+        # Identical documents share one file, readable by anyone allowed any of them
+        translation_ids = [translation[0] for translation in translations]
+        if can_read_any_translation(user, user_type, translation_ids):
+            try:
+                return serve_protected_file(
+                    request, file_path, document, download_name(user, user_type, translations))
+            except FileNotFoundError:
+                return ErrorResponse(
+                    APIerror("404", status.HTTP_404_NOT_FOUND, "File not found")
+                )
             
         return ErrorResponse(
                         APIerror(
@@ -104,4 +156,46 @@ class protected_media(APIView):
                             status.HTTP_403_FORBIDDEN, 
                             "Errors in translation."
                         )
-                    )
\ No newline at end of file
+                    )
+
+
+def set_invoice_generated(request, queryset, feed_filter, ids_key):
+    """
+    Sets invoice_generated to the request's invoiceGenerated on the rows of queryset
+    with the IDs listed in request.data[ids_key] and matching feed_filter's query string
+    filters, in a single UPDATE. At least one of the two must be given.
+    Rows already set are left out of the UPDATE, so retrying a request is harmless and
+    the count returned is the rows that changed.
+    """
+    value = request.data.get("invoiceGenerated")
+    if not isinstance(value, bool):
+        return ErrorResponse(
+            APIerror("invalid-input", status.HTTP_400_BAD_REQUEST,
+                     "invoiceGenerated must be true or false.")
+        )
+
+    ids = request.data.get(ids_key)
+    if ids is not None and not (
+        isinstance(ids, list) and all(type(id) is int for id in ids)
+    ):
+        return ErrorResponse(
+            APIerror("invalid-input", status.HTTP_400_BAD_REQUEST,
+                     f"{ids_key} must be a list of IDs.")
+        )
+
+    params = request.query_params
+    if ids is None and not any(param in params for param in [*feed_filter.filters, "search"]):
+        return ErrorResponse(
+            APIerror("invalid-input", status.HTTP_400_BAD_REQUEST,
+                     f"Give {ids_key} or a filter to choose the rows to update.")
+        )
+
+    try:
+        queryset = feed_filter.filter(request, queryset)
+    except InvalidFilter as e:
+        return invalid_filter_response(e)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    updated = queryset.exclude(invoice_generated=value).update(invoice_generated=value)
+    return APIresponse({"message": "Invoice generated updated.", "updated": updated})
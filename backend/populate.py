@@ -8,7 +8,7 @@ import traceback
 os.environ.setdefault('DJANGO_SETTINGS_MODULE','backend.settings')
 django.setup()
 from django.utils import timezone
-from datetime import datetime, time
+from datetime import datetime
 from bookingandbilling.models import (Admin,
                                       Customer,
                                       Gender,
@@ -156,7 +156,7 @@ def add_appointment(planned_start_time,planned_duration,location):
     a = Appointment.objects.create(
         location=location, 
         planned_start_time=timezone.make_aware(dt),
-        planned_duration=time(planned_duration[0],planned_duration[1])
+        planned_duration_minutes=planned_duration[0] * 60 + planned_duration[1]
     )
     a.customer = Customer.objects.order_by('first_name').first()
     a.language = Language.objects.order_by('language_name').first()